@@ -0,0 +1,28 @@
+import hashlib
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from spend_tracker.cache import get_user_version_tag
+
+
+def user_data_etag(request, *args, **kwargs):
+    """
+    ETag for a response computed only from the requesting user's data (and
+    today's date). It changes whenever that data is written, so it can be
+    checked without touching the database.
+    """
+    if not request.user.is_authenticated:
+        return None
+    
+    raw = '|'.join([
+        str(request.user.pk),
+        get_user_version_tag(request.user.pk),
+        timezone.now().date().isoformat(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+# Answers If-None-Match with 304 before the view runs any query or serializer
+conditional_on_user_data = method_decorator(condition(etag_func=user_data_etag))
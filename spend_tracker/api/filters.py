@@ -0,0 +1,14 @@
+from rest_framework.filters import SearchFilter
+from transactions.search import search_transactions
+
+class TransactionSearchFilter(SearchFilter):
+    """
+    ?search= over the transactions full-text index (description and category
+    name) instead of LIKE across a JOIN. Add ?ordering=relevance to rank the
+    matches best first.
+    """
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if not text.strip():
+            return queryset
+        return search_transactions(queryset, text, ranked=request.query_params.get('ordering') == 'relevance')
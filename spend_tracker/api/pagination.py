@@ -0,0 +1,95 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from transactions.pagination import paginate_by_date
+from users.notifications import paginate_notifications
+
+class TransactionCursorPagination(BasePagination):
+    """
+    Cursor pagination over (date, id), newest first. Pass ?ordering=date to
+    walk oldest first instead. Ranked searches (?ordering=relevance) return
+    a single page of the best matches.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = request.query_params.get('ordering')
+        
+        if ordering == 'relevance' and 'search_rank' in queryset.query.annotations:
+            # Ranked search results come back as one page of the best matches
+            self.next_cursor = None
+            return list(queryset[:self.get_page_size(request)])
+        
+        ascending = ordering == 'date'
+        
+        try:
+            page, self.next_cursor = paginate_by_date(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request),
+                ascending
+            )
+        except ValueError:
+            raise NotFound('Invalid cursor')
+        
+        return page
+    
+    def get_page_size(self, request):
+        # Missing, non-numeric and non-positive sizes fall back to the default
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size < 1:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+    
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+
+class NotificationCursorPagination(TransactionCursorPagination):
+    """Cursor pagination over (created_at, id), newest first."""
+    page_size = 20
+    max_page_size = 100
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            page, self.next_cursor = paginate_notifications(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request)
+            )
+        except ValueError:
+            raise NotFound('Invalid cursor')
+        
+        return page
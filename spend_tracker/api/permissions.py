@@ -27,3 +27,17 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         
         # Write permissions are only allowed to admin users.
         return request.user and request.user.is_staff
+
+
+class IsNotConvertingCurrency(permissions.BasePermission):
+    """
+    Custom permission to block writes while a background currency
+    conversion is rewriting the user's amounts.
+    """
+    message = 'Your amounts are being converted to a new currency. Please try again shortly.'
+    
+    def has_permission(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        
+        return not request.user.is_converting_currency
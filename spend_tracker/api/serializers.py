@@ -1,12 +1,25 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import models
+from transactions.categories import get_user_category_map
+from transactions.imports import CSV_COLUMNS, IMPORT_FORMATS
 from transactions.models import Transaction, Category
 from budgets.models import Budget, ExpectedIncome
+from budgets.services import attach_budget_progress
 from reports.models import Report, ReportCategory
-from users.models import UserPreference, Family
+from users.models import UserPreference, Family, Notification
+from users.rates import get_exchange_rate
 
 User = get_user_model()
 
+# Renders converted amounts the way DecimalFields render `amount`
+CONVERTED_AMOUNT_FIELD = serializers.DecimalField(max_digits=20, decimal_places=2)
+
+def get_viewer_currency(context):
+    """Currency the requesting user reads amounts in, or None outside a request."""
+    request = context.get('request')
+    return request.user.currency if request and request.user.is_authenticated else None
+
 # User Serializers
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -28,6 +41,17 @@ class FamilySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'created_at', 'members']
         read_only_fields = ['id', 'created_at']
 
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'title', 'message', 'notification_type', 'is_read', 'created_at']
+        read_only_fields = fields
+
+class NotificationIdsSerializer(serializers.Serializer):
+    """Body of the bulk notification actions; leaving out `ids` means all of them."""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    read_only = serializers.BooleanField(required=False, default=False)
+
 # Transaction Serializers
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -41,61 +65,143 @@ class CategorySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Only administrators can create default categories.")
         return data
 
+class UserCategoryField(serializers.PrimaryKeyRelatedField):
+    """
+    Category id limited to the requesting user's own and default categories,
+    resolved from the category registry without a query.
+    """
+    def get_queryset(self):
+        # Only used to list choices in the browsable API
+        user = self.context['request'].user
+        return Category.objects.filter(models.Q(user=user) | models.Q(is_default=True))
+    
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        category = get_user_category_map(self.context['request'].user).get(pk)
+        if category is None:
+            self.fail('does_not_exist', pk_value=data)
+        return category
+
 class TransactionSerializer(serializers.ModelSerializer):
-    category_name = serializers.CharField(source='category.name', read_only=True)
-    category_type = serializers.CharField(source='category.type', read_only=True)
+    category = UserCategoryField(allow_null=True, required=False)
+    category_name = serializers.SerializerMethodField()
+    category_type = serializers.CharField(source='transaction_type', read_only=True)
+    # `amount` in the viewer's currency; `amount` itself stays in `currency`
+    converted_amount = serializers.SerializerMethodField()
     
     class Meta:
         model = Transaction
-        fields = ['id', 'user', 'amount', 'category', 'category_name', 'category_type', 
-                  'description', 'date', 'created_at', 'updated_at']
+        fields = ['id', 'user', 'amount', 'currency', 'converted_amount', 'category', 'category_name',
+                  'category_type', 'description', 'date', 'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+    
+    def get_converted_amount(self, obj):
+        # Annotated in SQL by the list views; otherwise a lookup in the rate matrix
+        value = getattr(obj, 'converted_amount', None)
+        if value is None:
+            currency = get_viewer_currency(self.context)
+            if currency is None or not obj.currency:
+                return None
+            value = obj.amount * get_exchange_rate(obj.currency, currency)
+        return CONVERTED_AMOUNT_FIELD.to_representation(value)
+    
+    def update(self, instance, validated_data):
+        # An amount converted before the edit is stale afterwards
+        instance.__dict__.pop('converted_amount', None)
+        return super().update(instance, validated_data)
+    
+    def get_category_name(self, obj):
+        if obj.category_id is None:
+            return None
+        if 'category_map' not in self.context:
+            request = self.context.get('request')
+            self.context['category_map'] = get_user_category_map(request.user) if request else {}
+        category = self.context['category_map'].get(obj.category_id)
+        if category is None and Transaction.category.is_cached(obj):
+            category = obj.category
+        # Never load the category here, that would be a query per row
+        return category.name if category else None
+
+class BulkTransactionSerializer(serializers.Serializer):
+    """
+    One item of a bulk transaction request. Categories are plain ids here so
+    the view can check ownership of every item's category in a single query.
+    """
+    id = serializers.IntegerField(required=False)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    currency = serializers.ChoiceField(choices=User.CURRENCY_CHOICES, required=False)
+    category = serializers.IntegerField(required=False, allow_null=True)
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    date = serializers.DateField()
+
+class StatementImportSerializer(serializers.Serializer):
+    """
+    Multipart body of a statement import. `columns` is a JSON object naming
+    the CSV header of any field the default header names miss.
+    """
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=IMPORT_FORMATS, required=False)
+    columns = serializers.JSONField(binary=True, required=False)
+    date_format = serializers.CharField(max_length=50, required=False)
+    income_category = UserCategoryField(required=False, allow_null=True)
+    expense_category = UserCategoryField(required=False, allow_null=True)
+    
+    def validate_columns(self, value):
+        if not isinstance(value, dict) or not all(isinstance(name, str) for name in value.values()):
+            raise serializers.ValidationError('Expected an object of field names to CSV headers.')
+        unknown = set(value) - set(CSV_COLUMNS)
+        if unknown:
+            raise serializers.ValidationError(f'Unknown fields: {", ".join(sorted(unknown))}.')
+        return value
+    
+    def validate(self, data):
+        for category_type in ('income', 'expense'):
+            category = data.get(f'{category_type}_category')
+            if category is not None and category.type != category_type:
+                raise serializers.ValidationError({f'{category_type}_category': [f'Not an {category_type} category.']})
+        return data
 
 # Budget Serializers
+class BudgetListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Compute progress for every budget in one query before serializing
+        budgets = data.all() if isinstance(data, models.Manager) else data
+        return super().to_representation(
+            attach_budget_progress(budgets, currency=get_viewer_currency(self.context))
+        )
+
 class BudgetSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
+    # Method fields, so the values render as JSON numbers as they always have
     spent = serializers.SerializerMethodField()
     remaining = serializers.SerializerMethodField()
     percentage = serializers.SerializerMethodField()
     
     class Meta:
         model = Budget
+        list_serializer_class = BudgetListSerializer
         fields = ['id', 'user', 'category', 'category_name', 'amount', 'period', 
                   'spent', 'remaining', 'percentage', 'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'created_at', 'updated_at', 'spent', 'remaining', 'percentage']
     
+    def to_representation(self, instance):
+        if not hasattr(instance, 'spent'):
+            attach_budget_progress([instance], currency=get_viewer_currency(self.context))
+        return super().to_representation(instance)
+    
     def get_spent(self, obj):
-        from django.db.models import Sum
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        today = timezone.now().date()
-        
-        if obj.period == 'monthly':
-            start_date = today.replace(day=1)
-        elif obj.period == 'weekly':
-            start_date = today - timedelta(days=today.weekday())
-        else:  # daily
-            start_date = today
-        
-        spent = Transaction.objects.filter(
-            user=obj.user,
-            category=obj.category,
-            date__gte=start_date,
-            date__lte=today
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        return spent
+        return obj.spent
     
     def get_remaining(self, obj):
-        spent = self.get_spent(obj)
-        return obj.amount - spent
+        return obj.remaining
     
     def get_percentage(self, obj):
-        spent = self.get_spent(obj)
-        if obj.amount > 0:
-            return (spent / obj.amount) * 100
-        return 0
+        return obj.percentage
 
 class ExpectedIncomeSerializer(serializers.ModelSerializer):
     class Meta:
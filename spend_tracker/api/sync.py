@@ -0,0 +1,128 @@
+import base64
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.db.models import Q
+from django.utils import timezone
+from transactions.models import Category, Tombstone, Transaction
+from transactions.tombstones import TOMBSTONE_RETENTION
+from budgets.models import Budget, ExpectedIncome
+from .serializers import BudgetSerializer, CategorySerializer, ExpectedIncomeSerializer, TransactionSerializer
+
+# Watermarks trail the clock so rows saved just before a sync but committed
+# after it are sent again next time; clients upsert by id.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+# Transactions are sent in pages of this many, walked by (updated_at, id)
+SYNC_PAGE_SIZE = 500
+
+# (response key, tombstone record type, user's rows, serializer); the other
+# models are small per user and come whole with the first page
+SYNC_SOURCES = [
+    ('categories', 'category',
+     lambda user: Category.objects.filter(Q(user=user) | Q(is_default=True)), CategorySerializer),
+    ('budgets', 'budget',
+     lambda user: Budget.objects.filter(user=user).select_related('category'), BudgetSerializer),
+    ('incomes', 'income',
+     lambda user: ExpectedIncome.objects.filter(user=user), ExpectedIncomeSerializer),
+]
+
+
+def encode_watermark(moment):
+    """Opaque token for a point in time."""
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode()
+
+
+def decode_watermark(watermark):
+    """Return the datetime stored in a watermark, or raise ValueError."""
+    try:
+        moment = datetime.fromisoformat(base64.urlsafe_b64decode(watermark.encode()).decode())
+    except (ValueError, TypeError):
+        raise ValueError('Invalid watermark')
+    if timezone.is_naive(moment):
+        raise ValueError('Invalid watermark')
+    return moment
+
+
+def encode_cursor(watermark, since, updated_at, pk):
+    """Opaque token for the next page of a sync: where it started and the last row sent."""
+    state = [moment.isoformat() if moment else None for moment in (watermark, since, updated_at)] + [pk]
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (watermark, since, updated_at, id) from a sync cursor, or raise ValueError."""
+    try:
+        watermark, since, updated_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        watermark, updated_at = datetime.fromisoformat(watermark), datetime.fromisoformat(updated_at)
+        since = datetime.fromisoformat(since) if since else None
+        pk = int(pk)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    return watermark, since, updated_at, pk
+
+
+def get_changes(user, since=None, context=None, cursor=None, page_size=None):
+    """
+    Rows created or updated at or after `since`, and ids deleted since then,
+    for every synced model. Each lookup is a range scan on a (user, updated_at)
+    or (user, deleted_at) index, so the cost follows the amount of change.
+
+    Without `since`, or when it predates the tombstone retention window,
+    everything is returned with `reset` set and the client should replace
+    its local copy.
+
+    Transactions come `page_size` (default SYNC_PAGE_SIZE) at a time. While more remain, `cursor` is
+    the token for the next page and `watermark` is None; the last page
+    carries the watermark of the first, so rows changed while paging are
+    sent again by the next sync.
+    """
+    now = timezone.now()
+    page_size = page_size or SYNC_PAGE_SIZE
+    if cursor:
+        watermark, since, updated_at, pk = decode_cursor(cursor)
+        reset = since is None
+    else:
+        watermark, updated_at, pk = now - SYNC_OVERLAP, None, None
+        reset = since is None or since < now - TOMBSTONE_RETENTION
+        if reset:
+            since = None
+    
+    deleted = defaultdict(list)
+    if not reset and not cursor:
+        tombstones = Tombstone.objects.filter(
+            Q(user=user) | Q(user__isnull=True), deleted_at__gte=since
+        ).values_list('record_type', 'record_id')
+        for record_type, record_id in tombstones:
+            deleted[record_type].append(record_id)
+    
+    transactions = Transaction.objects.filter(user=user)
+    if since:
+        transactions = transactions.filter(updated_at__gte=since)
+    if cursor:
+        transactions = transactions.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+    page = list(transactions.order_by('updated_at', 'id')[:page_size + 1])
+    more = len(page) > page_size
+    page = page[:page_size]
+    
+    changes = {
+        'watermark': None if more else encode_watermark(watermark),
+        'cursor': encode_cursor(watermark, since, page[-1].updated_at, page[-1].pk) if more else None,
+        'reset': reset,
+        'transactions': {
+            'updated': TransactionSerializer(page, many=True, context=context).data,
+            'deleted': deleted['transaction'],
+        },
+    }
+    for key, record_type, get_rows, serializer_class in SYNC_SOURCES:
+        if cursor:
+            changes[key] = {'updated': [], 'deleted': []}
+            continue
+        rows = get_rows(user)
+        if not reset:
+            rows = rows.filter(updated_at__gte=since)
+        changes[key] = {
+            'updated': serializer_class(rows.order_by('updated_at', 'id'), many=True, context=context).data,
+            'deleted': deleted[record_type],
+        }
+    return changes
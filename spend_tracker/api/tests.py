@@ -2,16 +2,35 @@ from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APITestCase
-from transactions.models import Category, Transaction
+from django.utils import timezone
+from transactions.models import Category, Tombstone, Transaction
+from transactions.tombstones import TOMBSTONE_RETENTION
 from budgets.models import Budget, ExpectedIncome
 from reports.models import Report
 from users.models import UserPreference, Family
+from users.notifications import notify
+from django.core.cache import cache
+from django.test import override_settings
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from spend_tracker.celery import app
+from spend_tracker.metrics import registry
+from spend_tracker.instrumentation import record_queries
+from spend_tracker.testing import QueryBudgetMixin
+from .pagination import TransactionCursorPagination
+from .serializers import TransactionSerializer
+from .sync import encode_watermark
 from decimal import Decimal
-from datetime import date
+import json
+import os
+import tempfile
+from unittest.mock import patch
+from datetime import date, timedelta
+from io import StringIO
 
 User = get_user_model()
 
-class APITestCase(APITestCase):
+class APITestCase(QueryBudgetMixin, APITestCase):
     def setUp(self):
         # Create test user
         self.user = User.objects.create_user(
@@ -96,6 +115,32 @@ class APITestCase(APITestCase):
         self.assertEqual(response.data['month_savings'], Decimal('950.00'))
         self.assertEqual(response.data['total_transactions'], 2)
 
+    def test_family_endpoints(self):
+        response = self.client.post(reverse('family-list'), {'name': 'Smiths'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        family_id = response.data['id']
+        partner = User.objects.create_user(username='partner', password='testpassword123', family_id=family_id)
+        Transaction.objects.create(
+            user=partner, amount=Decimal('25.00'), category=self.expense_category, date=date.today()
+        )
+        
+        detail = self.client.get(reverse('family-detail', args=[family_id])).data
+        self.assertEqual([member['username'] for member in detail['members']], ['testuser', 'partner'])
+        
+        summary = self.client.get(reverse('family-summary', args=[family_id])).data
+        self.assertEqual(summary['expense'], Decimal('75.00'))
+        self.assertEqual([member['username'] for member in summary['members']], ['testuser', 'partner'])
+        
+        budgets = self.client.get(reverse('family-budgets', args=[family_id])).data
+        self.assertEqual([row['spent'] for row in budgets], [Decimal('50.00')])
+        
+        report = self.client.get(reverse('family-report', args=[family_id]), {'report_type': 'weekly'})
+        self.assertEqual(report.data['income'], Decimal('1000.00'))
+        self.assertEqual(
+            self.client.get(reverse('family-report', args=[family_id]), {'report_type': 'daily'}).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
     def test_list_categories(self):
         url = reverse('category-list')
         response = self.client.get(url)
@@ -117,7 +162,39 @@ class APITestCase(APITestCase):
         url = reverse('transaction-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+    def test_list_transactions_cursor_pagination(self):
+        for day in range(1, 6):
+            Transaction.objects.create(
+                user=self.user,
+                amount=Decimal('10.00'),
+                category=self.expense_category,
+                date=date(2024, 1, day)
+            )
+        
+        url = reverse('transaction-list')
+        response = self.client.get(url, {'page_size': 3})
+        seen = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen.extend(item['id'] for item in response.data['results'])
+        
+        expected = list(Transaction.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_list_transactions_page_size_bounds(self):
+        url = reverse('transaction-list')
+        with patch.object(TransactionCursorPagination, 'max_page_size', 1):
+            self.assertEqual(len(self.client.get(url, {'page_size': 5}).data['results']), 1)
+        for page_size in ('0', '-1', 'ten'):
+            self.assertEqual(len(self.client.get(url, {'page_size': page_size}).data['results']), 2)
+
+    def test_list_transactions_invalid_cursor(self):
+        url = reverse('transaction-list')
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_create_transaction(self):
         url = reverse('transaction-list')
@@ -132,6 +209,198 @@ class APITestCase(APITestCase):
         self.assertEqual(Transaction.objects.count(), 3)
         self.assertEqual(Transaction.objects.get(description='Dining out').amount, Decimal('75.00'))
 
+    def test_foreign_currency_transaction(self):
+        response = self.client.post(reverse('transaction-list'), {
+            'amount': '46.00',
+            'currency': 'EUR',
+            'category': self.expense_category.id,
+            'date': date.today().isoformat()
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['converted_amount'], '50.00')
+        
+        listed = self.client.get(reverse('transaction-list')).data['results']
+        self.assertEqual(
+            sorted((row['amount'], row['currency'], row['converted_amount']) for row in listed),
+            [('1000.00', 'USD', '1000.00'), ('46.00', 'EUR', '50.00'), ('50.00', 'USD', '50.00')]
+        )
+        summary = self.client.get(reverse('transaction-summary')).data
+        self.assertEqual(summary['month_expenses'], Decimal('100.00'))
+
+    def test_bulk_transactions(self):
+        other_user = User.objects.create_user(username='otheruser', password='testpassword123')
+        other_category = Category.objects.create(name='Other', type='expense', user=other_user)
+        
+        url = reverse('transaction-bulk')
+        data = {
+            'create': [
+                {'amount': '20.00', 'category': self.expense_category.id, 'description': 'Bus fare', 'date': date.today().isoformat()},
+                {'amount': '5.00', 'category': other_category.id, 'date': date.today().isoformat()},
+                {'amount': 'abc', 'date': date.today().isoformat()},
+            ],
+            'update': [
+                {'id': self.expense_transaction.id, 'amount': '80.00'},
+                {'id': 999999, 'amount': '1.00'},
+            ],
+            'delete': [self.income_transaction.id, 999999],
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.assertEqual([item['status'] for item in response.data['create']], [201, 400, 400])
+        self.assertEqual(response.data['create'][0]['data']['category_name'], 'Groceries')
+        self.assertIn('category', response.data['create'][1]['errors'])
+        self.assertEqual([item['status'] for item in response.data['update']], [200, 404])
+        self.assertEqual([item['status'] for item in response.data['delete']], [204, 404])
+        
+        self.assertTrue(Transaction.objects.filter(description='Bus fare', transaction_type='expense').exists())
+        self.assertEqual(Transaction.objects.get(pk=self.expense_transaction.id).amount, Decimal('80.00'))
+        self.assertFalse(Transaction.objects.filter(pk=self.income_transaction.id).exists())
+        
+        # Daily totals were kept in step with the bulk writes
+        response = self.client.get(reverse('transaction-summary'))
+        self.assertEqual(response.data['month_income'], 0)
+        self.assertEqual(response.data['month_expenses'], Decimal('100.00'))
+
+    def test_bulk_results_do_not_query_per_item(self):
+        def create(count):
+            items = [{'amount': '1.00', 'category': self.expense_category.id, 'date': '2025-05-01'}] * count
+            with record_queries() as recorder:
+                response = self.client.post(reverse('transaction-bulk'), {'create': items}, format='json')
+            self.assertEqual(response.data['create'][-1]['data']['category_name'], 'Groceries')
+            return recorder.count
+        
+        create(1)
+        self.assertEqual(create(20), create(2))
+        
+        # Outside a request the name comes only from an already loaded category
+        transaction = Transaction.objects.get(pk=self.expense_transaction.pk)
+        with self.assertNumQueries(0):
+            self.assertIsNone(TransactionSerializer(transaction).data['category_name'])
+
+    def test_bulk_rejects_repeated_update(self):
+        response = self.client.post(reverse('transaction-bulk'), {'update': [
+            {'id': self.expense_transaction.id, 'amount': '60.00'},
+            {'id': self.expense_transaction.id, 'amount': '70.00'},
+        ]}, format='json')
+        
+        self.assertEqual([item['status'] for item in response.data['update']], [200, 400])
+        self.assertIn('id', response.data['update'][1]['errors'])
+        self.assertEqual(Transaction.objects.get(pk=self.expense_transaction.id).amount, Decimal('60.00'))
+        response = self.client.get(reverse('transaction-summary'))
+        self.assertEqual(response.data['month_expenses'], Decimal('60.00'))
+
+    def test_create_transaction_rejects_foreign_category(self):
+        other = User.objects.create_user(username='other', password='testpassword123')
+        foreign = Category.objects.create(name='Theirs', type='expense', user=other)
+        response = self.client.post(reverse('transaction-list'), {
+            'amount': '10.00', 'category': foreign.id, 'date': '2025-05-01'
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('category', response.data)
+
+    def test_search_transactions(self):
+        url = reverse('transaction-list')
+        response = self.client.get(url, {'search': 'groc'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.expense_transaction.id])
+        
+        response = self.client.get(url, {'search': 'salary', 'ordering': 'relevance'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.income_transaction.id])
+        self.assertIsNone(response.data['next'])
+
+    def test_export_transactions_csv(self):
+        url = reverse('transaction-export')
+        response = self.client.get(url, {'type': 'expense'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,date,amount,currency,type,category,description,created_at,updated_at')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Weekly groceries', lines[1])
+
+    def test_export_transactions_ndjson(self):
+        url = reverse('transaction-export')
+        response = self.client.get(url, {'file_format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual({row['description'] for row in rows}, {'Monthly salary', 'Weekly groceries'})
+        self.assertEqual(rows[0]['amount'], '1000.00')
+        
+        response = self.client.get(url, {'file_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_statement(self):
+        url = reverse('transaction-import')
+        statement = b'Date,Description,Amount\n2025-05-01,Corner shop,-4.50\n2025-05-02,Payroll,100.00\n'
+        
+        response = self.client.post(url, {
+            'file': SimpleUploadedFile('may.csv', statement),
+            'income_category': self.income_category.pk,
+            'expense_category': self.expense_category.pk,
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['errors']), (2, 0))
+        self.assertEqual(
+            Transaction.objects.get(user=self.user, date=date(2025, 5, 1)).category, self.expense_category
+        )
+        
+        response = self.client.post(url, {'file': SimpleUploadedFile('may.csv', statement)}, format='multipart')
+        self.assertEqual(response.data['duplicates'], 2)
+        
+        response = self.client.post(url, {
+            'file': SimpleUploadedFile('may.csv', statement), 'income_category': self.expense_category.pk
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {'file': SimpleUploadedFile('may.csv', b'when,what\n')}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('no date column', response.data['file'][0])
+
+    @patch('api.views.IMPORT_INLINE_MAX_BYTES', 0)
+    def test_import_statement_in_background(self):
+        previous_eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', previous_eager)
+        upload_dir = self.enterContext(tempfile.TemporaryDirectory())
+        
+        with self.settings(IMPORT_UPLOAD_DIR=upload_dir):
+            response = self.client.post(reverse('transaction-import'), {
+                'file': SimpleUploadedFile('may.ofx', b'<CURDEF>USD<STMTTRN><DTPOSTED>20250501<TRNAMT>-9.00<FITID>1</STMTTRN>'),
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(Transaction.objects.filter(user=self.user, amount=Decimal('9.00')).exists())
+        # The upload is removed once imported
+        self.assertEqual(os.listdir(upload_dir), [])
+        
+        task_id = response.data['task_id']
+        self.assertTrue(response.data['status_url'].endswith(f'/api/transactions/import/{task_id}/'))
+        # Ownership is not kept in a per-process or evictable cache
+        cache.clear()
+        with patch('api.views.AsyncResult') as async_result:
+            async_result.return_value.state = 'PROGRESS'
+            async_result.return_value.info = {'done': 10, 'total': 70, 'read': 1}
+            response = self.client.get(response.data['status_url'])
+        self.assertEqual(response.data['progress']['total'], 70)
+        
+        # Other users cannot see the task
+        other = User.objects.create_user(username='other', password='testpassword123')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('transaction-import-status', args=[task_id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch('api.views.IMPORT_INLINE_MAX_BYTES', 0)
+    def test_import_statement_removes_upload_if_not_queued(self):
+        upload_dir = self.enterContext(tempfile.TemporaryDirectory())
+        
+        with self.settings(IMPORT_UPLOAD_DIR=upload_dir), \
+                patch('api.views.import_statement_file.delay', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                self.client.post(reverse('transaction-import'), {
+                    'file': SimpleUploadedFile('may.ofx', b'<CURDEF>USD<STMTTRN><DTPOSTED>20250501<TRNAMT>-9.00<FITID>1</STMTTRN>'),
+                }, format='multipart')
+        self.assertEqual(os.listdir(upload_dir), [])
+
     def test_transaction_summary(self):
         url = reverse('transaction-summary')
         response = self.client.get(url)
@@ -140,6 +409,140 @@ class APITestCase(APITestCase):
         self.assertEqual(response.data['month_expenses'], Decimal('50.00'))
         self.assertEqual(response.data['month_savings'], Decimal('950.00'))
 
+    def test_converted_totals_are_rounded_to_cents(self):
+        # 10.05 EUR is 10.9239... USD at the default rate
+        Transaction.objects.create(
+            user=self.user, amount=Decimal('10.05'), currency='EUR',
+            category=self.expense_category, date=date.today()
+        )
+        
+        for url in (reverse('transaction-summary'), reverse('user-stats')):
+            self.assertEqual(self.client.get(url).json()['month_expenses'], 60.92)
+        budget = self.client.get(reverse('budget-progress')).json()[0]
+        self.assertEqual((budget['spent'], budget['remaining'], budget['percentage']), (60.92, 139.08, 30.46))
+
+    def test_sync(self):
+        url = reverse('sync-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['reset'])
+        self.assertEqual(len(response.data['transactions']['updated']), 2)
+        self.assertEqual(len(response.data['categories']['updated']), 2)
+        self.assertEqual(len(response.data['budgets']['updated']), 1)
+        self.assertEqual(len(response.data['incomes']['updated']), 1)
+        
+        since = encode_watermark(timezone.now())
+        self.client.patch(reverse('transaction-detail', args=[self.expense_transaction.id]), {'amount': '60.00'})
+        self.client.delete(reverse('transaction-detail', args=[self.income_transaction.id]))
+        self.client.post(reverse('transaction-bulk'), {'delete': [self.expense_transaction.id]}, format='json')
+        budget_id = self.budget.id
+        self.budget.delete()
+        
+        response = self.client.get(url, {'since': since})
+        self.assertFalse(response.data['reset'])
+        self.assertEqual(response.data['transactions']['updated'], [])
+        self.assertEqual(
+            sorted(response.data['transactions']['deleted']),
+            sorted([self.income_transaction.id, self.expense_transaction.id])
+        )
+        self.assertEqual(response.data['categories'], {'updated': [], 'deleted': []})
+        self.assertEqual(response.data['budgets']['deleted'], [budget_id])
+        self.assertEqual(response.data['incomes']['updated'], [])
+        
+        response = self.client.get(url, {'since': 'not-a-watermark'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sync_returns_updates_since_watermark(self):
+        since = encode_watermark(timezone.now())
+        self.client.patch(reverse('transaction-detail', args=[self.expense_transaction.id]), {'amount': '60.00'})
+        
+        response = self.client.get(reverse('sync-list'), {'since': since})
+        self.assertEqual([row['id'] for row in response.data['transactions']['updated']], [self.expense_transaction.id])
+        self.assertEqual(response.data['transactions']['updated'][0]['amount'], '60.00')
+
+    @patch('api.sync.SYNC_PAGE_SIZE', 1)
+    def test_sync_pages_transactions(self):
+        response = self.client.get(reverse('sync-list'))
+        self.assertTrue(response.data['reset'])
+        self.assertIsNone(response.data['watermark'])
+        self.assertEqual(len(response.data['transactions']['updated']), 1)
+        self.assertEqual(len(response.data['categories']['updated']), 2)
+        seen = [row['id'] for row in response.data['transactions']['updated']]
+        
+        # A row changed while paging is sent again further on
+        self.client.patch(reverse('transaction-detail', args=[seen[0]]), {'description': 'Edited'})
+        
+        pages = 1
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            self.assertTrue(response.data['reset'])
+            self.assertEqual(response.data['categories'], {'updated': [], 'deleted': []})
+            seen += [row['id'] for row in response.data['transactions']['updated']]
+            pages += 1
+        
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(set(seen)), sorted([self.income_transaction.id, self.expense_transaction.id]))
+        self.assertIsNotNone(response.data['watermark'])
+        
+        response = self.client.get(reverse('sync-list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pruned_tombstones_force_a_full_resync(self):
+        self.expense_transaction.delete()
+        old = timezone.now() - TOMBSTONE_RETENTION - timedelta(days=1)
+        Tombstone.objects.update(deleted_at=old)
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertFalse(Tombstone.objects.exists())
+        
+        # A client last synced before the deletion cannot get it as a delta
+        response = self.client.get(reverse('sync-list'), {'since': encode_watermark(old - timedelta(days=1))})
+        self.assertTrue(response.data['reset'])
+
+    def test_deleting_user_leaves_no_tombstones(self):
+        self.user.delete()
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_conditional_get(self):
+        url = reverse('transaction-summary')
+        response = self.client.get(url)
+        etag = response['ETag']
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        # Other endpoints and query strings get their own tags
+        self.assertNotEqual(self.client.get(reverse('user-stats'))['ETag'], etag)
+        self.assertNotEqual(self.client.get(url, {'type': 'expense'})['ETag'], etag)
+        
+        # Any write to the user's data changes the tag
+        self.client.patch(reverse('transaction-detail', args=[self.expense_transaction.id]), {'amount': '60.00'})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['month_expenses'], Decimal('60.00'))
+
+    def test_notifications(self):
+        notifications = [notify(self.user, f'Alert {i}', 'Over budget') for i in range(3)]
+        self.user.refresh_from_db()
+        
+        response = self.client.get(reverse('notification-unread-count'))
+        self.assertEqual(response.data, {'unread_count': 3})
+        
+        response = self.client.get(reverse('notification-list'), {'page_size': 2})
+        self.assertEqual([row['id'] for row in response.data['results']], [notifications[2].id, notifications[1].id])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], [notifications[0].id])
+        
+        response = self.client.post(reverse('notification-mark-read'), {'ids': [notifications[0].id]}, format='json')
+        self.assertEqual(response.data, {'updated': 1})
+        response = self.client.get(reverse('notification-list'), {'unread': 'true'})
+        self.assertEqual(len(response.data['results']), 2)
+        
+        response = self.client.post(reverse('notification-bulk-delete'), {}, format='json')
+        self.assertEqual(response.data, {'deleted': 3})
+        self.user.refresh_from_db()
+        self.assertEqual(self.client.get(reverse('notification-unread-count')).data, {'unread_count': 0})
+
     def test_list_budgets(self):
         url = reverse('budget-list')
         response = self.client.get(url)
@@ -164,9 +567,9 @@ class APITestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['spent'], '50.00')
-        self.assertEqual(response.data[0]['remaining'], '150.00')
-        self.assertEqual(response.data[0]['percentage'], 25.0)
+        # Numbers in the JSON, not strings
+        budget = response.json()[0]
+        self.assertEqual((budget['spent'], budget['remaining'], budget['percentage']), (50.0, 150.0, 25.0))
 
     def test_list_incomes(self):
         url = reverse('income-list')
@@ -195,4 +598,104 @@ class APITestCase(APITestCase):
         report = Report.objects.first()
         self.assertEqual(report.total_income, Decimal('1000.00'))
         self.assertEqual(report.total_expense, Decimal('50.00'))
-        self.assertEqual(report.categories.count(), 2)
\ No newline at end of file
+        self.assertEqual(report.categories.count(), 2)        
+        # Generating again without any transaction changes returns the same report
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], report.pk)
+        self.assertEqual(Report.objects.count(), 1)
+        
+        # Renaming a category changes the report without touching transactions
+        self.expense_category.name = 'Food'
+        self.expense_category.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('Food', [row['category_name'] for row in response.data['categories']])
+    
+    # Queries each read endpoint may run with an empty cache. The rows are
+    # several per list so a per-row query breaks the budget
+    QUERY_BUDGETS = {
+        'user-list': 1,
+        'user-me': 0,
+        'user-stats': 2,
+        'preference-list': 1,
+        'family-list': 2,
+        'family-summary': 5,
+        'family-budgets': 5,
+        'family-report': 4,
+        'category-list': 1,
+        'category-income': 2,
+        'category-expense': 2,
+        'transaction-list': 4,
+        'transaction-summary': 3,
+        'budget-list': 3,
+        'budget-progress': 3,
+        'income-list': 1,
+        'report-list': 2,
+        'notification-list': 1,
+        'notification-unread-count': 0,
+        'sync-list': 8,
+    }
+    
+    def test_query_budgets(self):
+        self.user.family = Family.objects.create(name='Smiths')
+        self.user.save()
+        for name in ('Rent', 'Transport', 'Dining', 'Utilities'):
+            category = Category.objects.create(name=name, type='expense', user=self.user)
+            Budget.objects.create(user=self.user, category=category, amount=Decimal('100.00'), period='weekly')
+            Transaction.objects.create(user=self.user, amount=Decimal('5.00'), category=category, date=date.today())
+            ExpectedIncome.objects.create(user=self.user, source=name, amount=Decimal('10.00'), period='monthly')
+            notify(self.user, name, 'Budget created')
+        self.client.get(reverse('report-generate'))
+        
+        for url_name, budget in self.QUERY_BUDGETS.items():
+            args = [self.user.family_id] if url_name.startswith('family-') and url_name != 'family-list' else []
+            cache.clear()
+            with self.subTest(url_name):
+                self.assertEndpointQueryBudget(reverse(url_name, args=args), budget)
+    
+    @override_settings(SERVER_TIMING_HEADERS=True)
+    def test_request_instrumentation(self):
+        with self.assertLogs('spend_tracker.requests', 'INFO') as logs:
+            response = self.client.get(reverse('transaction-list'))
+        
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('queries"', response['Server-Timing'])
+        metrics = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(metrics['path'], reverse('transaction-list'))
+        self.assertEqual(metrics['status'], 200)
+        self.assertGreater(metrics['queries'], 0)
+        self.assertEqual(metrics['repeated'], [])
+        
+        with record_queries() as recorder:
+            for category in Category.objects.filter(user=self.user):
+                Transaction.objects.filter(category_id=category.pk).count()
+        self.assertEqual(
+            [row['count'] for row in recorder.repeated(threshold=2)], [2]
+        )
+    
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('transaction-list'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="transaction-list",status="200",le="+Inf"}', body)
+        self.assertIn('db_queries_total{view="transaction-list"}', body)
+        self.assertIn('# TYPE celery_task_failures_total counter', body)
+    
+    def test_metrics_aggregate_across_processes(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            # Another worker's flushed values
+            with open(os.path.join(directory, 'metrics-1.json'), 'w') as handle:
+                json.dump({'celery_task_failures_total': [[['reports.tasks.example'], [2]]]}, handle)
+            local = registry.snapshot().get('celery_task_failures_total', {}).get(('reports.tasks.example',), [0])[0]
+            
+            body = registry.expose()
+            self.assertIn(f'celery_task_failures_total{{task="reports.tasks.example"}} {local + 2}', body)
+            self.assertTrue(os.path.exists(os.path.join(directory, f'metrics-{os.getpid()}.json')))
@@ -11,8 +11,11 @@ router.register(r'transactions', views.TransactionViewSet, basename='transaction
 router.register(r'budgets', views.BudgetViewSet, basename='budget')
 router.register(r'incomes', views.ExpectedIncomeViewSet, basename='income')
 router.register(r'reports', views.ReportViewSet, basename='report')
+router.register(r'notifications', views.NotificationViewSet, basename='notification')
+router.register(r'sync', views.SyncViewSet, basename='sync')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
     path('auth/', include('rest_framework.urls', namespace='rest_framework')),
 ]
\ No newline at end of file
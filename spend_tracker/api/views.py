@@ -1,24 +1,53 @@
-from rest_framework import viewsets, permissions, status, filters
+import os
+from rest_framework import viewsets, mixins, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.response import Response
-from django.db.models import Sum
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+from celery.result import AsyncResult
+from django.db.models import Q
+from django.http import HttpResponse
 from django.utils import timezone
-from datetime import timedelta
 from django.contrib.auth import get_user_model
 from .serializers import (
     UserSerializer, UserPreferenceSerializer, FamilySerializer,
-    CategorySerializer, TransactionSerializer,
+    CategorySerializer, TransactionSerializer, BulkTransactionSerializer, StatementImportSerializer,
     BudgetSerializer, ExpectedIncomeSerializer,
-    ReportSerializer, ReportCategorySerializer
+    ReportSerializer, ReportCategorySerializer,
+    NotificationSerializer, NotificationIdsSerializer
 )
-from transactions.models import Transaction, Category
+from transactions.models import Transaction, Category, DailyCategoryTotal, StatementImport
+from transactions.categories import get_user_categories
+from transactions.services import filter_by_params, get_period_stats, get_top_categories, get_user_period_stats
+from spend_tracker.cache import cached_for_user
+from spend_tracker.concurrency import run_queries
+from spend_tracker.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry
+from transactions.exports import EXPORT_FORMATS, export_response
+from transactions.bulk import bulk_write_transactions, get_allowed_categories
+from transactions.imports import detect_format, import_statement, save_upload
+from transactions.tasks import import_statement_file
 from budgets.models import Budget, ExpectedIncome
-from reports.models import Report, ReportCategory
-from users.models import UserPreference, Family
-from .permissions import IsOwnerOrReadOnly, IsAdminOrReadOnly
+from reports.models import Report
+from reports.services import REPORT_PERIOD_DAYS, build_report
+from users.models import UserPreference, Family, Notification
+from users.rates import converted
+from users.family import get_family_budgets, get_family_report, get_family_summary
+from users.notifications import delete_notifications, mark_read
+from .permissions import IsOwnerOrReadOnly, IsAdminOrReadOnly, IsNotConvertingCurrency
+from .filters import TransactionSearchFilter
+from .pagination import NotificationCursorPagination, TransactionCursorPagination
+from .sync import decode_watermark, get_changes
+from .conditional import conditional_on_user_data
 
 User = get_user_model()
 
+# Upper bound on create + update + delete items in one bulk request
+BULK_MAX_ITEMS = 1000
+# Statements up to this size are imported during the request, larger ones by a Celery task
+IMPORT_INLINE_MAX_BYTES = 1024 * 1024
+
 class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -37,37 +66,23 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @conditional_on_user_data
     def stats(self, request):
         user = request.user
         today = timezone.now().date()
         start_of_month = today.replace(day=1)
         
-        # Get month-to-date totals
-        month_income = Transaction.objects.filter(
-            user=user,
-            date__gte=start_of_month,
-            date__lte=today,
-            category__type='income'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        month_expenses = Transaction.objects.filter(
-            user=user,
-            date__gte=start_of_month,
-            date__lte=today,
-            category__type='expense'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Calculate month-to-date savings
-        month_savings = month_income - month_expenses
-        
-        # Get transaction counts
-        total_transactions = Transaction.objects.filter(user=user).count()
+        # Get month-to-date totals and the all-time transaction count
+        stats = get_user_period_stats(user, {
+            'month': (start_of_month, today),
+            'all': (None, None),
+        })
         
         return Response({
-            'month_income': month_income,
-            'month_expenses': month_expenses,
-            'month_savings': month_savings,
-            'total_transactions': total_transactions
+            'month_income': stats['month']['income'],
+            'month_expenses': stats['month']['expense'],
+            'month_savings': stats['month']['savings'],
+            'total_transactions': stats['all']['count']
         })
 
 class UserPreferenceViewSet(viewsets.ModelViewSet):
@@ -86,10 +101,14 @@ class FamilyViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
+        families = Family.objects.all()
+        # The aggregate actions read members themselves and never serialize them
+        if self.action not in ('summary', 'budgets', 'report'):
+            families = families.prefetch_related('members')
         if user.is_staff:
-            return Family.objects.all()
-        elif user.family and (user.is_family_head or user.family):
-            return Family.objects.filter(pk=user.family.pk)
+            return families
+        elif user.family_id:
+            return families.filter(pk=user.family_id)
         return Family.objects.none()
     
     def perform_create(self, serializer):
@@ -98,6 +117,27 @@ class FamilyViewSet(viewsets.ModelViewSet):
         user.family = family
         user.is_family_head = True
         user.save()
+    
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """Month-to-date totals for the family and each member, in your currency."""
+        return Response(get_family_summary(self.get_object(), request.user.currency))
+    
+    @action(detail=True, methods=['get'])
+    def budgets(self, request, pk=None):
+        """Every member's budgets with progress, each in its owner's currency."""
+        return Response(get_family_budgets(self.get_object()))
+    
+    @action(detail=True, methods=['get'])
+    def report(self, request, pk=None):
+        """Weekly or monthly (?report_type=) family totals, in your currency."""
+        report_type = request.query_params.get('report_type', 'monthly')
+        if report_type not in REPORT_PERIOD_DAYS:
+            return Response(
+                {'report_type': [f'Expected one of: {", ".join(REPORT_PERIOD_DAYS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(get_family_report(self.get_object(), report_type, request.user.currency))
 
 class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
@@ -107,102 +147,259 @@ class CategoryViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'type']
     
     def get_queryset(self):
-        return Category.objects.filter(user=self.request.user) | Category.objects.filter(is_default=True)
+        return Category.objects.filter(Q(user=self.request.user) | Q(is_default=True))
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
     
+    @conditional_on_user_data
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
+    @conditional_on_user_data
     def income(self, request):
-        queryset = self.get_queryset().filter(type='income')
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(get_user_categories(request.user, 'income'), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @conditional_on_user_data
     def expense(self, request):
-        queryset = self.get_queryset().filter(type='expense')
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(get_user_categories(request.user, 'expense'), many=True)
         return Response(serializer.data)
 
 class TransactionViewSet(viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
-    permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['description', 'category__name']
-    ordering_fields = ['date', 'amount', 'category__name']
+    permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly, IsNotConvertingCurrency]
+    filter_backends = [TransactionSearchFilter]
+    # Ordered on (date, id); ?ordering=date reverses the direction
+    pagination_class = TransactionCursorPagination
     
     def get_queryset(self):
-        queryset = Transaction.objects.filter(user=self.request.user)
+        # Category names come from the category registry, so no JOIN is needed
+        queryset = Transaction.objects.filter(user=self.request.user).annotate(
+            converted_amount=converted('amount', self.request.user.currency)
+        )
+        return filter_by_params(queryset, self.request.query_params)
+    
+    def get_daily_totals(self):
+        """Daily rollup rows narrowed by the same query parameters as get_queryset."""
+        totals = DailyCategoryTotal.objects.filter(user=self.request.user)
+        return filter_by_params(totals, self.request.query_params)
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+    
+    @conditional_on_user_data
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create, update and delete many transactions in one request:
+        {"create": [...], "update": [{"id": ..., ...}], "delete": [ids]}.
+        Invalid items are reported per item; the rest are written atomically.
+        """
+        sections = {key: request.data.get(key, []) for key in ('create', 'update', 'delete')}
+        if not all(isinstance(items, list) for items in sections.values()):
+            return Response({'detail': 'create, update and delete must be lists.'}, status=status.HTTP_400_BAD_REQUEST)
+        if sum(len(items) for items in sections.values()) > BULK_MAX_ITEMS:
+            return Response({'detail': f'At most {BULK_MAX_ITEMS} items per request.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Filter by date range
-        start_date = self.request.query_params.get('start_date')
-        end_date = self.request.query_params.get('end_date')
+        creates = [self._validate_bulk_item(item) for item in sections['create']]
+        updates = [self._validate_bulk_item(item, partial=True) for item in sections['update']]
+        try:
+            delete_ids = [int(pk) for pk in sections['delete']]
+        except (TypeError, ValueError):
+            return Response({'delete': ['Expected a list of ids.']}, status=status.HTTP_400_BAD_REQUEST)
         
-        if start_date:
-            queryset = queryset.filter(date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(date__lte=end_date)
+        # Resolve every referenced category and every updated row with one query each
+        categories = get_allowed_categories(request.user, {
+            data['category'] for data, errors in creates + updates
+            if not errors and data.get('category') is not None
+        })
+        existing = Transaction.objects.filter(user=request.user).select_related('category').in_bulk([
+            data['id'] for data, errors in updates if not errors and 'id' in data
+        ])
         
-        # Filter by category
-        category_id = self.request.query_params.get('category')
-        if category_id:
-            queryset = queryset.filter(category_id=category_id)
+        create_results, new_transactions = [], []
+        for data, errors in creates:
+            errors = errors or self._check_bulk_category(data, categories)
+            if errors:
+                create_results.append({'status': status.HTTP_400_BAD_REQUEST, 'errors': errors})
+                continue
+            data.pop('id', None)
+            data['category'] = categories.get(data.get('category'))
+            transaction = Transaction(**data)
+            new_transactions.append(transaction)
+            create_results.append({'status': status.HTTP_201_CREATED, 'instance': transaction})
         
-        # Filter by transaction type
-        transaction_type = self.request.query_params.get('type')
-        if transaction_type:
-            queryset = queryset.filter(category__type=transaction_type)
+        update_results, changed_transactions = [], []
+        updated_ids = set()
+        for data, errors in updates:
+            if not errors and 'id' not in data:
+                errors = {'id': ['This field is required.']}
+            elif not errors and data['id'] in updated_ids:
+                errors = {'id': ['Repeated in this request.']}
+            elif not errors:
+                updated_ids.add(data['id'])
+            errors = errors or self._check_bulk_category(data, categories)
+            if errors:
+                update_results.append({'status': status.HTTP_400_BAD_REQUEST, 'errors': errors})
+                continue
+            transaction = existing.get(data.pop('id'))
+            if transaction is None:
+                update_results.append({'status': status.HTTP_404_NOT_FOUND, 'errors': {'id': ['Not found.']}})
+                continue
+            if 'category' in data:
+                data['category'] = categories.get(data['category'])
+            for field, value in data.items():
+                setattr(transaction, field, value)
+            changed_transactions.append(transaction)
+            update_results.append({'status': status.HTTP_200_OK, 'instance': transaction})
         
-        return queryset
+        deleted = set(bulk_write_transactions(request.user, new_transactions, changed_transactions, delete_ids))
+        context = self.get_serializer_context()
+        
+        return Response({
+            'create': [self._bulk_result(result, context) for result in create_results],
+            'update': [self._bulk_result(result, context) for result in update_results],
+            'delete': [
+                {'id': pk, 'status': status.HTTP_204_NO_CONTENT if pk in deleted else status.HTTP_404_NOT_FOUND}
+                for pk in delete_ids
+            ],
+        })
     
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+    def _validate_bulk_item(self, item, partial=False):
+        serializer = BulkTransactionSerializer(data=item, partial=partial)
+        if serializer.is_valid():
+            return dict(serializer.validated_data), None
+        return None, serializer.errors
+    
+    def _check_bulk_category(self, data, categories):
+        category_id = data.get('category')
+        if category_id is not None and category_id not in categories:
+            return {'category': [f'Invalid pk "{category_id}" - object does not exist.']}
+        return None
+    
+    def _bulk_result(self, result, context):
+        instance = result.pop('instance', None)
+        if instance is not None:
+            # One context for every item, so the category map is built once
+            result['data'] = self.get_serializer(instance, context=context).data
+        return result
     
     @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the filtered transactions as CSV (default) or NDJSON (?file_format=ndjson)."""
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'file_format': [f'Expected one of: {", ".join(EXPORT_FORMATS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return export_response(self.filter_queryset(self.get_queryset()), file_format)
+    
+    @action(detail=False, methods=['post'], url_path='import', url_name='import')
+    def import_statement(self, request):
+        """
+        Import a CSV or OFX bank statement uploaded as `file`. Rows imported
+        before are skipped. Small files are imported right away (201 with
+        the counts); larger ones are queued (202 with the task's status URL).
+        """
+        serializer = StatementImportSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        upload = data['file']
+        file_format = data.get('file_format') or detect_format(upload.name)
+        options = {key: data[key] for key in ('columns', 'date_format') if data.get(key)}
+        
+        if upload.size <= IMPORT_INLINE_MAX_BYTES:
+            try:
+                result = import_statement(
+                    request.user, upload, file_format,
+                    income_category=data.get('income_category'),
+                    expense_category=data.get('expense_category'),
+                    **options
+                )
+            except ValueError as exc:
+                return Response({'file': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(result, status=status.HTTP_201_CREATED)
+        
+        for key in ('income_category', 'expense_category'):
+            if data.get(key) is not None:
+                options[key] = data[key].pk
+        path = save_upload(upload)
+        try:
+            task = import_statement_file.delay(request.user.pk, path, file_format, options)
+        except Exception:
+            # No worker will ever pick the copy up
+            os.remove(path)
+            raise
+        StatementImport.objects.create(user=request.user, task_id=task.id)
+        return Response({
+            'task_id': task.id,
+            'status_url': reverse('transaction-import-status', args=[task.id], request=request),
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'], url_path=r'import/(?P<task_id>[\w-]+)', url_name='import-status')
+    def import_status(self, request, task_id=None):
+        """State of a queued statement import, with bytes and rows done so far or the final counts."""
+        if not StatementImport.objects.filter(user=request.user, task_id=task_id).exists():
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        result = AsyncResult(task_id)
+        body = {'task_id': task_id, 'state': result.state}
+        if result.state == 'PROGRESS':
+            body['progress'] = result.info
+        elif result.successful():
+            body['result'] = result.result
+        elif result.failed():
+            body['error'] = str(result.result)
+        return Response(body)
+    
+    @action(detail=False, methods=['get'])
+    @conditional_on_user_data
     def summary(self, request):
         today = timezone.now().date()
         start_of_month = today.replace(day=1)
         
-        # Get month-to-date totals
-        month_income = self.get_queryset().filter(
-            date__gte=start_of_month,
-            date__lte=today,
-            category__type='income'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        month_expenses = self.get_queryset().filter(
-            date__gte=start_of_month,
-            date__lte=today,
-            category__type='expense'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Get top expense categories
-        top_expenses = self.get_queryset().filter(
-            date__gte=start_of_month,
-            date__lte=today,
-            category__type='expense'
-        ).values('category__name').annotate(
-            total=Sum('amount')
-        ).order_by('-total')[:5]
+        def compute():
+            # Month-to-date totals and top expense categories, queried at the same time
+            currency = request.user.currency
+            totals = self.get_daily_totals()
+            stats, top_expenses = run_queries(
+                lambda: get_period_stats(totals, {'month': (start_of_month, today)}, currency),
+                lambda: list(get_top_categories(totals, start_of_month, today, currency=currency)),
+            )
+            
+            return {
+                'month_income': stats['month']['income'],
+                'month_expenses': stats['month']['expense'],
+                'month_savings': stats['month']['savings'],
+                'top_expenses': top_expenses
+            }
         
-        return Response({
-            'month_income': month_income,
-            'month_expenses': month_expenses,
-            'month_savings': month_income - month_expenses,
-            'top_expenses': top_expenses
-        })
+        params = sorted(request.query_params.lists())
+        return Response(cached_for_user(request.user.pk, 'transaction_summary', compute, today, params))
 
 class BudgetViewSet(viewsets.ModelViewSet):
     serializer_class = BudgetSerializer
-    permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
+    permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly, IsNotConvertingCurrency]
     
     def get_queryset(self):
-        return Budget.objects.filter(user=self.request.user)
+        return Budget.objects.filter(user=self.request.user).select_related('category')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
     
+    @conditional_on_user_data
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
+    @conditional_on_user_data
     def progress(self, request):
         queryset = self.get_queryset()
         serializer = self.get_serializer(queryset, many=True)
@@ -210,13 +407,17 @@ class BudgetViewSet(viewsets.ModelViewSet):
 
 class ExpectedIncomeViewSet(viewsets.ModelViewSet):
     serializer_class = ExpectedIncomeSerializer
-    permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
+    permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly, IsNotConvertingCurrency]
     
     def get_queryset(self):
         return ExpectedIncome.objects.filter(user=self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+    
+    @conditional_on_user_data
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
 class ReportViewSet(viewsets.ModelViewSet):
     serializer_class = ReportSerializer
@@ -225,92 +426,99 @@ class ReportViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Report.objects.filter(user=self.request.user)
     
-    def perform_create(self, serializer):
-        report_type = self.request.data.get('report_type', 'monthly')
-        days = 7 if report_type == 'weekly' else 30
-        
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=days)
-        
-        # Get transactions for the period
-        transactions = Transaction.objects.filter(
-            user=self.request.user,
-            date__gte=start_date,
-            date__lte=end_date
-        )
-        
-        # Calculate totals
-        income_total = transactions.filter(category__type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-        expense_total = transactions.filter(category__type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        # Create report
-        report = serializer.save(
-            user=self.request.user,
-            start_date=start_date,
-            end_date=end_date,
-            total_income=income_total,
-            total_expense=expense_total
-        )
-        
-        # Create report categories
-        category_data = transactions.values('category__name', 'category__type').annotate(
-            total=Sum('amount')
-        ).order_by('-total')
-        
-        for item in category_data:
-            if item['category__name']:
-                ReportCategory.objects.create(
-                    report=report,
-                    category_name=item['category__name'],
-                    amount=item['total'],
-                    transaction_type=item['category__type']
-                )
-        
-        return report
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self._report_response(build_report(request.user, serializer.validated_data['report_type']))
     
     @action(detail=False, methods=['get'])
     def generate(self, request):
-        report_type = request.query_params.get('report_type', 'monthly')
-        days = 7 if report_type == 'weekly' else 30
-        
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=days)
-        
-        # Get transactions for the period
-        transactions = Transaction.objects.filter(
-            user=request.user,
-            date__gte=start_date,
-            date__lte=end_date
+        return self._report_response(
+            build_report(request.user, request.query_params.get('report_type', 'monthly'))
         )
-        
-        # Calculate totals
-        income_total = transactions.filter(category__type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-        expense_total = transactions.filter(category__type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        # Create report
-        report = Report.objects.create(
-            user=request.user,
-            report_type=report_type,
-            start_date=start_date,
-            end_date=end_date,
-            total_income=income_total,
-            total_expense=expense_total
+    
+    def _report_response(self, report):
+        # An up-to-date report for the same period is returned instead of duplicated
+        return Response(
+            self.get_serializer(report).data,
+            status=status.HTTP_200_OK if report.reused else status.HTTP_201_CREATED
         )
+
+
+
+class NotificationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                          viewsets.GenericViewSet):
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationCursorPagination
+    
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+    
+    def perform_destroy(self, instance):
+        delete_notifications(self.request.user, [instance.pk])
+    
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        # Kept on the user row, so the badge costs no query
+        return Response({'unread_count': request.user.unread_notification_count})
+    
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        serializer = NotificationIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = mark_read(request.user, serializer.validated_data.get('ids'))
+        return Response({'updated': updated})
+    
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        serializer = NotificationIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        deleted = delete_notifications(
+            request.user, serializer.validated_data.get('ids'), serializer.validated_data['read_only']
+        )
+        return Response({'deleted': deleted})
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Delta sync for the mobile app: pass the `watermark` from the previous
+    response as `?since=` to receive only what changed after it. Follow
+    `next` until it is null; only the last page carries the watermark.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def list(self, request):
+        since = request.query_params.get('since') or None
+        if since:
+            try:
+                since = decode_watermark(since)
+            except ValueError:
+                raise ParseError('Invalid watermark')
         
-        # Create report categories
-        category_data = transactions.values('category__name', 'category__type').annotate(
-            total=Sum('amount')
-        ).order_by('-total')
-        
-        for item in category_data:
-            if item['category__name']:
-                ReportCategory.objects.create(
-                    report=report,
-                    category_name=item['category__name'],
-                    amount=item['total'],
-                    transaction_type=item['category__type']
-                )
+        try:
+            changes = get_changes(
+                request.user, since, self.get_serializer_context(), request.query_params.get('cursor')
+            )
+        except ValueError:
+            raise NotFound('Invalid cursor')
         
-        serializer = self.get_serializer(report)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        cursor = changes.pop('cursor')
+        changes['next'] = replace_query_param(request.build_absolute_uri(), 'cursor', cursor) if cursor else None
+        return Response(changes)
+    
+    def get_serializer_context(self):
+        return {'request': self.request, 'view': self}
 
+
+class MetricsView(APIView):
+    """
+    Request latency, query and Celery task metrics in the Prometheus text
+    format. Staff only; scrapers can authenticate with an API token.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        return HttpResponse(registry.expose(), content_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,69 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from benchmarks.seed import USERNAME_PREFIX
+from benchmarks.suite import DEFAULT_TOLERANCE, SCENARIOS, compare, load_results, run_suite, save_results
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = (
+        'Times and counts the queries of the dashboard, API, report and weekly report '
+        'code paths against seeded benchmark data, optionally against a baseline JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'benchmarks', nargs='*',
+            help=f'Benchmarks to run (default: all of {", ".join(SCENARIOS)})',
+        )
+        parser.add_argument(
+            '--user', default=f'{USERNAME_PREFIX}0',
+            help='Username to run as (default: the first seeded user, a family head)',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per benchmark; the first is cold')
+        parser.add_argument('--baseline', help='Baseline JSON to compare the results against')
+        parser.add_argument(
+            '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+            help='Fraction a time may exceed the baseline by before it counts as a regression',
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this file, e.g. a new baseline')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.select_related('family').get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist; run seed_benchmark_data first')
+        
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = load_results(options['baseline'])
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Could not read baseline: {exc}')
+        
+        def report_result(name, result):
+            self.stdout.write(f'{name:<36} ' + '  '.join(f'{key}={value}' for key, value in result.items()))
+        
+        try:
+            results = run_suite(user, options['benchmarks'], options['repeat'], on_result=report_result)
+        except (ValueError, RuntimeError) as exc:
+            raise CommandError(str(exc))
+        
+        if options['output']:
+            save_results(results, options['output'])
+            self.stdout.write(f'Wrote results to {options["output"]}')
+        
+        if baseline is None:
+            return
+        
+        if baseline.get('dataset') != results['dataset']:
+            self.stdout.write(self.style.WARNING(
+                f'Baseline was taken against {json.dumps(baseline.get("dataset"))}, '
+                f'this run against {json.dumps(results["dataset"])}'
+            ))
+        
+        regressions = compare(results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,68 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks.seed import benchmark_users, clear_benchmark_data, seed_benchmark_data
+
+class Command(BaseCommand):
+    help = (
+        'Generates deterministic synthetic users, families, categories, budgets and '
+        'transactions for benchmarking (see run_benchmarks)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Number of users to create')
+        parser.add_argument(
+            '--transactions-per-user', type=int, default=1000,
+            help='Transactions generated for each user',
+        )
+        parser.add_argument('--family-size', type=int, default=4, help='Members per family')
+        parser.add_argument(
+            '--families', type=int,
+            help='Number of families (default: a tenth of the users are in one)',
+        )
+        parser.add_argument(
+            '--notifications-per-user', type=int, default=20,
+            help='Notifications generated for each user',
+        )
+        parser.add_argument('--days', type=int, default=365, help='Days of history to spread transactions over')
+        parser.add_argument(
+            '--end-date', type=date.fromisoformat,
+            help='Last day of generated history (default: today)',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; equal seeds give equal data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete previously generated benchmark data first',
+        )
+
+    def handle(self, *args, **options):
+        # Checked before --clear so a typo does not delete the previous data
+        if options['users'] < 1 or options['transactions_per_user'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--users and --batch-size must be positive and --transactions-per-user not negative')
+        if options['family_size'] < 0 or (options['families'] or 0) < 0:
+            raise CommandError('--family-size and --families must not be negative')
+        
+        if options['clear']:
+            deleted = clear_benchmark_data()
+            self.stdout.write(f'Deleted {deleted} rows of previous benchmark data')
+        elif benchmark_users().exists():
+            raise CommandError('Benchmark data already exists; pass --clear to replace it')
+        
+        def report_progress(label, done, total):
+            self.stdout.write(f'  {label}: {done}/{total}')
+        
+        counts = seed_benchmark_data(
+            users=options['users'],
+            transactions_per_user=options['transactions_per_user'],
+            family_size=options['family_size'],
+            families=options['families'],
+            notifications_per_user=options['notifications_per_user'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            end_date=options['end_date'],
+            on_progress=report_progress,
+        )
+        
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Created {summary}'))
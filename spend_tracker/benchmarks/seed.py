@@ -0,0 +1,213 @@
+"""
+Deterministic synthetic data for benchmarking. The same options and seed
+always produce the same users, families, categories, budgets and
+transactions, so numbers from different runs are comparable. Rows are
+written with bulk_create in batches and the daily rollup is rebuilt once
+at the end instead of being maintained per row.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from budgets.models import Budget, ExpectedIncome
+from transactions.models import Category, Transaction
+from transactions.rollups import defer_daily_totals, rebuild_daily_totals
+from users.models import Family, Notification, UserPreference
+from users.notifications import notify_many
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'bench_user_'
+FAMILY_PREFIX = 'Benchmark family '
+PASSWORD = 'benchmark-password'
+
+DEFAULT_CATEGORIES = [
+    ('Salary', 'income'),
+    ('Freelance', 'income'),
+    ('Groceries', 'expense'),
+    ('Rent', 'expense'),
+    ('Transport', 'expense'),
+    ('Dining', 'expense'),
+    ('Utilities', 'expense'),
+    ('Entertainment', 'expense'),
+]
+USER_CATEGORIES = [
+    ('Side project', 'income'),
+    ('Subscriptions', 'expense'),
+    ('Gifts', 'expense'),
+]
+DESCRIPTIONS = [
+    'Weekly shop', 'Coffee', 'Monthly payment', 'Taxi home', 'Dinner out',
+    'Electricity bill', 'Cinema tickets', 'Invoice paid', 'Birthday present',
+    'Streaming service', 'Bus pass', 'Market', '',
+]
+# Most users keep the default currency; the rest exercise read-time conversion
+CURRENCY_WEIGHTS = [('USD', 70), ('EUR', 10), ('GBP', 8), ('KES', 6), ('NGN', 6)]
+# Share of transactions recorded in a currency other than the owner's
+FOREIGN_SHARE = 0.05
+EXPENSE_SHARE = 0.85
+
+
+def benchmark_users():
+    return User.objects.filter(username__startswith=USERNAME_PREFIX)
+
+
+def clear_benchmark_data():
+    """Delete everything a previous seed_benchmark_data run created."""
+    # The users' rollup rows go with them, so skip the per-row rollup upkeep
+    with transaction.atomic(), defer_daily_totals():
+        deleted, _ = benchmark_users().delete()
+        families, _ = Family.objects.filter(name__startswith=FAMILY_PREFIX, members__isnull=True).delete()
+    return deleted + families
+
+
+def _ensure_default_categories():
+    categories = []
+    for name, category_type in DEFAULT_CATEGORIES:
+        category, _ = Category.objects.get_or_create(
+            name=name, type=category_type, is_default=True, user=None
+        )
+        categories.append(category)
+    return categories
+
+
+def _amount(rng, category_type):
+    cents = rng.randint(100_000, 500_000) if category_type == 'income' else rng.randint(100, 20_000)
+    return Decimal(cents) / 100
+
+
+def seed_benchmark_data(users=100, transactions_per_user=1000, family_size=4, families=None,
+                        notifications_per_user=20, days=365, seed=42, batch_size=5000,
+                        end_date=None, on_progress=None):
+    """
+    Create `users` users, `families` families of `family_size` members
+    (a tenth of the users by default), per-user categories, budgets,
+    incomes and notifications, and `transactions_per_user` transactions
+    each, spread over the `days` days up to `end_date`.
+    `on_progress(label, done, total)` is called after each batch.
+    Returns the number of rows created per model.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or timezone.now().date()
+    if not family_size:
+        families = 0
+    else:
+        if families is None:
+            families = users // (family_size * 10)
+        families = min(families, users // family_size)
+    progress = on_progress or (lambda label, done, total: None)
+    counts = {}
+
+    default_categories = _ensure_default_categories()
+
+    with transaction.atomic():
+        family_rows = Family.objects.bulk_create(
+            Family(name=f'{FAMILY_PREFIX}{index}') for index in range(families)
+        )
+        counts['families'] = len(family_rows)
+
+        # Hashing is deliberately slow, so every user shares one hash
+        password = make_password(PASSWORD)
+        currencies, weights = zip(*CURRENCY_WEIGHTS)
+        user_rows = []
+        for index in range(users):
+            family = family_rows[index // family_size] if index < families * family_size else None
+            user_rows.append(User(
+                username=f'{USERNAME_PREFIX}{index}',
+                email=f'{USERNAME_PREFIX}{index}@example.com',
+                password=password,
+                currency=rng.choices(currencies, weights)[0],
+                user_type='family' if family else 'individual',
+                family=family,
+                is_family_head=bool(family) and index % family_size == 0,
+            ))
+        user_rows = User.objects.bulk_create(user_rows, batch_size=batch_size)
+        counts['users'] = len(user_rows)
+
+        UserPreference.objects.bulk_create(
+            (UserPreference(user=user, receive_weekly_reports=rng.random() < 0.8) for user in user_rows),
+            batch_size=batch_size,
+        )
+
+        category_rows = Category.objects.bulk_create(
+            (
+                Category(name=name, type=category_type, user=user)
+                for user in user_rows
+                for name, category_type in USER_CATEGORIES
+            ),
+            batch_size=batch_size,
+        )
+        counts['categories'] = len(category_rows)
+
+        own_categories = {}
+        for category in category_rows:
+            own_categories.setdefault(category.user_id, []).append(category)
+
+        budgets = []
+        incomes = []
+        for user in user_rows:
+            expense = [c for c in default_categories + own_categories[user.pk] if c.type == 'expense']
+            for category in rng.sample(expense, rng.randint(2, 4)):
+                budgets.append(Budget(
+                    user=user,
+                    category=category,
+                    amount=Decimal(rng.randint(100, 2000)),
+                    period=rng.choice(['daily', 'weekly', 'monthly', 'monthly']),
+                ))
+            incomes.append(ExpectedIncome(
+                user=user, source='Salary', amount=Decimal(rng.randint(1000, 8000)), period='monthly'
+            ))
+        counts['budgets'] = len(Budget.objects.bulk_create(budgets, batch_size=batch_size))
+        counts['incomes'] = len(ExpectedIncome.objects.bulk_create(incomes, batch_size=batch_size))
+
+        counts['notifications'] = len(notify_many(
+            Notification(
+                user=user,
+                title=f'Notification {index}',
+                message='Generated for benchmarking.',
+                is_read=rng.random() < 0.7,
+            )
+            for user in user_rows
+            for index in range(notifications_per_user)
+        ))
+
+    total = users * transactions_per_user
+    written = 0
+    batch = []
+    for user in user_rows:
+        categories = default_categories + own_categories[user.pk]
+        income = [c for c in categories if c.type == 'income']
+        expense = [c for c in categories if c.type == 'expense']
+        for _ in range(transactions_per_user):
+            category = rng.choice(expense if rng.random() < EXPENSE_SHARE else income)
+            description = rng.choice(DESCRIPTIONS)
+            currency = user.currency
+            if rng.random() < FOREIGN_SHARE:
+                currency = rng.choice(currencies)
+            batch.append(Transaction(
+                user_id=user.pk,
+                amount=_amount(rng, category.type),
+                currency=currency,
+                category_id=category.pk,
+                transaction_type=category.type,
+                description=description,
+                search_document=' '.join(filter(None, [description, category.name])),
+                date=end_date - timedelta(days=rng.randrange(days)),
+            ))
+            if len(batch) >= batch_size:
+                Transaction.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+                progress('transactions', written, total)
+    if batch:
+        Transaction.objects.bulk_create(batch)
+        written += len(batch)
+        progress('transactions', written, total)
+    counts['transactions'] = written
+
+    # bulk_create sends no signals, so the rollup is built in one pass
+    counts['daily_totals'] = rebuild_daily_totals([user.pk for user in user_rows])
+    return counts
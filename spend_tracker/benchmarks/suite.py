@@ -0,0 +1,189 @@
+"""
+Benchmark suite: wall time and query count for the dashboard, every API
+list and summary action, report generation and the weekly report task.
+
+Each scenario runs `repeat` times inside a transaction that is rolled back,
+so every run sees the same data. The first run starts from an empty cache
+("cold"); the rest show what cached reads cost ("warm"). Results can be
+saved as a baseline JSON and later runs compared against it.
+"""
+import json
+import statistics
+import time
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from spend_tracker.celery import app
+from reports.services import build_reports, get_report_period
+from reports.tasks import generate_weekly_reports
+from transactions.models import Transaction
+from .seed import benchmark_users
+
+# Default timing slack before a slower run counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+class BenchmarkContext:
+    """The viewer the suite runs as, with a logged-in test client."""
+
+    def __init__(self, user):
+        self.user = user
+        self.family = user.family
+        self.client = Client(SERVER_NAME='localhost')
+        self.client.force_login(user)
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params or {})
+        if response.status_code >= 400:
+            raise RuntimeError(f'GET {url} returned {response.status_code}')
+        # Streaming responses do their work while being consumed
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+
+def page(url_name, family=False):
+    def run(context):
+        return context.get(reverse(url_name))
+    run.needs_family = family
+    return run
+
+
+def api(url_name, family=False, **params):
+    def run(context):
+        args = [context.family.pk] if family else []
+        return context.get(reverse(url_name, args=args), params)
+    run.needs_family = family
+    return run
+
+
+def build_all_weekly_reports(context):
+    start_date, end_date = get_report_period('weekly')
+    return build_reports(list(benchmark_users().values_list('pk', flat=True)), 'weekly', start_date, end_date)
+
+
+def run_weekly_report_task(context):
+    return generate_weekly_reports()
+
+
+SCENARIOS = {
+    'dashboard': page('dashboard'),
+    'dashboard.family': page('family_dashboard', family=True),
+    'api.users.list': api('user-list'),
+    'api.users.me': api('user-me'),
+    'api.users.stats': api('user-stats'),
+    'api.preferences.list': api('preference-list'),
+    'api.families.list': api('family-list'),
+    'api.families.summary': api('family-summary', family=True),
+    'api.families.budgets': api('family-budgets', family=True),
+    'api.families.report': api('family-report', family=True, report_type='monthly'),
+    'api.categories.list': api('category-list'),
+    'api.categories.income': api('category-income'),
+    'api.categories.expense': api('category-expense'),
+    'api.transactions.list': api('transaction-list'),
+    'api.transactions.summary': api('transaction-summary'),
+    'api.transactions.export': api('transaction-export'),
+    'api.budgets.list': api('budget-list'),
+    'api.budgets.progress': api('budget-progress'),
+    'api.incomes.list': api('income-list'),
+    'api.reports.list': api('report-list'),
+    'api.reports.generate': api('report-generate', report_type='monthly'),
+    'api.notifications.list': api('notification-list'),
+    'api.notifications.unread_count': api('notification-unread-count'),
+    'api.sync.list': api('sync-list'),
+    'reports.build_reports': build_all_weekly_reports,
+    'reports.generate_weekly_reports': run_weekly_report_task,
+}
+
+
+def _run_once(scenario, context):
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            scenario(context)
+            elapsed = time.perf_counter() - started
+        transaction.set_rollback(True)
+    return round(elapsed * 1000, 2), len(queries)
+
+
+def measure(scenario, context, repeat=5):
+    """Cold and warm wall time (ms) and query counts for one scenario."""
+    cache.clear()
+    runs = [_run_once(scenario, context) for _ in range(max(repeat, 1))]
+    cold_ms, cold_queries = runs[0]
+    result = {'cold_ms': cold_ms, 'cold_queries': cold_queries}
+    if len(runs) > 1:
+        result['warm_ms'] = round(statistics.median(ms for ms, _ in runs[1:]), 2)
+        result['warm_queries'] = max(queries for _, queries in runs[1:])
+    return result
+
+
+def describe_dataset():
+    """Row counts the numbers were taken against, stored with every result set."""
+    users = benchmark_users()
+    return {
+        'users': users.count(),
+        'transactions': Transaction.objects.filter(user__in=users).count(),
+    }
+
+
+def run_suite(user, names=None, repeat=5, on_result=None):
+    """
+    Run the named scenarios (all by default) as `user`. Returns
+    {'dataset': ..., 'results': {name: measurements}}.
+    """
+    context = BenchmarkContext(user)
+    names = names or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f'Unknown benchmarks: {", ".join(sorted(unknown))}')
+
+    results = {}
+    previous_eager = app.conf.task_always_eager
+    app.conf.task_always_eager = True
+    try:
+        # Emails from the weekly report task stay in memory
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            for name in names:
+                scenario = SCENARIOS[name]
+                if getattr(scenario, 'needs_family', False) and not context.family:
+                    continue
+                results[name] = measure(scenario, context, repeat)
+                if on_result:
+                    on_result(name, results[name])
+    finally:
+        app.conf.task_always_eager = previous_eager
+
+    return {'dataset': describe_dataset(), 'results': results}
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Regressions of `current` against `baseline`, as human-readable lines:
+    any increase in a query count, or a time more than `tolerance` slower.
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        for key in ('cold_queries', 'warm_queries'):
+            if key in result and key in previous and result[key] > previous[key]:
+                regressions.append(f'{name}: {key} {previous[key]} -> {result[key]}')
+        for key in ('cold_ms', 'warm_ms'):
+            if key in result and key in previous and result[key] > previous[key] * (1 + tolerance):
+                regressions.append(f'{name}: {key} {previous[key]} -> {result[key]}')
+    return regressions
+
+
+def load_results(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_results(results, path):
+    with open(path, 'w') as handle:
+        json.dump(results, handle, indent=2, sort_keys=True)
+        handle.write('\n')
@@ -0,0 +1,82 @@
+from datetime import date
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from budgets.models import Budget
+from transactions.models import DailyCategoryTotal, Transaction
+from .seed import USERNAME_PREFIX, clear_benchmark_data, seed_benchmark_data
+from .suite import compare, run_suite
+
+User = get_user_model()
+
+SMALL = dict(users=4, transactions_per_user=25, family_size=2, families=1, notifications_per_user=3,
+             days=30, end_date=date(2025, 5, 31), batch_size=40)
+
+
+class SeedBenchmarkDataTest(TestCase):
+    def test_seed_is_deterministic(self):
+        counts = seed_benchmark_data(**SMALL)
+
+        self.assertEqual(counts['users'], 4)
+        self.assertEqual(counts['families'], 1)
+        self.assertEqual(counts['transactions'], 100)
+        self.assertEqual(counts['daily_totals'], DailyCategoryTotal.objects.count())
+        self.assertEqual(User.objects.filter(family__isnull=False).count(), 2)
+
+        def snapshot():
+            return list(Transaction.objects.order_by('pk').values_list(
+                'user__username', 'amount', 'currency', 'category__name', 'date', 'search_document'
+            ))
+
+        first = snapshot()
+        self.assertTrue(all(row[5] for row in first))
+
+        clear_benchmark_data()
+        self.assertFalse(User.objects.filter(username__startswith=USERNAME_PREFIX).exists())
+        self.assertFalse(Transaction.objects.exists())
+
+        seed_benchmark_data(**SMALL)
+        self.assertEqual(snapshot(), first)
+        self.assertTrue(Budget.objects.exists())
+
+    def test_seed_without_families(self):
+        counts = seed_benchmark_data(**{**SMALL, 'family_size': 0, 'families': None})
+
+        self.assertEqual(counts['families'], 0)
+        self.assertFalse(User.objects.filter(family__isnull=False).exists())
+
+    def test_invalid_arguments_keep_existing_data(self):
+        seed_benchmark_data(**SMALL)
+
+        with self.assertRaises(CommandError):
+            call_command('seed_benchmark_data', '--clear', '--users', '0', stdout=StringIO())
+        self.assertEqual(Transaction.objects.count(), 100)
+
+
+class BenchmarkSuiteTest(TestCase):
+    def setUp(self):
+        seed_benchmark_data(**SMALL)
+        self.user = User.objects.get(username=f'{USERNAME_PREFIX}0')
+
+    def test_run_and_compare(self):
+        results = run_suite(self.user, ['dashboard', 'api.families.summary', 'api.transactions.list'], repeat=2)
+
+        self.assertEqual(results['dataset'], {'users': 4, 'transactions': 100})
+        summary = results['results']['api.families.summary']
+        self.assertEqual(set(summary), {'cold_ms', 'cold_queries', 'warm_ms', 'warm_queries'})
+        # Cached on the second run
+        self.assertLess(summary['warm_queries'], summary['cold_queries'])
+        # Runs are rolled back
+        self.assertEqual(Transaction.objects.count(), 100)
+
+        self.assertEqual(compare(results, results), [])
+        baseline = {'results': {'dashboard': {**results['results']['dashboard'], 'cold_queries': 1}}}
+        regressions = compare(results, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('dashboard: cold_queries 1 ->', regressions[0])
+
+    def test_unknown_benchmark(self):
+        with self.assertRaises(ValueError):
+            run_suite(self.user, ['nope'])
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from transactions.models import DailyCategoryTotal
+from users.models import Notification, UserPreference
+from users.notifications import notify_many
+from transactions.services import sum_amount
+from users.rates import get_exchange_rate
+from .models import Budget
+from .services import get_period_starts
+
+DEFAULT_ALERT_THRESHOLDS = (50, 80, 100)
+
+
+def get_alert_thresholds():
+    return sorted(getattr(settings, 'BUDGET_ALERT_THRESHOLDS', DEFAULT_ALERT_THRESHOLDS))
+
+
+def crossed_threshold(spent, amount, thresholds=None):
+    """Highest alert threshold (a percentage of `amount`) that `spent` reaches, or 0."""
+    if amount <= 0:
+        return 0
+    percentage = spent / amount * 100
+    return max((t for t in thresholds or get_alert_thresholds() if percentage >= t), default=0)
+
+
+def _wants_alerts(user):
+    try:
+        return user.preferences.receive_budget_alerts
+    except UserPreference.DoesNotExist:
+        return UserPreference._meta.get_field('receive_budget_alerts').default
+
+
+def _sum_window(budget, start, today):
+    return DailyCategoryTotal.objects.filter(
+        user_id=budget.user_id, category_id=budget.category_id, date__gte=start, date__lte=today
+    ).aggregate(total=sum_amount(budget.user.currency))['total'] or Decimal('0')
+
+
+def _build_alert(budget, spent, threshold):
+    return Notification(
+        user=budget.user,
+        title=f"Budget alert: {budget.category.name}",
+        message=(
+            f"You have spent {spent:.2f} of your {budget.period} {budget.category.name} "
+            f"budget of {budget.amount:.2f} ({threshold}% reached)."
+        ),
+        notification_type='danger' if threshold >= 100 else 'warning',
+    )
+
+
+def apply_spending(changes, today=None):
+    """
+    Fold (user_id, category_id, date, currency, amount) deltas into the
+    running spend of the affected budgets, which is kept in the owner's
+    currency, and notify once per newly crossed threshold.
+
+    Only budgets on the touched (user, category) pairs are read, so a write
+    costs one lookup and one UPDATE per budget whatever the user's history.
+    The window is re-summed from the daily rollup when a new period starts
+    or the running value was invalidated. Returns the notifications sent.
+    """
+    deltas = defaultdict(list)
+    for user_id, category_id, day, currency, amount in changes:
+        if category_id is not None and amount:
+            deltas[(user_id, category_id)].append((day, currency, amount))
+    if not deltas:
+        return []
+
+    today = today or timezone.now().date()
+    starts = get_period_starts(today)
+
+    match = Q()
+    for user_id, category_id in deltas:
+        match |= Q(user_id=user_id, category_id=category_id)
+
+    alerts = []
+    with transaction.atomic():
+        budgets = Budget.objects.filter(match).select_related(
+            'user__preferences', 'category'
+        ).select_for_update(of=('self',))
+
+        for budget in budgets:
+            start = starts[budget.period]
+            alerted = budget.alerted_threshold if budget.period_start == start else 0
+
+            if budget.period_spent is None or budget.period_start != start:
+                # The rollup already includes this write
+                spent = _sum_window(budget, start, today)
+            else:
+                delta = sum(
+                    amount * get_exchange_rate(currency, budget.user.currency)
+                    for day, currency, amount in deltas[(budget.user_id, budget.category_id)]
+                    if start <= day <= today
+                )
+                if not delta:
+                    continue
+                spent = budget.period_spent + delta
+
+            changes = {'period_start': start, 'period_spent': spent, 'alerted_threshold': alerted}
+            threshold = crossed_threshold(spent, budget.amount)
+            if threshold > alerted:
+                changes['alerted_threshold'] = threshold
+                if _wants_alerts(budget.user):
+                    alerts.append(_build_alert(budget, spent, threshold))
+
+            Budget.objects.filter(pk=budget.pk).update(**changes)
+
+        if alerts:
+            notify_many(alerts)
+
+    return alerts
@@ -1,19 +1,18 @@
 from django import forms
 from .models import Budget, ExpectedIncome
-from transactions.models import Category
-from django.db.models import Q
+from transactions.categories import get_user_categories
+from transactions.forms import CategoryChoiceField
 
 class BudgetForm(forms.ModelForm):
     class Meta:
         model = Budget
         fields = ['category', 'amount', 'period']
+        field_classes = {'category': CategoryChoiceField}
     
     def __init__(self, user, *args, **kwargs):
         super(BudgetForm, self).__init__(*args, **kwargs)
         # Only show expense categories
-        self.fields['category'].queryset = Category.objects.filter(
-            (Q(user=user) | Q(is_default=True)) & Q(type='expense')
-        )
+        self.fields['category'].set_categories(get_user_categories(user, 'expense'))
 
 class ExpectedIncomeForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 05:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0003_initial'),
+        ('transactions', '0006_sync_watermarks_and_tombstones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['user', 'updated_at'], name='budget_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expectedincome',
+            index=models.Index(fields=['user', 'updated_at'], name='income_user_updated_idx'),
+        ),
+    ]
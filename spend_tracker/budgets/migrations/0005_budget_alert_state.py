@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 05:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0004_budget_income_updated_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='alerted_threshold',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='period_spent',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='period_start',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+    ]
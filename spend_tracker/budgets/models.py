@@ -15,9 +15,33 @@ class Budget(models.Model):
     period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Running spend for the current window, kept by budgets.alerts. A null
+    # period_spent means it has to be re-summed from the rollup.
+    period_start = models.DateField(null=True, blank=True, editable=False)
+    period_spent = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
+    alerted_threshold = models.PositiveSmallIntegerField(default=0, editable=False)
+    
+    class Meta:
+        indexes = [
+            # Delta sync reads rows changed since a watermark
+            models.Index(fields=['user', 'updated_at'], name='budget_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.category.name} - {self.amount} ({self.period})"
+    
+    def save(self, *args, **kwargs):
+        # A changed amount, period or category invalidates the running spend,
+        # and the thresholds already alerted on no longer mean the same amounts
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.period_spent = None
+            self.alerted_threshold = 0
+        elif {'amount', 'period', 'category'} & set(update_fields):
+            self.period_spent = None
+            self.alerted_threshold = 0
+            kwargs['update_fields'] = {*update_fields, 'period_spent', 'alerted_threshold'}
+        super().save(*args, **kwargs)
 
 class ExpectedIncome(models.Model):
     PERIOD_CHOICES = (
@@ -33,6 +57,11 @@ class ExpectedIncome(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='income_user_updated_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.username} - {self.source} - {self.amount} ({self.period})"
 
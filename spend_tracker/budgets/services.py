@@ -0,0 +1,64 @@
+from datetime import timedelta
+from django.db.models import Q
+from django.utils import timezone
+from spend_tracker.cache import cached_for_user
+from transactions.models import DailyCategoryTotal
+from transactions.services import sum_amount
+
+
+def get_period_starts(today):
+    """First day of the current daily, weekly (Monday) and monthly budget windows."""
+    return {
+        'daily': today,
+        'weekly': today - timedelta(days=today.weekday()),
+        'monthly': today.replace(day=1),
+    }
+
+
+def attach_budget_progress(budgets, today=None, currency=None):
+    """
+    Set `spent`, `remaining` and `percentage` on every budget using one
+    grouped query over the daily rollup, whatever the number of budgets.
+
+    Spent amounts for each budget window are bucketed in SQL with
+    conditional sums per (user, category), converted into `currency` (the
+    budgets' owner's) when given. Returns the budgets as a list.
+    """
+    budgets = list(budgets)
+    if not budgets:
+        return budgets
+    
+    today = today or timezone.now().date()
+    starts = get_period_starts(today)
+    
+    user_ids = {budget.user_id for budget in budgets}
+    category_ids = {budget.category_id for budget in budgets}
+    
+    def compute():
+        return list(DailyCategoryTotal.objects.filter(
+            user_id__in=user_ids,
+            category_id__in=category_ids,
+            date__gte=min(starts.values()),
+            date__lte=today
+        ).values('user_id', 'category_id').annotate(**{
+            period: sum_amount(currency, filter=Q(date__gte=start_date))
+            for period, start_date in starts.items()
+        }).order_by())
+    
+    if len(user_ids) == 1:
+        # The common case of one user's budgets is cached until their data changes
+        rows = cached_for_user(next(iter(user_ids)), 'budget_spent', compute, today, sorted(category_ids), currency)
+    else:
+        rows = compute()
+    
+    spent_by_category = {(row['user_id'], row['category_id']): row for row in rows}
+    
+    for budget in budgets:
+        row = spent_by_category.get((budget.user_id, budget.category_id))
+        spent = (row[budget.period] if row else None) or 0
+        
+        budget.spent = spent
+        budget.remaining = budget.amount - spent
+        budget.percentage = (spent / budget.amount) * 100 if budget.amount > 0 else 0
+    
+    return budgets
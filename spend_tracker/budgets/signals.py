@@ -0,0 +1,40 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from spend_tracker.cache import bump_user_version
+from transactions.models import DailyCategoryTotal
+from transactions.rollups import daily_totals_changed, daily_totals_rebuilt
+from transactions.tombstones import record_deletion
+from users.models import CustomUser
+from .alerts import apply_spending
+from .models import Budget, ExpectedIncome
+
+@receiver([post_save, post_delete], sender=Budget)
+@receiver([post_save, post_delete], sender=ExpectedIncome)
+def invalidate_budget_cache(sender, instance, **kwargs):
+    bump_user_version(instance.user_id)
+
+@receiver(post_delete, sender=Budget)
+def log_budget_deletion(sender, instance, origin=None, **kwargs):
+    record_deletion('budget', instance, origin)
+
+@receiver(post_delete, sender=ExpectedIncome)
+def log_income_deletion(sender, instance, origin=None, **kwargs):
+    record_deletion('income', instance, origin)
+
+@receiver(daily_totals_changed, sender=DailyCategoryTotal)
+def evaluate_budget_alerts(sender, changes, **kwargs):
+    apply_spending(changes)
+
+@receiver(daily_totals_rebuilt, sender=DailyCategoryTotal)
+def reset_budget_spending(sender, users, **kwargs):
+    # Running spends are re-summed from the new rollup on the next write
+    budgets = Budget.objects.all() if users is None else Budget.objects.filter(user__in=users)
+    budgets.update(period_spent=None)
+
+@receiver(pre_save, sender=CustomUser)
+def reset_spending_on_currency_change(sender, instance, update_fields=None, **kwargs):
+    # Running spends are sums in the stored currency, still the old one here;
+    # they are re-summed in the new currency on the next write
+    if instance.pk is None or (update_fields is not None and 'currency' not in update_fields):
+        return
+    Budget.objects.filter(user=instance).exclude(user__currency=instance.currency).update(period_spent=None)
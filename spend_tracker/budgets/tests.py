@@ -1,3 +1,177 @@
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+from datetime import date, timedelta
+from django.utils import timezone
+from transactions.bulk import bulk_write_transactions
+from transactions.models import Category, Transaction
+from users.models import Notification, UserPreference
+from .models import Budget
+from .services import attach_budget_progress
 
-# Create your tests here.
+User = get_user_model()
+
+class BudgetProgressTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.groceries = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        self.dining = Category.objects.create(name='Dining', type='expense', user=self.user)
+        # A Thursday, so the weekly window starts on Monday the 12th
+        self.today = date(2025, 5, 15)
+        
+        for amount, day in [('10.00', 15), ('20.00', 13), ('40.00', 2)]:
+            Transaction.objects.create(
+                user=self.user, amount=Decimal(amount), category=self.groceries, date=date(2025, 5, day)
+            )
+        Transaction.objects.create(user=self.user, amount=Decimal('5.00'), category=self.dining, date=self.today)
+
+    def test_periods_bucketed_in_one_query(self):
+        budgets = [
+            Budget.objects.create(user=self.user, category=self.groceries, amount=Decimal('100.00'), period='daily'),
+            Budget.objects.create(user=self.user, category=self.groceries, amount=Decimal('100.00'), period='weekly'),
+            Budget.objects.create(user=self.user, category=self.groceries, amount=Decimal('140.00'), period='monthly'),
+            Budget.objects.create(user=self.user, category=self.dining, amount=Decimal('0.00'), period='monthly'),
+        ]
+        
+        with self.assertNumQueries(1):
+            budgets = attach_budget_progress(budgets, self.today)
+        
+        self.assertEqual([budget.spent for budget in budgets], [
+            Decimal('10.00'), Decimal('30.00'), Decimal('70.00'), Decimal('5.00')
+        ])
+        self.assertEqual(budgets[1].remaining, Decimal('70.00'))
+        self.assertEqual(budgets[2].percentage, 50)
+        self.assertEqual(budgets[3].percentage, 0)
+
+    def test_budget_without_spending(self):
+        rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+        budget = Budget.objects.create(user=self.user, category=rent, amount=Decimal('500.00'), period='monthly')
+        
+        attach_budget_progress([budget], self.today)
+        self.assertEqual(budget.spent, 0)
+        self.assertEqual(budget.remaining, Decimal('500.00'))
+
+
+class BudgetAlertTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alertuser', password='testpassword123')
+        self.groceries = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        self.budget = Budget.objects.create(
+            user=self.user, category=self.groceries, amount=Decimal('100.00'), period='monthly'
+        )
+        self.today = timezone.now().date()
+
+    def spend(self, amount, day=None):
+        return Transaction.objects.create(
+            user=self.user, amount=Decimal(amount), category=self.groceries, date=day or self.today
+        )
+
+    def alerts(self):
+        return list(Notification.objects.filter(user=self.user).order_by('id').values_list('notification_type', flat=True))
+
+    def test_thresholds_alert_once_per_period(self):
+        self.spend('40.00')
+        self.assertEqual(self.alerts(), [])
+        
+        self.spend('15.00')
+        self.spend('30.00')
+        self.spend('5.00')
+        self.assertEqual(self.alerts(), ['warning', 'warning'])
+        
+        last = self.spend('20.00')
+        self.assertEqual(self.alerts(), ['warning', 'warning', 'danger'])
+        
+        # Dropping back under a threshold and crossing it again stays quiet
+        last.delete()
+        self.spend('20.00')
+        self.assertEqual(len(self.alerts()), 3)
+        
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.period_spent, Decimal('110.00'))
+        self.assertEqual(self.budget.alerted_threshold, 100)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.unread_notification_count, 3)
+
+    def test_editing_the_budget_rearms_alerts(self):
+        self.spend('85.00')
+        self.assertEqual(self.alerts(), ['warning'])
+        
+        self.budget.amount = Decimal('1000.00')
+        self.budget.save(update_fields=['amount'])
+        self.spend('420.00')
+        self.assertEqual(self.alerts(), ['warning', 'warning'])
+        self.spend('300.00')
+        self.assertEqual(self.alerts(), ['warning', 'warning', 'warning'])
+        
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.alerted_threshold, 80)
+
+    def test_running_spend_updates_only_the_budget(self):
+        self.spend('10.00')
+        transaction = self.spend('10.00')
+        
+        transaction.amount = Decimal('30.00')
+        with self.assertNumQueries(11):
+            transaction.save()
+        
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.period_spent, Decimal('40.00'))
+        # Spending outside the window is ignored
+        self.spend('500.00', self.today - timedelta(days=40))
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.period_spent, Decimal('40.00'))
+
+    def test_new_period_resums_and_resets_alerts(self):
+        self.spend('90.00')
+        Budget.objects.filter(pk=self.budget.pk).update(period_start=date(2000, 1, 1))
+        
+        self.spend('5.00')
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.period_start, self.today.replace(day=1))
+        self.assertEqual(self.budget.period_spent, Decimal('95.00'))
+        self.assertEqual(self.alerts(), ['warning', 'warning'])
+
+    def test_editing_budget_invalidates_running_spend(self):
+        self.spend('60.00')
+        self.budget.amount = Decimal('50.00')
+        self.budget.save()
+        self.assertIsNone(self.budget.period_spent)
+        
+        self.spend('1.00')
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.period_spent, Decimal('61.00'))
+        self.assertEqual(self.budget.alerted_threshold, 100)
+        self.assertEqual(self.alerts(), ['warning', 'danger'])
+
+    def test_currency_change_invalidates_running_spend(self):
+        self.spend('60.00')
+        
+        # Switched without converting the budgets
+        self.user.currency = 'EUR'
+        self.user.save()
+        self.budget.refresh_from_db()
+        self.assertIsNone(self.budget.period_spent)
+        
+        self.spend('1.00')
+        self.budget.refresh_from_db()
+        # 60 USD at the default rate of 0.92, plus 1 EUR
+        self.assertEqual(self.budget.period_spent, Decimal('56.20'))
+        self.assertEqual(attach_budget_progress([self.budget], self.today, currency='EUR')[0].spent, Decimal('56.20'))
+
+    def test_preference_disables_alerts(self):
+        UserPreference.objects.create(user=self.user, receive_budget_alerts=False)
+        self.spend('100.00')
+        
+        self.assertEqual(self.alerts(), [])
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.alerted_threshold, 100)
+
+    def test_bulk_writes_alert_once(self):
+        bulk_write_transactions(self.user, new_transactions=[
+            Transaction(amount=Decimal('30.00'), category=self.groceries, date=self.today)
+            for _ in range(3)
+        ])
+        
+        self.assertEqual(self.alerts(), ['warning'])
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.period_spent, Decimal('90.00'))
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from users.decorators import block_during_currency_conversion
 from .models import Budget, ExpectedIncome
 from .forms import BudgetForm, ExpectedIncomeForm
 
@@ -10,6 +11,7 @@ def budget_list(request):
     return render(request, 'budgets/budget_list.html', {'budgets': budgets})
 
 @login_required
+@block_during_currency_conversion
 def add_budget(request):
     if request.method == 'POST':
         form = BudgetForm(request.user, request.POST)
@@ -25,6 +27,7 @@ def add_budget(request):
     return render(request, 'budgets/budget_form.html', {'form': form, 'title': 'Add Budget'})
 
 @login_required
+@block_during_currency_conversion
 def edit_budget(request, pk):
     budget = get_object_or_404(Budget, pk=pk, user=request.user)
     
@@ -43,6 +46,7 @@ def edit_budget(request, pk):
     })
 
 @login_required
+@block_during_currency_conversion
 def delete_budget(request, pk):
     budget = get_object_or_404(Budget, pk=pk, user=request.user)
     
@@ -59,6 +63,7 @@ def income_list(request):
     return render(request, 'budgets/income_list.html', {'incomes': incomes})
 
 @login_required
+@block_during_currency_conversion
 def add_income(request):
     if request.method == 'POST':
         form = ExpectedIncomeForm(request.POST)
@@ -74,6 +79,7 @@ def add_income(request):
     return render(request, 'budgets/income_form.html', {'form': form, 'title': 'Add Expected Income'})
 
 @login_required
+@block_during_currency_conversion
 def edit_income(request, pk):
     income = get_object_or_404(ExpectedIncome, pk=pk, user=request.user)
     
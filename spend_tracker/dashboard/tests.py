@@ -1,3 +1,97 @@
-from django.test import TestCase
+import threading
+from unittest.mock import Mock, patch
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from decimal import Decimal
+from transactions.models import Category, Transaction
+from budgets.models import Budget
+from spend_tracker.concurrency import can_run_concurrently, run_queries
+from spend_tracker.testing import QueryBudgetMixin
 
-# Create your tests here.
+User = get_user_model()
+
+class DashboardViewTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        salary = Category.objects.create(name='Salary', type='income', user=self.user)
+        groceries = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        today = timezone.now().date()
+        
+        Transaction.objects.create(user=self.user, amount=Decimal('1000.00'), category=salary, date=today)
+        Transaction.objects.create(user=self.user, amount=Decimal('50.00'), category=groceries, date=today)
+        Budget.objects.create(user=self.user, category=groceries, amount=Decimal('200.00'), period='monthly')
+        
+        self.client.force_login(self.user)
+
+    def test_dashboard_totals(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['month_income'], Decimal('1000.00'))
+        self.assertEqual(response.context['month_expenses'], Decimal('50.00'))
+        self.assertEqual(response.context['month_savings'], Decimal('950.00'))
+        self.assertEqual(list(response.context['top_expenses']), [{'category__name': 'Groceries', 'total': Decimal('50.00')}])
+
+    def test_dashboard_query_budget(self):
+        for name in ('Rent', 'Transport', 'Dining', 'Utilities'):
+            category = Category.objects.create(name=name, type='expense', user=self.user)
+            Budget.objects.create(user=self.user, category=category, amount=Decimal('100.00'), period='weekly')
+            Transaction.objects.create(user=self.user, amount=Decimal('5.00'), category=category, date=timezone.now().date())
+        cache.clear()
+        
+        # Session, user, rates, summary, top categories, budgets and their
+        # spending, and recent transactions with their categories
+        self.assertEndpointQueryBudget(reverse('dashboard'), 8)
+
+
+class RunQueriesTest(TestCase):
+    def test_serial_inside_transaction(self):
+        # Other connections could not see this test's uncommitted rows
+        self.assertFalse(can_run_concurrently())
+        user = User.objects.create_user(username='serial', password='testpassword123')
+        
+        count, name = run_queries(
+            lambda: User.objects.count(),
+            lambda: User.objects.get(pk=user.pk).username,
+        )
+        self.assertEqual((count, name), (1, 'serial'))
+
+    def test_concurrent_calls_use_separate_threads(self):
+        barrier = threading.Barrier(3, timeout=5)
+        
+        def wait_for_the_others():
+            # Only returns once all three run at the same time
+            barrier.wait()
+            return threading.get_ident()
+        
+        with patch('spend_tracker.concurrency.can_run_concurrently', return_value=True):
+            threads = run_queries(wait_for_the_others, wait_for_the_others, wait_for_the_others)
+        self.assertEqual(len(set(threads)), 3)
+
+    @override_settings(CONCURRENT_QUERY_WORKERS=1)
+    def test_pool_threads_keep_healthy_connections(self):
+        # With CONN_MAX_AGE 0 request threads close theirs, but pool threads reuse theirs
+        def thread_connection():
+            connection = connections['default']
+            connection.ensure_connection()
+            connection.close = Mock()
+            return connection
+        
+        def broken_connection():
+            connection = thread_connection()
+            connection.errors_occurred = True
+            connection.is_usable = Mock(return_value=False)
+            return connection
+        
+        with patch('spend_tracker.concurrency.can_run_concurrently', return_value=True), \
+                patch('spend_tracker.concurrency._executor', None):
+            healthy, = run_queries(thread_connection)
+            healthy.close.assert_not_called()
+            
+            # Unusable connections are still dropped
+            broken, = run_queries(broken_connection)
+            broken.close.assert_called_once_with()
+        del broken.close, broken.is_usable
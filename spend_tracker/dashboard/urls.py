@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('family/', views.family_dashboard, name='family_dashboard'),
 ]
\ No newline at end of file
@@ -1,98 +1,57 @@
-from django.shortcuts import render
+from asgiref.sync import sync_to_async
+from django.shortcuts import redirect, render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count
 from django.utils import timezone
 from datetime import timedelta
-from transactions.models import Transaction, Category
+from transactions.models import Transaction
+from transactions.services import get_user_period_stats, get_user_top_categories
 from budgets.models import Budget
+from budgets.services import attach_budget_progress
+from users.family import get_family_budgets, get_family_summary
+from users.rates import converted
+from spend_tracker.concurrency import gather_queries
 
 @login_required
-def dashboard(request):
+async def dashboard(request):
+    user = await request.auser()
+    
     # Get current date and date ranges
     today = timezone.now().date()
     start_of_month = today.replace(day=1)
     last_month_start = (start_of_month - timedelta(days=1)).replace(day=1)
     last_month_end = start_of_month - timedelta(days=1)
     
-    # Get recent transactions
-    recent_transactions = Transaction.objects.filter(
-        user=request.user
-    ).order_by('-date')[:5]
-    
-    # Get month-to-date totals
-    month_income = Transaction.objects.filter(
-        user=request.user,
-        date__gte=start_of_month,
-        date__lte=today,
-        category__type='income'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    month_expenses = Transaction.objects.filter(
-        user=request.user,
-        date__gte=start_of_month,
-        date__lte=today,
-        category__type='expense'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Get last month totals for comparison
-    last_month_income = Transaction.objects.filter(
-        user=request.user,
-        date__gte=last_month_start,
-        date__lte=last_month_end,
-        category__type='income'
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    # The recent transactions, totals, top categories and budget progress are
+    # independent, so they are queried at the same time
+    recent_transactions, stats, top_expenses, budgets = await gather_queries(
+        lambda: list(Transaction.objects.filter(
+            user=user
+        ).select_related('category').annotate(
+            converted_amount=converted('amount', user.currency)
+        ).order_by('-date')[:5]),
+        # This month's and last month's totals in one query
+        lambda: get_user_period_stats(user, {
+            'month': (start_of_month, today),
+            'last_month': (last_month_start, last_month_end),
+        }),
+        lambda: get_user_top_categories(user, start_of_month, today),
+        lambda: list(attach_budget_progress(
+            Budget.objects.filter(user=user).select_related('category'), today, user.currency
+        )),
+    )
     
-    last_month_expenses = Transaction.objects.filter(
-        user=request.user,
-        date__gte=last_month_start,
-        date__lte=last_month_end,
-        category__type='expense'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Calculate month-to-date savings
-    month_savings = month_income - month_expenses
-    last_month_savings = last_month_income - last_month_expenses
+    month_income = stats['month']['income']
+    month_expenses = stats['month']['expense']
+    month_savings = stats['month']['savings']
+    last_month_income = stats['last_month']['income']
+    last_month_expenses = stats['last_month']['expense']
+    last_month_savings = stats['last_month']['savings']
     
     # Calculate percentage changes
     income_change = ((month_income - last_month_income) / last_month_income * 100) if last_month_income > 0 else 0
     expense_change = ((month_expenses - last_month_expenses) / last_month_expenses * 100) if last_month_expenses > 0 else 0
     savings_change = ((month_savings - last_month_savings) / last_month_savings * 100) if last_month_savings > 0 else 0
     
-    # Get top expense categories for the current month
-    top_expenses = Transaction.objects.filter(
-        user=request.user,
-        date__gte=start_of_month,
-        date__lte=today,
-        category__type='expense'
-    ).values('category__name').annotate(
-        total=Sum('amount')
-    ).order_by('-total')[:5]
-    
-    # Get budget progress
-    budgets = Budget.objects.filter(user=request.user)
-    
-    for budget in budgets:
-        if budget.period == 'monthly':
-            start_date = start_of_month
-        elif budget.period == 'weekly':
-            # Get the start of the current week (Monday)
-            start_date = today - timedelta(days=today.weekday())
-        else:  # daily
-            start_date = today
-        
-        # Calculate spent amount for this budget period
-        spent = Transaction.objects.filter(
-            user=request.user,
-            category=budget.category,
-            date__gte=start_date,
-            date__lte=today
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Calculate percentage and remaining
-        budget.spent = spent
-        budget.percentage = (spent / budget.amount) * 100 if budget.amount > 0 else 0
-        budget.remaining = budget.amount - spent
-    
     context = {
         'recent_transactions': recent_transactions,
         'month_income': month_income,
@@ -105,4 +64,23 @@ def dashboard(request):
         'budgets': budgets,
     }
     
-    return render(request, 'dashboard/dashboard.html', context)
\ No newline at end of file
+    # Templates read request.user synchronously; hand them the user loaded above
+    request.user = user
+    return await sync_to_async(render)(request, 'dashboard/dashboard.html', context)
+
+@login_required
+def family_dashboard(request):
+    if not request.user.family_id:
+        return redirect('dashboard')
+    
+    family = request.user.family
+    summary = get_family_summary(family, request.user.currency)
+    
+    context = {
+        'family': family,
+        'summary': summary,
+        'top_expenses': summary['top_expenses'],
+        'budgets': get_family_budgets(family),
+    }
+    
+    return render(request, 'dashboard/family_dashboard.html', context)
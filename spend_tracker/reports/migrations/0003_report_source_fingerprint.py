@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 05:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='source_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['user', 'report_type', 'start_date', 'end_date'], name='report_user_period_idx'),
+        ),
+    ]
@@ -13,8 +13,15 @@ class Report(models.Model):
     end_date = models.DateField()
     total_income = models.DecimalField(max_digits=10, decimal_places=2)
     total_expense = models.DecimalField(max_digits=10, decimal_places=2)
+    # Digest of the period's transactions when the report was built
+    source_fingerprint = models.CharField(max_length=32, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'report_type', 'start_date', 'end_date'], name='report_user_period_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.username} - {self.report_type} Report ({self.start_date} to {self.end_date})"
     
@@ -0,0 +1,173 @@
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from transactions.models import DailyCategoryTotal, Transaction
+from spend_tracker.cache import get_user_version_tags
+from users.rates import get_rate_matrix
+from .models import Report, ReportCategory
+
+# Length of each report type's period in days
+REPORT_PERIOD_DAYS = {'weekly': 7, 'monthly': 30}
+
+
+def get_report_period(report_type, today=None):
+    """The (start_date, end_date) a report of this type generated today covers."""
+    end_date = today or timezone.now().date()
+    return end_date - timedelta(days=REPORT_PERIOD_DAYS.get(report_type, 30)), end_date
+
+
+def get_report_totals(user_ids, start_date, end_date, currency=None):
+    """
+    Income, expense and per-category totals for many users over one period,
+    from a single query grouped by (user, category, currency) over the daily
+    rollup. Each currency group's total is converted into the user's
+    currency (or into `currency` for everyone), so the work grows with the
+    groups rather than the rows.
+
+    Returns {user_id: {'income': ..., 'expense': ..., 'categories': [...]}},
+    with categories ordered by amount, largest first. Users without any
+    transactions in the period are absent.
+    """
+    rows = DailyCategoryTotal.objects.filter(
+        user_id__in=user_ids,
+        date__gte=start_date,
+        date__lte=end_date
+    ).values('user_id', 'user__currency', 'category__name', 'transaction_type', 'currency').annotate(
+        total=Sum('amount')
+    ).order_by()
+    
+    matrix = get_rate_matrix()
+    categories = defaultdict(dict)
+    totals = defaultdict(lambda: {'income': 0, 'expense': 0, 'categories': []})
+    for row in rows:
+        target = currency or row['user__currency']
+        amount = (row['total'] * matrix[(row['currency'], target)]).quantize(Decimal('0.01'))
+        user_totals = totals[row['user_id']]
+        if row['transaction_type'] in ('income', 'expense'):
+            user_totals[row['transaction_type']] += amount
+        if row['category__name']:
+            key = (row['category__name'], row['transaction_type'])
+            merged = categories[row['user_id']].setdefault(key, {
+                'category__name': row['category__name'], 'transaction_type': row['transaction_type'], 'total': 0
+            })
+            merged['total'] += amount
+    
+    for user_id, merged in categories.items():
+        totals[user_id]['categories'] = sorted(merged.values(), key=lambda row: row['total'], reverse=True)
+    return totals
+
+
+def get_source_fingerprints(user_ids, start_date, end_date):
+    """
+    A digest per user of the transactions dated within the period, from one
+    grouped query. Adding, editing or deleting any of them changes the count,
+    the total or the latest updated_at, and with it the digest; so does
+    switching the user's currency, which reports are expressed in. The
+    user's cache version covers what the query cannot see: renamed or
+    retyped categories and newly loaded exchange rates.
+    """
+    rows = Transaction.objects.filter(
+        user_id__in=user_ids,
+        date__gte=start_date,
+        date__lte=end_date
+    ).values('user_id', 'user__currency').annotate(
+        count=Count('id'), total=Sum('amount'), last_updated=Max('updated_at')
+    ).order_by()
+    
+    state = {
+        row['user_id']: (row['count'], row['total'], row['last_updated'], row['user__currency'])
+        for row in rows
+    }
+    versions = get_user_version_tags(user_ids)
+    return {
+        user_id: hashlib.md5(repr((state.get(user_id, (0, None, None)), versions[user_id])).encode()).hexdigest()
+        for user_id in user_ids
+    }
+
+
+def build_reports(user_ids, report_type, start_date, end_date):
+    """
+    Return one report per user for the period, keyed by user id. Each has
+    `reused` set when it already existed.
+
+    A user's latest existing report for the same type and period is reused
+    when none of the period's transactions changed since it was built.
+    Everyone else gets a new report: totals come from one grouped query and
+    reports and their categories are written with bulk_create.
+    """
+    user_ids = list(user_ids)
+    fingerprints = get_source_fingerprints(user_ids, start_date, end_date)
+    
+    existing = Report.objects.filter(
+        user_id__in=user_ids,
+        report_type=report_type,
+        start_date=start_date,
+        end_date=end_date,
+        source_fingerprint__in=set(fingerprints.values())
+    ).order_by('created_at')
+    
+    results = {
+        report.user_id: report
+        for report in existing
+        if report.source_fingerprint == fingerprints[report.user_id]
+    }
+    for report in results.values():
+        report.reused = True
+    
+    stale_ids = [user_id for user_id in user_ids if user_id not in results]
+    if not stale_ids:
+        return results
+    
+    totals = get_report_totals(stale_ids, start_date, end_date)
+    
+    reports = [
+        Report(
+            user_id=user_id,
+            report_type=report_type,
+            start_date=start_date,
+            end_date=end_date,
+            total_income=totals[user_id]['income'] if user_id in totals else 0,
+            total_expense=totals[user_id]['expense'] if user_id in totals else 0,
+            source_fingerprint=fingerprints[user_id]
+        )
+        for user_id in stale_ids
+    ]
+    
+    with transaction.atomic():
+        Report.objects.bulk_create(reports)
+        if reports[0].pk is None:
+            # Backends such as MySQL return no primary keys from a bulk INSERT
+            created = Report.objects.filter(
+                user_id__in=stale_ids,
+                report_type=report_type,
+                start_date=start_date,
+                end_date=end_date,
+                source_fingerprint__in={report.source_fingerprint for report in reports}
+            ).order_by('created_at')
+            by_user = {report.user_id: report for report in created}
+            reports = [by_user[report.user_id] for report in reports]
+        ReportCategory.objects.bulk_create([
+            ReportCategory(
+                report=report,
+                category_name=row['category__name'],
+                amount=row['total'],
+                transaction_type=row['transaction_type']
+            )
+            for report in reports if report.user_id in totals
+            for row in totals[report.user_id]['categories']
+        ])
+    
+    for report in reports:
+        report.reused = False
+    results.update((report.user_id, report) for report in reports)
+    return results
+
+
+def build_report(user, report_type, today=None):
+    """Build, or reuse, the user's report of this type for the period ending today."""
+    start_date, end_date = get_report_period(report_type, today)
+    return build_reports([user.pk], report_type, start_date, end_date)[user.pk]
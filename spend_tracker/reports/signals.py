@@ -0,0 +1,29 @@
+import time
+from celery.signals import task_failure, task_postrun, task_prerun
+from spend_tracker.metrics import TASK_DURATION, TASK_FAILURES
+
+# Start times of the report tasks running in this process, by task id
+_started = {}
+
+
+def _is_report_task(task):
+    return bool(task) and task.name.startswith('reports.tasks.')
+
+
+@task_prerun.connect
+def start_task_timer(sender=None, task_id=None, **kwargs):
+    if _is_report_task(sender):
+        _started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(sender=None, task_id=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if _is_report_task(sender) and started is not None:
+        TASK_DURATION.observe(time.perf_counter() - started, task=sender.name, state=state or 'UNKNOWN')
+
+
+@task_failure.connect
+def count_task_failure(sender=None, **kwargs):
+    if _is_report_task(sender):
+        TASK_FAILURES.inc(task=sender.name)
@@ -1,81 +1,80 @@
-from celery import shared_task
-from django.utils import timezone
-from django.db.models import Sum
-from django.core.mail import send_mail
+from celery import chord, shared_task
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.contrib.auth import get_user_model
-from datetime import timedelta
-from .models import Report, ReportCategory
-from transactions.models import Transaction
+from datetime import date
+from .services import build_reports, get_report_period
 
 User = get_user_model()
 
+# Users handled by one worker task; each chunk costs a fixed number of queries
+WEEKLY_REPORT_CHUNK_SIZE = 500
+
 @shared_task
 def generate_weekly_reports():
-    """Generate weekly reports for all users and send email notifications."""
-    today = timezone.now().date()
-    start_date = today - timedelta(days=7)
+    """Fan weekly report generation out across workers in chunks of users."""
+    start_date, today = get_report_period('weekly')
     
     # Get all users who want weekly reports
-    users = User.objects.filter(preferences__receive_weekly_reports=True)
+    user_ids = list(User.objects.filter(
+        preferences__receive_weekly_reports=True
+    ).order_by('pk').values_list('pk', flat=True))
+    
+    chunks = [
+        user_ids[i:i + WEEKLY_REPORT_CHUNK_SIZE]
+        for i in range(0, len(user_ids), WEEKLY_REPORT_CHUNK_SIZE)
+    ]
+    if not chunks:
+        return "Generated weekly reports for 0 users"
+    
+    chord(
+        generate_weekly_report_chunk.s(chunk, start_date.isoformat(), today.isoformat())
+        for chunk in chunks
+    )(summarize_weekly_reports.s())
+    
+    return f"Dispatched weekly reports for {len(user_ids)} users in {len(chunks)} chunks"
+
+@shared_task
+def generate_weekly_report_chunk(user_ids, start_date, end_date):
+    """Build and email weekly reports for one chunk of users."""
+    start_date = date.fromisoformat(start_date)
+    end_date = date.fromisoformat(end_date)
+    
+    reports = build_reports(user_ids, 'weekly', start_date, end_date)
+    users = User.objects.filter(pk__in=user_ids).exclude(email='').only('pk', 'username', 'email')
     
+    # Send email notifications over a single connection
+    messages = []
     for user in users:
-        # Get transactions for the past week
-        transactions = Transaction.objects.filter(
-            user=user,
-            date__gte=start_date,
-            date__lte=today
-        )
-        
-        # Calculate totals
-        income_total = transactions.filter(category__type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-        expense_total = transactions.filter(category__type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
+        report = reports[user.pk]
+        context = {
+            'user': user,
+            'report': report,
+            'start_date': start_date,
+            'end_date': end_date,
+            'income_total': report.total_income,
+            'expense_total': report.total_expense,
+            'net_amount': report.net_amount
+        }
         
-        # Create report
-        report = Report.objects.create(
-            user=user,
-            report_type='weekly',
-            start_date=start_date,
-            end_date=today,
-            total_income=income_total,
-            total_expense=expense_total
+        message = EmailMultiAlternatives(
+            subject=f'Your Weekly Spending Report ({start_date} to {end_date})',
+            body=f'Your weekly report is ready. Total Income: {report.total_income}, Total Expenses: {report.total_expense}',
+            from_email='noreply@spendtracker.com',
+            to=[user.email]
         )
-        
-        # Create report categories
-        category_data = transactions.values('category__name', 'category__type').annotate(
-            total=Sum('amount')
-        ).order_by('-total')
-        
-        for item in category_data:
-            if item['category__name']:
-                ReportCategory.objects.create(
-                    report=report,
-                    category_name=item['category__name'],
-                    amount=item['total'],
-                    transaction_type=item['category__type']
-                )
-        
-        # Send email notification
-        if user.email:
-            context = {
-                'user': user,
-                'report': report,
-                'start_date': start_date,
-                'end_date': today,
-                'income_total': income_total,
-                'expense_total': expense_total,
-                'net_amount': income_total - expense_total
-            }
-            
-            html_message = render_to_string('reports/email/weekly_report.html', context)
-            
-            send_mail(
-                subject=f'Your Weekly Spending Report ({start_date} to {today})',
-                message=f'Your weekly report is ready. Total Income: {income_total}, Total Expenses: {expense_total}',
-                from_email='noreply@spendtracker.com',
-                recipient_list=[user.email],
-                html_message=html_message
-            )
+        message.attach_alternative(render_to_string('reports/email/weekly_report.html', context), 'text/html')
+        messages.append(message)
+    
+    sent = get_connection().send_messages(messages) if messages else 0
     
-    return f"Generated weekly reports for {users.count()} users"
+    return {'users': len(user_ids), 'reports': len(reports), 'emails': sent or 0}
 
+@shared_task
+def summarize_weekly_reports(chunk_stats):
+    """Chord callback that adds up the per-chunk statistics."""
+    totals = {'chunks': len(chunk_stats), 'users': 0, 'reports': 0, 'emails': 0}
+    for stats in chunk_stats:
+        for key in ('users', 'reports', 'emails'):
+            totals[key] += stats[key]
+    return totals
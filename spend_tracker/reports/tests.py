@@ -1,3 +1,132 @@
+from unittest.mock import patch
+from django.db import connection
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core import mail
+from decimal import Decimal
+from datetime import date
+from transactions.models import Category, Transaction
+from users.models import UserPreference
+from users.rates import get_rate_matrix
+from spend_tracker.cache import bump_global_version
+from spend_tracker.celery import app
+from spend_tracker.metrics import registry
+from .models import Report, ReportCategory
+from .services import build_reports
+from .tasks import generate_weekly_reports, generate_weekly_report_chunk
 
-# Create your tests here.
+User = get_user_model()
+
+class ReportTestMixin:
+    def create_user_with_transactions(self, username, email=''):
+        user = User.objects.create_user(username=username, email=email, password='testpassword123')
+        UserPreference.objects.create(user=user)
+        salary = Category.objects.create(name='Salary', type='income', user=user)
+        groceries = Category.objects.create(name='Groceries', type='expense', user=user)
+        
+        Transaction.objects.create(user=user, amount=Decimal('1000.00'), category=salary, date=date(2025, 5, 12))
+        Transaction.objects.create(user=user, amount=Decimal('50.00'), category=groceries, date=date(2025, 5, 13))
+        Transaction.objects.create(user=user, amount=Decimal('25.00'), category=groceries, date=date(2025, 5, 14))
+        # Outside the report period
+        Transaction.objects.create(user=user, amount=Decimal('99.00'), category=groceries, date=date(2025, 4, 1))
+        return user
+
+class BuildReportsTest(ReportTestMixin, TestCase):
+    def test_reports_for_many_users_in_constant_queries(self):
+        users = [self.create_user_with_transactions(f'user{i}') for i in range(3)]
+        idle = User.objects.create_user(username='idle', password='testpassword123')
+        # Rates are loaded once per process, not per report run
+        get_rate_matrix()
+        
+        with self.assertNumQueries(7):
+            reports = build_reports([user.pk for user in users] + [idle.pk], 'weekly', date(2025, 5, 10), date(2025, 5, 17))
+        
+        report = reports[users[0].pk]
+        self.assertEqual(report.total_income, Decimal('1000.00'))
+        self.assertEqual(report.total_expense, Decimal('75.00'))
+        self.assertEqual(
+            list(report.categories.values_list('category_name', 'amount', 'transaction_type')),
+            [('Salary', Decimal('1000.00'), 'income'), ('Groceries', Decimal('75.00'), 'expense')]
+        )
+        self.assertEqual(reports[idle.pk].total_expense, 0)
+        self.assertEqual(ReportCategory.objects.count(), 6)
+
+    def test_backend_without_returned_ids(self):
+        users = [self.create_user_with_transactions(f'user{i}') for i in range(2)]
+        
+        with patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            reports = build_reports([user.pk for user in users], 'weekly', date(2025, 5, 10), date(2025, 5, 17))
+        
+        for user in users:
+            report = reports[user.pk]
+            self.assertEqual(report.user_id, user.pk)
+            self.assertEqual(report.categories.count(), 2)
+            self.assertFalse(report.reused)
+
+    def test_unchanged_period_reuses_report(self):
+        user = self.create_user_with_transactions('user')
+        first = build_reports([user.pk], 'weekly', date(2025, 5, 10), date(2025, 5, 17))[user.pk]
+        
+        with self.assertNumQueries(2):
+            again = build_reports([user.pk], 'weekly', date(2025, 5, 10), date(2025, 5, 17))[user.pk]
+        self.assertEqual(again.pk, first.pk)
+        
+        # A different period or any change to the period's transactions builds a new report
+        monthly = build_reports([user.pk], 'monthly', date(2025, 5, 10), date(2025, 5, 17))[user.pk]
+        self.assertNotEqual(monthly.pk, first.pk)
+        
+        # New exchange rates or renamed categories change the report too
+        bump_global_version()
+        rated = build_reports([user.pk], 'weekly', date(2025, 5, 10), date(2025, 5, 17))[user.pk]
+        self.assertFalse(rated.reused)
+        self.assertTrue(build_reports([user.pk], 'weekly', date(2025, 5, 10), date(2025, 5, 17))[user.pk].reused)
+        
+        Transaction.objects.filter(user=user, amount=Decimal('25.00')).delete()
+        rebuilt = build_reports([user.pk], 'weekly', date(2025, 5, 10), date(2025, 5, 17))[user.pk]
+        self.assertNotEqual(rebuilt.pk, first.pk)
+        self.assertEqual(rebuilt.total_expense, Decimal('50.00'))
+        self.assertEqual(Report.objects.filter(user=user, report_type='weekly').count(), 3)
+
+class WeeklyReportTaskTest(ReportTestMixin, TestCase):
+    def setUp(self):
+        self.previous_eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+
+    def tearDown(self):
+        app.conf.task_always_eager = self.previous_eager
+
+    def test_chunk_builds_reports_and_sends_email(self):
+        with_email = self.create_user_with_transactions('withemail', 'user@example.com')
+        without_email = self.create_user_with_transactions('noemail')
+        
+        stats = generate_weekly_report_chunk([with_email.pk, without_email.pk], '2025-05-10', '2025-05-17')
+        
+        self.assertEqual(stats, {'users': 2, 'reports': 2, 'emails': 1})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+
+    def test_weekly_reports_fan_out(self):
+        self.create_user_with_transactions('first', 'first@example.com')
+        opted_out = self.create_user_with_transactions('second')
+        opted_out.preferences.receive_weekly_reports = False
+        opted_out.preferences.save()
+        
+        result = generate_weekly_reports()
+        
+        self.assertEqual(result, 'Dispatched weekly reports for 1 users in 1 chunks')
+        self.assertEqual(Report.objects.filter(report_type='weekly').count(), 1)
+
+    def test_task_metrics(self):
+        def samples(metric):
+            return registry.snapshot().get(metric, {})
+        
+        chunk = 'reports.tasks.generate_weekly_report_chunk'
+        before = samples('celery_task_duration_seconds').get((chunk, 'SUCCESS'), [0])[-1]
+        generate_weekly_report_chunk.delay([], '2025-05-10', '2025-05-17')
+        self.assertEqual(samples('celery_task_duration_seconds')[(chunk, 'SUCCESS')][-1], before + 1)
+        
+        failures = samples('celery_task_failures_total').get((chunk,), [0])[0]
+        result = generate_weekly_report_chunk.apply(args=[[], 'not a date', '2025-05-17'])
+        self.assertTrue(result.failed())
+        self.assertEqual(samples('celery_task_failures_total')[(chunk,)][0], failures + 1)
+        self.assertIn((chunk, 'FAILURE'), samples('celery_task_duration_seconds'))
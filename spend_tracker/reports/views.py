@@ -1,10 +1,7 @@
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
-from django.db.models import Sum
-from datetime import timedelta
-from .models import Report, ReportCategory
-from transactions.models import Transaction
+from .models import Report
+from .services import build_report
 
 @login_required
 def report_list(request):
@@ -40,47 +37,7 @@ def report_detail(request, pk):
 @login_required
 def generate_report(request):
     if request.method == 'POST':
-        report_type = request.POST.get('report_type')
-        days = 7 if report_type == 'weekly' else 30
-        
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=days)
-        
-        # Get transactions for the period
-        transactions = Transaction.objects.filter(
-            user=request.user,
-            date__gte=start_date,
-            date__lte=end_date
-        )
-        
-        # Calculate totals
-        income_total = transactions.filter(category__type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-        expense_total = transactions.filter(category__type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        # Create report
-        report = Report.objects.create(
-            user=request.user,
-            report_type=report_type,
-            start_date=start_date,
-            end_date=end_date,
-            total_income=income_total,
-            total_expense=expense_total
-        )
-        
-        # Create report categories
-        category_data = transactions.values('category__name', 'category__type').annotate(
-            total=Sum('amount')
-        ).order_by('-total')
-        
-        for item in category_data:
-            if item['category__name']:
-                ReportCategory.objects.create(
-                    report=report,
-                    category_name=item['category__name'],
-                    amount=item['total'],
-                    transaction_type=item['category__type']
-                )
-        
+        report = build_report(request.user, request.POST.get('report_type'))
         return redirect('report_detail', pk=report.pk)
     
     return render(request, 'reports/generate_report.html')
\ No newline at end of file
@@ -2,6 +2,8 @@
 ASGI config for spend_tracker project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Async views such as the dashboard run on the event loop when served from
+here, e.g. with ``uvicorn spend_tracker.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,111 @@
+"""
+Versioned per-user cache for computed views.
+
+Every key embeds the user's current version number (and a global one for
+shared data such as default categories). Writes bump the version instead of
+deleting keys, so stale entries are never read again and simply expire.
+"""
+import hashlib
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+USER_CACHE_TIMEOUT = 60 * 15
+GLOBAL_VERSION_KEY = 'cache-version:global'
+
+
+def _user_version_key(user_id):
+    return f'cache-version:user:{user_id}'
+
+
+def _bump(version_key):
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        # Unknown or evicted version; any fresh starting point invalidates old keys
+        cache.set(version_key, time.time_ns(), timeout=None)
+
+
+def _bump_now_and_on_commit(version_key):
+    # The commit-time bump stops a concurrent reader from caching
+    # pre-commit data under the version bumped mid-transaction.
+    _bump(version_key)
+    transaction.on_commit(lambda: _bump(version_key))
+
+
+def bump_user_version(user_id):
+    """Invalidate everything cached for one user."""
+    _bump_now_and_on_commit(_user_version_key(user_id))
+
+
+def bump_global_version():
+    """Invalidate everything cached for every user."""
+    _bump_now_and_on_commit(GLOBAL_VERSION_KEY)
+
+
+def _get_versions(*user_ids):
+    keys = [GLOBAL_VERSION_KEY] + [_user_version_key(user_id) for user_id in user_ids]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock so a version lost to eviction never repeats
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_global_version():
+    """Current global version, for in-process caches of shared data."""
+    version = cache.get(GLOBAL_VERSION_KEY)
+    if version is None:
+        cache.add(GLOBAL_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(GLOBAL_VERSION_KEY)
+    return version
+
+
+def get_user_version_tag(user_id):
+    """
+    Opaque marker that changes whenever anything cached for the user is
+    invalidated. Costs one cache round trip and no database queries.
+    """
+    return '{}-{}'.format(*_get_versions(user_id))
+
+
+def get_user_version_tags(user_ids):
+    """get_user_version_tag for many users, {user_id: tag}, in one cache round trip."""
+    user_ids = list(user_ids)
+    global_version, *versions = _get_versions(*user_ids)
+    return {user_id: f'{global_version}-{version}' for user_id, version in zip(user_ids, versions)}
+
+
+def cached_for_user(user_id, name, compute, *key_parts, timeout=USER_CACHE_TIMEOUT):
+    """
+    Return `compute()` for this user, cached under the user's current version.
+    `key_parts` distinguish variants of the same value (dates, filters, ...).
+    """
+    global_version, user_version = _get_versions(user_id)
+    digest = hashlib.md5(repr(key_parts).encode()).hexdigest()
+    key = f'user:{user_id}:{global_version}:{user_version}:{name}:{digest}'
+    
+    return _get_or_compute(key, compute, timeout)
+
+
+def cached_for_family(family_id, member_ids, name, compute, *key_parts, timeout=USER_CACHE_TIMEOUT):
+    """
+    Like cached_for_user, for a value computed over several members' data.
+    The key embeds every member's version, so a write by any of them (or a
+    change of membership) reads as a miss. Costs one cache round trip.
+    """
+    member_ids = sorted(member_ids)
+    versions = _get_versions(*member_ids)
+    state = hashlib.md5(repr((member_ids, versions)).encode()).hexdigest()
+    digest = hashlib.md5(repr(key_parts).encode()).hexdigest()
+    return _get_or_compute(f'family:{family_id}:{state}:{name}:{digest}', compute, timeout)
+
+
+def _get_or_compute(key, compute, timeout):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
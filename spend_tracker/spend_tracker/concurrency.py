@@ -0,0 +1,93 @@
+"""
+Run independent read-only queries at the same time.
+
+Django's async ORM hands every query to one shared thread, so gathering
+async queries still runs them one after another. gather_queries instead
+runs each callable on a pool thread with its own database connection, so
+a page made of several aggregates takes about as long as the slowest one.
+The pool is small and fixed, and each thread keeps its connection between
+calls, since opening one costs about as much as a small aggregate. It is
+only replaced once it breaks or outlives a non-zero CONN_MAX_AGE.
+
+A connection inside a transaction is the exception: other connections
+cannot see its uncommitted writes, so the callables then run one by one on
+the caller's connection, as they do on an in-memory SQLite database,
+which each new connection would see empty.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULT_QUERY_WORKERS = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'CONCURRENT_QUERY_WORKERS', DEFAULT_QUERY_WORKERS),
+                thread_name_prefix='queries',
+            )
+    return _executor
+
+
+def can_run_concurrently(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if connection.in_atomic_block:
+        return False
+    return not (connection.vendor == 'sqlite' and connection.is_in_memory_db())
+
+
+def _drop_stale_connections():
+    """
+    Close this thread's connections that are broken, left mid-transaction,
+    or older than a non-zero CONN_MAX_AGE. Unlike close_old_connections, a
+    CONN_MAX_AGE of 0 does not close them: that setting is about request
+    threads, which come and go, while pool threads are few and long-lived.
+    """
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is None:
+            continue
+        # Let CONN_HEALTH_CHECKS test it again before the next query
+        connection.health_check_done = False
+        if connection.get_autocommit() != connection.settings_dict['AUTOCOMMIT']:
+            connection.close()
+        elif connection.errors_occurred and not connection.is_usable():
+            connection.close()
+        elif connection.settings_dict['CONN_MAX_AGE'] and time.monotonic() >= connection.close_at:
+            connection.close()
+        else:
+            connection.errors_occurred = False
+
+
+def _on_own_connection(func):
+    # run_in_executor does not copy context, so this thread has its own connections.
+    # No request signals fire here, so check them around every call instead
+    _drop_stale_connections()
+    try:
+        return func()
+    finally:
+        _drop_stale_connections()
+
+
+async def gather_queries(*funcs, using=DEFAULT_DB_ALIAS):
+    """Call each of `funcs` (no arguments, returning evaluated results) and return their results in order."""
+    if not can_run_concurrently(using):
+        return [await sync_to_async(func)() for func in funcs]
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(
+        *(loop.run_in_executor(_get_executor(), _on_own_connection, func) for func in funcs)
+    ))
+
+
+def run_queries(*funcs, using=DEFAULT_DB_ALIAS):
+    """gather_queries for synchronous callers such as DRF views."""
+    return async_to_sync(gather_queries)(*funcs, using=using)
@@ -0,0 +1,149 @@
+"""
+Per-request SQL instrumentation.
+
+QueryRecorder is a database execute wrapper that counts and times every
+query and groups them by fingerprint (the SQL with parameter lists
+collapsed), so one statement repeated per row of a loop, the usual N+1
+shape, shows up as a single fingerprint with a high count. The middleware
+reports each request's numbers as a Server-Timing header and a JSON log
+line and feeds the latency and query metrics in spend_tracker.metrics;
+spend_tracker.testing uses the same recorder for query budgets.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+from .metrics import DB_QUERIES, REQUEST_LATENCY, REQUEST_QUERIES
+
+logger = logging.getLogger('spend_tracker.requests')
+
+DEFAULT_QUERY_REPEAT_THRESHOLD = 5
+
+# "IN (%s, %s, %s)" and multi-row VALUES differ only in length
+_PARAMETER_LIST = re.compile(r'(%s|\?)(\s*,\s*(%s|\?))+')
+
+
+def get_repeat_threshold():
+    return getattr(settings, 'QUERY_REPEAT_THRESHOLD', DEFAULT_QUERY_REPEAT_THRESHOLD)
+
+
+def fingerprint(sql):
+    """Short stable id for a statement, ignoring parameter values and list lengths."""
+    return hashlib.md5(_PARAMETER_LIST.sub('%s', sql).encode()).hexdigest()[:12]
+
+
+class QueryRecorder:
+    """Execute wrapper recording (sql, milliseconds) for every query it sees."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - started) * 1000))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(ms for _, ms in self.queries)
+
+    def repeated(self, threshold=None):
+        """
+        Fingerprints executed at least `threshold` times, most frequent first,
+        as dicts of fingerprint, count and an example of the SQL.
+        """
+        threshold = threshold or get_repeat_threshold()
+        counts = Counter()
+        examples = {}
+        for sql, _ in self.queries:
+            key = fingerprint(sql)
+            counts[key] += 1
+            examples.setdefault(key, sql)
+        return [
+            {'fingerprint': key, 'count': count, 'sql': examples[key]}
+            for key, count in counts.most_common()
+            if count >= threshold
+        ]
+
+
+@contextmanager
+def record_queries(using=None):
+    """Record the queries run inside the block on one or every database connection."""
+    recorder = QueryRecorder()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records the SQL query count, SQL time, repeated query fingerprints and
+    view time of every request. Logs one JSON line per request, at WARNING
+    when some query repeats QUERY_REPEAT_THRESHOLD times or more, and adds
+    a Server-Timing header when SERVER_TIMING_HEADERS is on. Keep it first
+    in MIDDLEWARE so the numbers cover the other middleware too. The body
+    of a streaming response is produced after this returns, and queries on
+    spend_tracker.concurrency's pool threads use other connections; neither
+    is counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        request._view_started = None
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        view_started = request._view_started or started
+        # The URL pattern name keeps metric labels bounded, unlike the path
+        view = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+        metrics = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration, 2),
+            'view_ms': round((finished - view_started) * 1000, 2),
+            'total_ms': round((finished - started) * 1000, 2),
+            'repeated': recorder.repeated(),
+        }
+        logger.log(logging.WARNING if metrics['repeated'] else logging.INFO, json.dumps(metrics))
+        REQUEST_LATENCY.observe(finished - started, view=view, status=response.status_code)
+        REQUEST_QUERIES.observe(recorder.count, view=view)
+        DB_QUERIES.inc(recorder.count, view=view)
+
+        if getattr(settings, 'SERVER_TIMING_HEADERS', False):
+            response['Server-Timing'] = self.server_timing(metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
+
+    @staticmethod
+    def server_timing(metrics):
+        entries = [
+            f'db;dur={metrics["db_ms"]};desc="{metrics["queries"]} queries"',
+            f'view;dur={metrics["view_ms"]}',
+            f'total;dur={metrics["total_ms"]}',
+        ]
+        if metrics['repeated']:
+            keys = ' '.join(f'{row["fingerprint"]}x{row["count"]}' for row in metrics['repeated'])
+            entries.append(f'repeated;desc="{keys}"')
+        return ', '.join(entries)
@@ -0,0 +1,219 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms live in a per-process registry. When
+settings.METRICS_DIR is set, every process also writes its values to its
+own file there (at most every METRICS_FLUSH_INTERVAL seconds and at exit),
+and the exposition sums the files of all processes, so web and Celery
+workers are scraped as one. Files are replaced atomically, so a reader
+never sees a half-written one. Clear the directory when deploying, as the
+values are cumulative.
+"""
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from django.conf import settings
+
+DEFAULT_FLUSH_INTERVAL = 5
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+TASK_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Metric(ABC):
+    """A named series family; subclasses define how a value starts and is exposed."""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def empty(self):
+        """A new series' value: a list of numbers updated in place."""
+
+    @abstractmethod
+    def samples(self, labels, value):
+        """Yield the (name, labels, number) exposition lines for one series."""
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def empty(self):
+        return [0]
+
+    def inc(self, amount=1, **labels):
+        registry.update(self, self.key(labels), lambda value: value.__setitem__(0, value[0] + amount))
+
+    def samples(self, labels, value):
+        yield self.name, labels, value[0]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def empty(self):
+        # One count per bucket, then the sum and the total count
+        return [0] * len(self.buckets) + [0, 0]
+
+    def observe(self, amount, **labels):
+        def add(value):
+            for index, bound in enumerate(self.buckets):
+                if amount <= bound:
+                    value[index] += 1
+            value[-2] += amount
+            value[-1] += 1
+        registry.update(self, self.key(labels), add)
+
+    def samples(self, labels, value):
+        for index, bound in enumerate(self.buckets):
+            yield f'{self.name}_bucket', labels + [('le', _format_number(bound))], value[index]
+        yield f'{self.name}_bucket', labels + [('le', '+Inf')], value[-1]
+        yield f'{self.name}_sum', labels, value[-2]
+        yield f'{self.name}_count', labels, value[-1]
+
+
+class Registry:
+    """Metric definitions plus this process's values, {metric name: {label values: numbers}}."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.values = {}
+        self.pid = os.getpid()
+        self.flushed_at = time.monotonic()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def update(self, metric, key, change):
+        with self.lock:
+            if self.pid != os.getpid():
+                # A forked child must not report its parent's values again
+                self._reset()
+            series = self.values.setdefault(metric.name, {})
+            if key not in series:
+                series[key] = metric.empty()
+            change(series[key])
+        if time.monotonic() - self.flushed_at >= getattr(settings, 'METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL):
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self._reset()
+            return {name: {key: list(value) for key, value in series.items()} for name, series in self.values.items()}
+
+    def flush(self):
+        """Write this process's values to its file in METRICS_DIR, if one is configured."""
+        directory = getattr(settings, 'METRICS_DIR', None)
+        self.flushed_at = time.monotonic()
+        if not directory:
+            return
+        data = {
+            name: [[list(key), value] for key, value in series.items()]
+            for name, series in self.snapshot().items()
+        }
+        os.makedirs(directory, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(handle, 'w') as output:
+            json.dump(data, output)
+        os.replace(temporary, os.path.join(directory, f'metrics-{os.getpid()}.json'))
+
+    def collect(self):
+        """Values summed over every process that wrote to METRICS_DIR, and this one."""
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return self.snapshot()
+
+        self.flush()
+        merged = {}
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            try:
+                with open(path) as handle:
+                    data = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            for name, series in data.items():
+                target = merged.setdefault(name, {})
+                for key, value in series:
+                    key = tuple(key)
+                    if key in target:
+                        target[key] = [a + b for a, b in zip(target[key], value)]
+                    else:
+                        target[key] = value
+        return merged
+
+    def expose(self):
+        """Every registered metric in the Prometheus text format."""
+        values = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(values.get(name, {}).items()):
+                labels = list(zip(metric.labelnames, key))
+                for sample, sample_labels, number in metric.samples(labels, value):
+                    lines.append(f'{sample}{_format_labels(sample_labels)} {_format_number(number)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_number(number):
+    if isinstance(number, float) and not number.is_integer():
+        return repr(number)
+    return str(int(number))
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def counter(name, documentation, labelnames=()):
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+REQUEST_LATENCY = histogram(
+    'http_request_duration_seconds', 'Time spent handling requests', ['view', 'status']
+)
+REQUEST_QUERIES = histogram(
+    'http_request_queries', 'SQL queries run per request', ['view'], buckets=QUERY_BUCKETS
+)
+DB_QUERIES = counter('db_queries_total', 'SQL queries run while handling requests', ['view'])
+TASK_DURATION = histogram(
+    'celery_task_duration_seconds', 'Celery task run time', ['task', 'state'], buckets=TASK_BUCKETS
+)
+TASK_FAILURES = counter('celery_task_failures_total', 'Celery task runs that raised', ['task'])
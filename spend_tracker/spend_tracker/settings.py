@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,9 +49,11 @@ INSTALLED_APPS = [
     'dashboard',
     # 'templatetags',
     'wallet',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    'spend_tracker.instrumentation.QueryInstrumentationMiddleware',
     # 'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -106,6 +109,26 @@ DATABASES = {
 #     }
 # }
 
+# Cache
+# Redis in production (set REDIS_CACHE_URL), local memory for development and tests
+
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL')
+
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'spend-tracker',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -188,6 +211,41 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Request instrumentation (spend_tracker.instrumentation): a statement run this
+# many times in one request is flagged as a likely N+1
+QUERY_REPEAT_THRESHOLD = 5
+# Expose per-request SQL counts and timings to clients as Server-Timing headers
+SERVER_TIMING_HEADERS = DEBUG
+
+# Metrics (spend_tracker.metrics, served at /api/metrics/ to staff): with a
+# directory set, every web and worker process writes its values there and
+# the endpoint sums them; without one it reports only the serving process
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+
+# Threads (each with its own database connection) that run the independent
+# aggregates of the dashboard and summaries concurrently, see spend_tracker.concurrency
+CONCURRENT_QUERY_WORKERS = 8
+
+# Statement uploads too large to import during the request are saved here for
+# the Celery worker (transactions.imports), so workers must see the same directory
+IMPORT_UPLOAD_DIR = os.environ.get('IMPORT_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'spend_tracker_imports'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One JSON line per request; INFO logs every request, WARNING only flagged ones
+        'spend_tracker.requests': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Budget alerts: percentages of a budget that trigger one notification per period
+BUDGET_ALERT_THRESHOLDS = [50, 80, 100]
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # In production, specify the allowed origins
 CORS_ALLOW_CREDENTIALS = True
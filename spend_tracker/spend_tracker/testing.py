@@ -0,0 +1,29 @@
+"""
+Test helpers. QueryBudgetMixin lets a TestCase declare how many queries a
+block or an endpoint may run; exceeding the budget fails the test with the
+statements that ran and the ones that repeated.
+"""
+from contextlib import contextmanager
+from .instrumentation import record_queries
+
+
+class QueryBudgetMixin:
+    @contextmanager
+    def assertQueryBudget(self, budget, using=None):
+        with record_queries(using) as recorder:
+            yield recorder
+        if recorder.count > budget:
+            lines = [f'{recorder.count} queries executed, budget is {budget}:']
+            lines += [f'{index}. {sql}' for index, (sql, _) in enumerate(recorder.queries, 1)]
+            repeated = recorder.repeated()
+            if repeated:
+                lines.append('Repeated statements (likely N+1):')
+                lines += [f'{row["count"]}x {row["sql"]}' for row in repeated]
+            self.fail('\n'.join(lines))
+
+    def assertEndpointQueryBudget(self, url, budget, method='get', status_code=200, **kwargs):
+        """Request `url` with self.client and fail if it needs more than `budget` queries."""
+        with self.assertQueryBudget(budget):
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertEqual(response.status_code, status_code, f'{method.upper()} {url}')
+        return response
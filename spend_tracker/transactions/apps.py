@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def reinstall_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .search import install_search_index
+    install_search_index(connections[using])
 
 
 class TransactionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'transactions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(reinstall_search_index, sender=self)
@@ -0,0 +1,71 @@
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from spend_tracker.cache import bump_user_version
+from .categories import get_user_category_map
+from .models import Transaction
+from .rollups import ROLLUP_FIELDS, adjust_daily_totals, defer_daily_totals
+from .tombstones import record_deletions
+
+BULK_BATCH_SIZE = 500
+
+
+def get_allowed_categories(user, category_ids):
+    """Which of the given categories the user may assign, from the category registry."""
+    allowed = get_user_category_map(user) if category_ids else {}
+    return {pk: allowed[pk] for pk in category_ids if pk in allowed}
+
+
+def bulk_write_transactions(user, new_transactions=(), changed_transactions=(), delete_ids=()):
+    """
+    Insert, update and delete many of a user's transactions in one atomic
+    block, keeping the daily rollup in step with grouped upserts.
+
+    `new_transactions` are unsaved Transaction instances, `changed_transactions`
+    are instances already loaded and modified in memory, and `delete_ids` are
+    primary keys. Returns the ids that were actually deleted.
+    """
+    new_transactions = list(new_transactions)
+    # A row listed twice would be added to the rollup twice but subtracted once
+    changed_transactions = list({item.pk: item for item in changed_transactions}.values())
+    now = timezone.now()
+    
+    for item in new_transactions + changed_transactions:
+        item.user = user
+        item.currency = item.currency or user.currency
+        item.transaction_type = item.category.type if item.category_id else None
+        item.search_document = item.build_search_document()
+    
+    with db_transaction.atomic(), defer_daily_totals():
+        if new_transactions:
+            Transaction.objects.bulk_create(new_transactions, batch_size=BULK_BATCH_SIZE)
+            adjust_daily_totals(new_transactions)
+        
+        if changed_transactions:
+            previous = Transaction.objects.filter(
+                pk__in=[item.pk for item in changed_transactions]
+            ).values(*ROLLUP_FIELDS)
+            adjust_daily_totals(previous, sign=-1)
+            
+            for item in changed_transactions:
+                item.updated_at = now
+            Transaction.objects.bulk_update(
+                changed_transactions,
+                [
+                    'amount', 'currency', 'category', 'transaction_type',
+                    'description', 'search_document', 'date', 'updated_at',
+                ],
+                batch_size=BULK_BATCH_SIZE
+            )
+            adjust_daily_totals(changed_transactions)
+        
+        deleted_ids = []
+        if delete_ids:
+            doomed = Transaction.objects.filter(user=user, pk__in=delete_ids)
+            removed = list(doomed.values('pk', *ROLLUP_FIELDS))
+            doomed.delete()
+            adjust_daily_totals(removed, sign=-1)
+            deleted_ids = [row['pk'] for row in removed]
+            record_deletions('transaction', user.pk, deleted_ids)
+    
+    bump_user_version(user.pk)
+    return deleted_ids
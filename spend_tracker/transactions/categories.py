@@ -0,0 +1,40 @@
+"""
+Category registry. Default categories are held in process memory and each
+user's own categories in the shared cache, so forms, serializers and views
+resolve categories without querying. Category writes bump the cache
+versions (see transactions.signals), which invalidates both layers.
+"""
+from spend_tracker.cache import cached_for_user, get_global_version
+from .models import Category
+
+# (global cache version, default categories) for this process
+_defaults = (None, [])
+
+
+def get_default_categories():
+    """Default categories, reloaded only after a default category changes."""
+    global _defaults
+    version = get_global_version()
+    if _defaults[0] != version:
+        _defaults = (version, list(Category.objects.filter(is_default=True).order_by('pk')))
+    return _defaults[1]
+
+
+def get_user_categories(user, category_type=None):
+    """
+    The categories a user may assign, i.e. their own plus the defaults,
+    in id order. Pass `category_type` ('income' or 'expense') to narrow.
+    """
+    own = cached_for_user(
+        user.pk, 'own_categories',
+        lambda: list(Category.objects.filter(user=user, is_default=False).order_by('pk'))
+    )
+    categories = sorted(get_default_categories() + own, key=lambda category: category.pk)
+    if category_type:
+        categories = [category for category in categories if category.type == category_type]
+    return categories
+
+
+def get_user_category_map(user):
+    """get_user_categories keyed by id."""
+    return {category.pk: category for category in get_user_categories(user)}
@@ -0,0 +1,72 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('date', 'date'),
+    ('amount', 'amount'),
+    ('currency', 'currency'),
+    ('type', 'transaction_type'),
+    ('category', 'category__name'),
+    ('description', 'description'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+EXPORT_CHUNK_SIZE = 2000
+# Leading characters that make spreadsheet apps evaluate a CSV cell
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the generator."""
+    def write(self, value):
+        return value
+
+
+def export_rows(transactions):
+    """
+    Yield export rows as tuples, read through a server-side cursor in chunks
+    so memory stays flat whatever the size of the history.
+    """
+    fields = [field for _, field in EXPORT_COLUMNS]
+    return transactions.order_by('date', 'id').values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def escape_formula(value):
+    """
+    Prefix text a spreadsheet would run as a formula with a quote, so
+    a description such as "=HYPERLINK(...)" is shown, not executed.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(transactions):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in export_rows(transactions):
+        yield writer.writerow([escape_formula(value) for value in row])
+
+
+def iter_ndjson(transactions):
+    headers = [header for header, _ in EXPORT_COLUMNS]
+    for row in export_rows(transactions):
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_response(transactions, file_format='csv'):
+    """Stream a transaction queryset as a CSV or NDJSON attachment."""
+    rows = iter_ndjson(transactions) if file_format == 'ndjson' else iter_csv(transactions)
+    filename = f'transactions-{timezone.now().date().isoformat()}.{file_format}'
+    
+    response = StreamingHttpResponse(rows, content_type=EXPORT_FORMATS[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,23 +1,61 @@
 from django import forms
-from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+from .categories import get_user_categories
 from .models import Transaction, Category
 
+class CategoryChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for category in self.field.categories.values():
+            yield self.choice(category)
+    
+    def __len__(self):
+        return len(self.field.categories) + (self.field.empty_label is not None)
+
+class CategoryChoiceField(forms.ModelChoiceField):
+    """
+    Category select fed from the category registry rather than a queryset,
+    so rendering and validating it run no queries. Call set_categories()
+    with the categories the user may pick.
+    """
+    iterator = CategoryChoiceIterator
+    
+    def __init__(self, queryset=None, **kwargs):
+        super().__init__(queryset=Category.objects.none(), **kwargs)
+        self.categories = {}
+    
+    def set_categories(self, categories):
+        self.categories = {category.pk: category for category in categories}
+    
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.categories[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+
 class TransactionForm(forms.ModelForm):
     class Meta:
         model = Transaction
         fields = ['amount', 'category', 'description', 'date']
+        field_classes = {'category': CategoryChoiceField}
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date'}),
         }
     
     def __init__(self, user, *args, **kwargs):
         super(TransactionForm, self).__init__(*args, **kwargs)
-        # Filter categories to show only user's categories and default ones
-        self.fields['category'].queryset = Category.objects.filter(
-            Q(user=user) | Q(is_default=True)
-        )
+        # Only offer the user's categories and default ones
+        self.fields['category'].set_categories(get_user_categories(user))
 
 class CategoryForm(forms.ModelForm):
     class Meta:
         model = Category
-        fields = ['name', 'type']
\ No newline at end of file
+        fields = ['name', 'type']
@@ -0,0 +1,401 @@
+"""
+Bank statement import from CSV and OFX files.
+
+Statements are read line by line and written in batches through
+bulk_write_transactions, so memory stays flat and the daily rollup is
+updated with grouped upserts. Every imported row stores a digest of its
+content in Transaction.import_hash, unique per user: the bank's own id
+when the statement has one (OFX FITID, a CSV id column), otherwise the
+date, signed amount, currency and description plus how many identical
+rows came before it in the file, so two real coffees on the same day
+both survive. Importing the same or an overlapping statement again only
+adds the rows that are new.
+
+Negative amounts are expenses and positive amounts income, unless the CSV
+has debit/credit columns or a type column (as in our own export). A row's
+category is matched by name among the user's categories of that type,
+falling back to the category given for the import, if any.
+"""
+import codecs
+import csv
+import hashlib
+import html
+import os
+import re
+import uuid
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError
+from users.models import CustomUser
+from .bulk import bulk_write_transactions
+from .categories import get_user_categories
+from .models import Transaction
+
+IMPORT_FORMATS = ('csv', 'ofx')
+IMPORT_BATCH_SIZE = 5000
+# Lookups of existing hashes stay below SQLite's bound-parameter limit
+HASH_LOOKUP_CHUNK = 900
+MAX_REPORTED_ERRORS = 20
+# Transaction.amount has 10 digits, 2 of them decimals
+MAX_AMOUNT = Decimal('100000000')
+
+# Header names recognised for each field, compared case-insensitively
+CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'posted date', 'posting date', 'booking date', 'value date'),
+    'amount': ('amount', 'value'),
+    'debit': ('debit', 'withdrawal', 'money out', 'paid out'),
+    'credit': ('credit', 'deposit', 'money in', 'paid in'),
+    'type': ('type',),
+    'description': ('description', 'memo', 'payee', 'details', 'narrative', 'name'),
+    'category': ('category',),
+    'currency': ('currency',),
+    'reference': ('id', 'reference', 'transaction id', 'fitid'),
+}
+# Values of a type column that say which side a row is on; others are ignored
+TYPE_VALUES = {'income': 'income', 'credit': 'income', 'expense': 'expense', 'debit': 'expense'}
+
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def detect_format(filename):
+    """'ofx' for .ofx and .qfx files, 'csv' otherwise."""
+    return 'ofx' if os.path.splitext(filename or '')[1].lower() in ('.ofx', '.qfx') else 'csv'
+
+
+def read_lines(handle, encoding='utf-8-sig'):
+    """
+    Decode a binary file line by line, whatever its line endings.
+    Yields (bytes read so far, line) so callers can report progress.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    position = 0
+    for raw in File(handle):
+        position += len(raw)
+        yield position, decoder.decode(raw)
+
+
+def resolve_columns(header, columns=None):
+    """Map each field to its index in the CSV header, using `columns` ({field: header}) first."""
+    positions = {name.strip().lower(): index for index, name in enumerate(header)}
+    columns = {field: name.strip().lower() for field, name in (columns or {}).items() if name}
+    unknown = set(columns) - set(CSV_COLUMNS)
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}.')
+
+    index = {}
+    for field, aliases in CSV_COLUMNS.items():
+        if field in columns:
+            if columns[field] not in positions:
+                raise ValueError(f'Column "{columns[field]}" not found in the header.')
+            index[field] = positions[columns[field]]
+            continue
+        found = next((positions[alias] for alias in aliases if alias in positions), None)
+        if found is not None:
+            index[field] = found
+
+    if 'date' not in index:
+        raise ValueError('The CSV has no date column.')
+    if not {'amount', 'debit', 'credit'} & set(index):
+        raise ValueError('The CSV has no amount, debit or credit column.')
+    return index
+
+
+def read_csv(lines, columns=None):
+    """
+    Yield (position, label, fields) for each row of a CSV statement, where
+    fields maps CSV_COLUMNS keys to raw strings. The delimiter is sniffed
+    from the header line.
+    """
+    first = next(lines, None)
+    if first is None:
+        return
+    position, header_line = first
+    try:
+        dialect = csv.Sniffer().sniff(header_line, delimiters=',;\t|')
+    except csv.Error:
+        dialect = csv.excel
+
+    # The reader pulls lines itself, as a quoted field may span several
+    state = {'position': position}
+    def text():
+        yield header_line
+        for state['position'], line in lines:
+            yield line
+
+    reader = csv.reader(text(), dialect)
+    try:
+        index = resolve_columns(next(reader), columns)
+        for row in reader:
+            if not any(value.strip() for value in row):
+                continue
+            fields = {field: row[i].strip() for field, i in index.items() if i < len(row)}
+            yield state['position'], f'Line {reader.line_num}', fields
+    except csv.Error as exc:
+        raise ValueError(f'Line {reader.line_num}: {exc}')
+
+
+def read_ofx(lines):
+    """
+    Yield (position, label, fields) for each STMTTRN of an OFX statement,
+    SGML (OFX 1.x, leaf tags left open) or XML (OFX 2.x) alike.
+    """
+    currency = account = ''
+    fields = None
+    count = 0
+    position = 0
+    pending = ''
+
+    def tags(text):
+        for closing, name, value in _OFX_TAG.findall(text):
+            yield bool(closing), name.upper(), html.unescape(value.strip())
+
+    def finish(fields):
+        name, memo = fields.get('NAME', ''), fields.get('MEMO', '')
+        fitid = fields.get('FITID', '')
+        return {
+            'date': fields.get('DTPOSTED', '')[:8],
+            'amount': fields.get('TRNAMT', ''),
+            'description': f'{name} {memo}' if name and memo and memo != name else name or memo,
+            'currency': currency,
+            'reference': f'{account}:{fitid}' if fitid else '',
+        }
+
+    def chunks():
+        nonlocal position, pending
+        for position, line in lines:
+            text = pending + line
+            # The value of the last tag may go on in the next line
+            cut = text.rfind('<')
+            if cut <= 0:
+                pending = text
+                continue
+            pending = text[cut:]
+            yield text[:cut]
+        yield pending
+
+    for text in chunks():
+        for closing, name, value in tags(text):
+            if name == 'STMTTRN':
+                if fields is not None:
+                    count += 1
+                    yield position, f'Transaction {count}', finish(fields)
+                fields = None if closing else {}
+            elif closing:
+                continue
+            elif fields is not None:
+                fields[name] = value
+            elif name == 'CURDEF':
+                currency = value
+            elif name == 'ACCTID':
+                account = value
+    if fields is not None:
+        count += 1
+        yield position, f'Transaction {count}', finish(fields)
+
+
+def parse_amount(text):
+    """Decimal from a bank amount such as "-1,234.50", "(12.00)", "$ 9.99" or "1.234,50"."""
+    value = text.strip()
+    negative = value.startswith('(') and value.endswith(')')
+    value = re.sub(r'[^\d.,+-]', '', value)
+    comma = value.rfind(',')
+    if comma > value.rfind('.') and len(value) - comma != 4:
+        # A decimal comma, with any dots grouping thousands
+        value = value.replace('.', '').replace(',', '.')
+    else:
+        value = value.replace(',', '')
+    try:
+        amount = Decimal(value).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f'invalid amount "{text}"')
+    return -amount if negative else amount
+
+
+def parse_date(text, date_format=None):
+    text = text.strip()
+    try:
+        if date_format:
+            return datetime.strptime(text, date_format).date()
+        if len(text) == 8 and text.isdigit():
+            return datetime.strptime(text, '%Y%m%d').date()
+        return date.fromisoformat(text)
+    except ValueError:
+        hint = '' if date_format else ' (pass the date format for non-ISO dates)'
+        raise ValueError(f'invalid date "{text}"{hint}')
+
+
+class StatementImporter:
+    """
+    Turns statement rows into a user's transactions in batches, skipping
+    rows imported before. `income_category` and `expense_category` are the
+    categories for rows whose own category is missing or unknown.
+    """
+
+    def __init__(self, user, date_format=None, income_category=None, expense_category=None,
+                 batch_size=IMPORT_BATCH_SIZE):
+        self.user = user
+        self.date_format = date_format
+        self.batch_size = batch_size
+        self.fallbacks = {'income': income_category, 'expense': expense_category}
+        self.categories = {
+            category_type: {
+                category.name.lower(): category
+                for category in reversed(get_user_categories(user, category_type))
+            }
+            for category_type in ('income', 'expense')
+        }
+        self.currencies = {code for code, _ in CustomUser.CURRENCY_CHOICES}
+        self.occurrences = Counter()
+        self.result = {'read': 0, 'created': 0, 'duplicates': 0, 'errors': 0, 'error_messages': []}
+
+    def run(self, rows, total=None, on_progress=None):
+        """Import (position, label, fields) rows; returns the counts in self.result."""
+        batch = []
+        position = 0
+        for position, label, fields in rows:
+            self.result['read'] += 1
+            try:
+                batch.append(self.build_transaction(fields))
+            except ValueError as exc:
+                self.result['errors'] += 1
+                if len(self.result['error_messages']) < MAX_REPORTED_ERRORS:
+                    self.result['error_messages'].append(f'{label}: {exc}')
+                continue
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+                if on_progress:
+                    on_progress(position, total, self.counts())
+        if batch:
+            self.write(batch)
+        if on_progress:
+            on_progress(total or position, total, self.counts())
+        return self.result
+
+    def counts(self):
+        return {key: value for key, value in self.result.items() if key != 'error_messages'}
+
+    def build_transaction(self, fields):
+        day = parse_date(fields.get('date', ''), self.date_format)
+
+        if fields.get('amount'):
+            amount = parse_amount(fields['amount'])
+        elif fields.get('credit'):
+            amount = abs(parse_amount(fields['credit']))
+        elif fields.get('debit'):
+            amount = -abs(parse_amount(fields['debit']))
+        else:
+            raise ValueError('no amount')
+
+        transaction_type = TYPE_VALUES.get(fields.get('type', '').lower())
+        if transaction_type:
+            amount = abs(amount) if transaction_type == 'income' else -abs(amount)
+        else:
+            transaction_type = 'expense' if amount < 0 else 'income'
+        if not amount:
+            raise ValueError('amount is zero')
+        if abs(amount) >= MAX_AMOUNT:
+            raise ValueError(f'amount {amount} is too large')
+
+        currency = fields.get('currency', '').upper() or self.user.currency
+        if currency not in self.currencies:
+            raise ValueError(f'unknown currency "{currency}"')
+
+        description = ' '.join(fields.get('description', '').split())[:255]
+        category = self.categories[transaction_type].get(fields.get('category', '').lower())
+
+        if fields.get('reference'):
+            key = f'ref|{fields["reference"]}'
+        else:
+            key = f'{day.isoformat()}|{amount}|{currency}|{description.lower()}'
+            self.occurrences[key] += 1
+            key = f'{key}|{self.occurrences[key]}'
+
+        return Transaction(
+            amount=abs(amount),
+            currency=currency,
+            category=category or self.fallbacks[transaction_type],
+            description=description,
+            date=day,
+            import_hash=hashlib.sha256(key.encode()).hexdigest(),
+        )
+
+    def existing_hashes(self, hashes):
+        hashes = list(hashes)
+        found = set()
+        for start in range(0, len(hashes), HASH_LOOKUP_CHUNK):
+            found.update(Transaction.objects.filter(
+                user=self.user, import_hash__in=hashes[start:start + HASH_LOOKUP_CHUNK]
+            ).values_list('import_hash', flat=True))
+        return found
+
+    def write(self, batch):
+        # A statement may repeat a bank id; the first row wins
+        unique = {}
+        for transaction in batch:
+            unique.setdefault(transaction.import_hash, transaction)
+
+        for attempt in range(2):
+            existing = self.existing_hashes(unique)
+            new_transactions = [item for key, item in unique.items() if key not in existing]
+            try:
+                bulk_write_transactions(self.user, new_transactions)
+                break
+            except IntegrityError:
+                # Another import of the same statement inserted some rows first
+                if attempt:
+                    raise
+
+        self.result['created'] += len(new_transactions)
+        self.result['duplicates'] += len(batch) - len(new_transactions)
+
+
+def import_statement(user, handle, file_format='csv', columns=None, date_format=None,
+                     income_category=None, expense_category=None, batch_size=IMPORT_BATCH_SIZE,
+                     on_progress=None):
+    """
+    Import a CSV or OFX statement from the binary file `handle` into the
+    user's transactions. `columns` maps CSV_COLUMNS fields to header names
+    the defaults do not recognise. `on_progress(done, total, counts)` is
+    called after every batch with bytes read and the file size.
+
+    Returns the number of rows read, created, skipped as duplicates and
+    rejected, plus messages for the first rejected rows. Raises ValueError
+    if the file cannot be read as the given format.
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f'Expected one of: {", ".join(IMPORT_FORMATS)}.')
+
+    lines = read_lines(handle)
+    if file_format == 'ofx':
+        # OFX dates always start with YYYYMMDD
+        rows, date_format = read_ofx(lines), None
+    else:
+        rows = read_csv(lines, columns)
+    importer = StatementImporter(
+        user, date_format=date_format, income_category=income_category,
+        expense_category=expense_category, batch_size=batch_size
+    )
+    try:
+        total = File(handle).size
+    except (AttributeError, OSError, TypeError):
+        total = None
+    return importer.run(rows, total, on_progress)
+
+
+def save_upload(upload):
+    """
+    Copy an uploaded statement to IMPORT_UPLOAD_DIR for a Celery worker
+    to import, keeping its extension; returns the path.
+    """
+    directory = settings.IMPORT_UPLOAD_DIR
+    os.makedirs(directory, exist_ok=True)
+    extension = os.path.splitext(upload.name or '')[1].lower()
+    path = os.path.join(directory, f'{uuid.uuid4().hex}{extension}')
+    with open(path, 'wb') as output:
+        for chunk in upload.chunks():
+            output.write(chunk)
+    return path
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from transactions.categories import get_user_categories
+from transactions.imports import CSV_COLUMNS, IMPORT_BATCH_SIZE, IMPORT_FORMATS, detect_format, import_statement
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = (
+        'Imports a CSV or OFX bank statement into a user\'s transactions. Rows imported '
+        'before are skipped, so the same or overlapping statements can be imported again'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User to import the transactions for')
+        parser.add_argument('path', help='CSV or OFX statement file')
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            help='File format (default: ofx for .ofx and .qfx files, csv otherwise)',
+        )
+        parser.add_argument(
+            '--column',
+            action='append',
+            default=[],
+            metavar='FIELD=HEADER',
+            help=f'CSV header to read a field from (may be repeated); fields: {", ".join(CSV_COLUMNS)}',
+        )
+        parser.add_argument('--date-format', help='strptime format of CSV dates (default: ISO 8601)')
+        parser.add_argument('--income-category', help='Category name for income rows without a known category')
+        parser.add_argument('--expense-category', help='Category name for expense rows without a known category')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User does not exist: {options["username"]}')
+
+        columns = {}
+        for item in options['column']:
+            field, separator, header = item.partition('=')
+            if not separator:
+                raise CommandError(f'Expected FIELD=HEADER, got "{item}"')
+            columns[field.strip()] = header
+
+        def report_progress(done, total, counts):
+            self.stdout.write(f'{counts["read"]} rows read, {counts["created"]} created')
+
+        try:
+            with open(options['path'], 'rb') as handle:
+                result = import_statement(
+                    user, handle,
+                    options['format'] or detect_format(options['path']),
+                    columns=columns,
+                    date_format=options['date_format'],
+                    income_category=self.get_category(user, 'income', options['income_category']),
+                    expense_category=self.get_category(user, 'expense', options['expense_category']),
+                    batch_size=options['batch_size'],
+                    on_progress=report_progress,
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Could not import statement: {exc}')
+
+        for message in result['error_messages']:
+            self.stderr.write(message)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result["created"]} transactions; skipped {result["duplicates"]} duplicates '
+            f'and {result["errors"]} invalid rows'
+        ))
+
+    def get_category(self, user, category_type, name):
+        if not name:
+            return None
+        for category in get_user_categories(user, category_type):
+            if category.name.lower() == name.lower():
+                return category
+        raise CommandError(f'No {category_type} category named "{name}"')
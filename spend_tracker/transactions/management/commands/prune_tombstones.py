@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from transactions.tombstones import TOMBSTONE_RETENTION, prune_tombstones
+
+class Command(BaseCommand):
+    help = (
+        f'Deletes sync tombstones older than the {TOMBSTONE_RETENTION.days} day retention window, '
+        'past which sync clients resync in full'
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from transactions.rollups import rebuild_daily_totals
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily category totals rollup from raw transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help='Only rebuild totals for this username (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        usernames = options['usernames']
+        users = None
+        
+        if usernames:
+            users = list(User.objects.filter(username__in=usernames))
+            missing = set(usernames) - {user.username for user in users}
+            if missing:
+                raise CommandError(f'User(s) do not exist: {", ".join(sorted(missing))}')
+        
+        written = rebuild_daily_totals(users)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} daily category totals'))
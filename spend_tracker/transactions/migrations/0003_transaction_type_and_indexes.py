@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 04:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_transaction_type(apps, schema_editor):
+    Category = apps.get_model('transactions', 'Category')
+    Transaction = apps.get_model('transactions', 'Transaction')
+    Transaction.objects.filter(category__isnull=False).update(
+        transaction_type=Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('type')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='transaction_type',
+            field=models.CharField(blank=True, choices=[('income', 'Income'), ('expense', 'Expense')], editable=False, max_length=10, null=True),
+        ),
+        migrations.RunPython(populate_transaction_type, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'date'], name='transaction_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'transaction_type', 'date', 'amount'], name='transaction_user_type_date_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2 on 2026-10-18 04:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_daily_totals(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    DailyCategoryTotal = apps.get_model('transactions', 'DailyCategoryTotal')
+    grouped = Transaction.objects.values(
+        'user_id', 'category_id', 'transaction_type', 'date'
+    ).annotate(total=Sum('amount'), count=Count('id')).order_by()
+    batch = []
+    for row in grouped.iterator(chunk_size=1000):
+        batch.append(DailyCategoryTotal(
+            user_id=row['user_id'],
+            category_id=row['category_id'],
+            transaction_type=row['transaction_type'],
+            date=row['date'],
+            amount=row['total'],
+            transaction_count=row['count'],
+        ))
+        if len(batch) >= 1000:
+            DailyCategoryTotal.objects.bulk_create(batch)
+            batch = []
+    DailyCategoryTotal.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_transaction_type_and_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategoryTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_type', models.CharField(blank=True, choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10, null=True)),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='transactions.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'transaction_type', 'date', 'amount'], name='daily_total_user_type_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'category', 'date'), name='daily_total_user_category_date_uniq'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'date'), name='daily_total_user_uncategorized_date_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_daily_totals, migrations.RunPython.noop),
+    ]
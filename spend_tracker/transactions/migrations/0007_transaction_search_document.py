@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-18 05:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Trim
+
+
+def populate_search_document(apps, schema_editor):
+    Category = apps.get_model('transactions', 'Category')
+    Transaction = apps.get_model('transactions', 'Transaction')
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1])
+    Transaction.objects.update(search_document=Trim(Concat(
+        'description', Value(' '), Coalesce(category_name, Value('')), output_field=models.TextField()
+    )))
+
+
+def create_search_index(apps, schema_editor):
+    from transactions.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from transactions.search import FTS_TABLE
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS transaction_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_sync_watermarks_and_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-18 05:29
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_currency(apps, schema_editor):
+    # Stored amounts were kept in the owner's currency until now
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    owner_currency = Subquery(User.objects.filter(pk=OuterRef('user_id')).values('currency')[:1])
+    for model_name in ('Transaction', 'DailyCategoryTotal'):
+        apps.get_model('transactions', model_name).objects.update(currency=owner_currency)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_transaction_search_document'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='dailycategorytotal',
+            name='daily_total_user_category_date_uniq',
+        ),
+        migrations.RemoveConstraint(
+            model_name='dailycategorytotal',
+            name='daily_total_user_uncategorized_date_uniq',
+        ),
+        migrations.AddField(
+            model_name='dailycategorytotal',
+            name='currency',
+            field=models.CharField(choices=[('USD', 'US Dollar ($)'), ('EUR', 'Euro (€)'), ('GBP', 'British Pound (£)'), ('JPY', 'Japanese Yen (¥)'), ('INR', 'Indian Rupee (₹)'), ('KES', 'Kenyan Shilling (KSh)'), ('NGN', 'Nigerian Naira (₦)'), ('ZAR', 'South African Rand (R)'), ('GHS', 'Ghanaian Cedi (GH₵)'), ('EGP', 'Egyptian Pound (E£)'), ('MAD', 'Moroccan Dirham (MAD)'), ('TZS', 'Tanzanian Shilling (TSh)'), ('UGX', 'Ugandan Shilling (USh)'), ('XOF', 'West African CFA Franc (CFA)'), ('XAF', 'Central African CFA Franc (FCFA)')], default='USD', max_length=3),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='currency',
+            field=models.CharField(blank=True, choices=[('USD', 'US Dollar ($)'), ('EUR', 'Euro (€)'), ('GBP', 'British Pound (£)'), ('JPY', 'Japanese Yen (¥)'), ('INR', 'Indian Rupee (₹)'), ('KES', 'Kenyan Shilling (KSh)'), ('NGN', 'Nigerian Naira (₦)'), ('ZAR', 'South African Rand (R)'), ('GHS', 'Ghanaian Cedi (GH₵)'), ('EGP', 'Egyptian Pound (E£)'), ('MAD', 'Moroccan Dirham (MAD)'), ('TZS', 'Tanzanian Shilling (TSh)'), ('UGX', 'Ugandan Shilling (USh)'), ('XOF', 'West African CFA Franc (CFA)'), ('XAF', 'Central African CFA Franc (FCFA)')], max_length=3),
+        ),
+        migrations.RunPython(populate_currency, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailycategorytotal',
+            constraint=models.UniqueConstraint(fields=('user', 'category', 'date', 'currency'), name='daily_total_user_category_date_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategorytotal',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'date', 'currency'), name='daily_total_user_uncategorized_date_uniq'),
+        ),
+    ]
@@ -1,5 +1,16 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Concat, Trim
+from django.utils import timezone
+from users.models import CustomUser
+
+def search_document_expression(category_name):
+    """SQL equivalent of Transaction.build_search_document for a known category name."""
+    if not category_name:
+        return models.F('description')
+    return Trim(Concat('description', Value(' '), Value(category_name), output_field=models.TextField()))
+
 
 class Category(models.Model):
     CATEGORY_TYPES = (
@@ -11,25 +22,159 @@ class Category(models.Model):
     type = models.CharField(max_length=10, choices=CATEGORY_TYPES)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
     is_default = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = 'Categories'
+        indexes = [
+            # Delta sync reads rows changed since a watermark
+            models.Index(fields=['user', 'updated_at'], name='category_user_updated_idx'),
+        ]
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        previous = None
+        if self.pk:
+            previous = Category.objects.filter(pk=self.pk).values('type', 'name').first()
+        
+        super().save(*args, **kwargs)
+        
+        # Keep the denormalized type and search text on this category's transactions in sync
+        if previous and previous['type'] != self.type:
+            Transaction.objects.filter(category=self).update(transaction_type=self.type, updated_at=timezone.now())
+            DailyCategoryTotal.objects.filter(category=self).update(transaction_type=self.type)
+        if previous and previous['name'] != self.name:
+            Transaction.objects.filter(category=self).update(
+                search_document=search_document_expression(self.name), updated_at=timezone.now()
+            )
 
 class Transaction(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # Currency the amount was recorded in, the user's currency unless given;
+    # totals convert into the viewer's currency at read time (see users.rates)
+    currency = models.CharField(max_length=3, choices=CustomUser.CURRENCY_CHOICES, blank=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
+    # Denormalized copy of category.type so per-user aggregates avoid the JOIN
+    transaction_type = models.CharField(max_length=10, choices=Category.CATEGORY_TYPES, null=True, blank=True, editable=False)
     description = models.CharField(max_length=255, blank=True)
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Description plus category name, indexed for full-text search (see transactions.search)
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Digest of the statement row a transaction was imported from, so importing
+    # the same statement again skips it (see transactions.imports)
+    import_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'import_hash'],
+                condition=models.Q(import_hash__isnull=False),
+                name='transaction_user_import_hash_uniq'
+            ),
+        ]
+        indexes = [
+            # Keyset pagination walks (date, id) within a user
+            models.Index(fields=['user', 'date', 'id'], name='transaction_user_date_id_idx'),
+            # Trailing amount makes month-to-date sums index-only on every backend
+            models.Index(fields=['user', 'transaction_type', 'date', 'amount'], name='transaction_user_type_date_idx'),
+            # Delta sync reads rows changed since a watermark
+            models.Index(fields=['user', 'updated_at'], name='transaction_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.amount} - {self.category.name if self.category else 'No category'}"
     
-    @property
-    def transaction_type(self):
-        return self.category.type if self.category else None
\ No newline at end of file
+    def build_search_document(self):
+        return ' '.join(filter(None, [self.description, self.category.name if self.category_id else '']))
+    
+    def save(self, *args, **kwargs):
+        if not self.currency:
+            self.currency = self.user.currency
+        self.transaction_type = self.category.type if self.category_id else None
+        self.search_document = self.build_search_document()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'category' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'transaction_type', 'search_document'}
+        elif update_fields is not None and 'description' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_document'}
+        # Daily totals are adjusted by signals; keep them in the same transaction
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+
+class DailyCategoryTotal(models.Model):
+    """
+    Per-user, per-category daily rollup of transactions, maintained on every
+    transaction write so period aggregates read a handful of rows instead of
+    scanning raw history. Uncategorized transactions roll up with no category.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    transaction_type = models.CharField(max_length=10, choices=Category.CATEGORY_TYPES, null=True, blank=True)
+    date = models.DateField()
+    # Amounts are summed per original currency and converted when read
+    currency = models.CharField(max_length=3, choices=CustomUser.CURRENCY_CHOICES)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'date', 'currency'], name='daily_total_user_category_date_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'date', 'currency'],
+                condition=models.Q(category__isnull=True),
+                name='daily_total_user_uncategorized_date_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'transaction_type', 'date', 'amount'], name='daily_total_user_type_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.date} - {self.category or 'No category'} - {self.amount}"
+
+
+class Tombstone(models.Model):
+    """
+    Deletion log for delta sync: one row per deleted transaction, category,
+    budget or expected income, so clients learn about deletions without
+    re-downloading everything. Default categories are logged without a user.
+    """
+    RECORD_TYPES = (
+        ('transaction', 'Transaction'),
+        ('category', 'Category'),
+        ('budget', 'Budget'),
+        ('income', 'Expected income'),
+    )
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    record_type = models.CharField(max_length=20, choices=RECORD_TYPES)
+    record_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.record_type} {self.record_id} deleted at {self.deleted_at}"
+
+
+class StatementImport(models.Model):
+    """
+    A statement import queued for a Celery worker, recording who may poll
+    the task's status from any web process.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    task_id = models.CharField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Import {self.task_id} for {self.user.username}"
@@ -0,0 +1,45 @@
+import base64
+from datetime import date
+from django.db.models import Q
+
+
+def encode_cursor(transaction):
+    """Opaque cursor pointing just past the given transaction."""
+    raw = f'{transaction.date.isoformat()}|{transaction.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (date, id) position stored in a cursor, or raise ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        day, pk = raw.split('|')
+        return date.fromisoformat(day), int(pk)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def paginate_by_date(queryset, cursor=None, page_size=50, ascending=False):
+    """
+    Keyset-paginate a transaction queryset on (date, id).
+
+    Each page is a range scan on the (user, date, id) index that starts at
+    the cursor, so the cost of a page does not depend on how deep into a
+    user's history it is. Returns (transactions, next_cursor); next_cursor
+    is None on the last page.
+    """
+    if ascending:
+        queryset = queryset.order_by('date', 'id')
+    else:
+        queryset = queryset.order_by('-date', '-id')
+    
+    if cursor:
+        day, pk = decode_cursor(cursor)
+        if ascending:
+            queryset = queryset.filter(Q(date__gt=day) | Q(date=day, id__gt=pk))
+        else:
+            queryset = queryset.filter(Q(date__lt=day) | Q(date=day, id__lt=pk))
+    
+    page = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
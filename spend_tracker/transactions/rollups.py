@@ -0,0 +1,157 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.dispatch import Signal
+from spend_tracker.cache import bump_global_version, bump_user_version
+from .models import DailyCategoryTotal, Transaction
+
+REBUILD_BATCH_SIZE = 1000
+ROLLUP_FIELDS = ('user_id', 'category_id', 'transaction_type', 'date', 'currency', 'amount')
+
+_deferred = threading.local()
+
+# Sent with `changes`, a list of (user_id, category_id, date, currency, amount) deltas,
+# whenever transaction writes move money into or out of the rollup
+daily_totals_changed = Signal()
+# Sent with `users` (None for everyone) once the rollup was recomputed
+daily_totals_rebuilt = Signal()
+
+
+@contextmanager
+def defer_daily_totals():
+    """
+    Silence the per-row rollup signals inside the block. The caller is then
+    responsible for calling adjust_daily_totals for the rows it wrote.
+    """
+    previous = getattr(_deferred, 'active', False)
+    _deferred.active = True
+    try:
+        yield
+    finally:
+        _deferred.active = previous
+
+
+def daily_totals_deferred():
+    return getattr(_deferred, 'active', False)
+
+
+def apply_daily_total(user_id, category_id, transaction_type, date, currency, amount, count):
+    """
+    Add `amount` and `count` (either may be negative) to a single daily
+    rollup row, creating the row on first use and dropping it once empty.
+    """
+    rows = DailyCategoryTotal.objects.filter(
+        user_id=user_id, category_id=category_id, date=date, currency=currency
+    )
+    changes = {
+        'amount': F('amount') + amount,
+        'transaction_count': F('transaction_count') + count,
+        'transaction_type': transaction_type,
+    }
+    
+    with transaction.atomic():
+        if not rows.update(**changes):
+            try:
+                with transaction.atomic():
+                    DailyCategoryTotal.objects.create(
+                        user_id=user_id,
+                        category_id=category_id,
+                        transaction_type=transaction_type,
+                        date=date,
+                        currency=currency,
+                        amount=amount,
+                        transaction_count=count
+                    )
+            except IntegrityError:
+                # Another writer created the row first
+                rows.update(**changes)
+        
+        if count < 0:
+            rows.filter(transaction_count__lte=0).delete()
+
+
+def adjust_daily_totals(transactions, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) many transactions from the rollup with
+    one upsert per distinct (user, category, date) instead of one per row.
+    Accepts Transaction instances or dicts with the same attribute names.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for row in transactions:
+        if not isinstance(row, dict):
+            row = {field: getattr(row, field) for field in ROLLUP_FIELDS}
+        key = (row['user_id'], row['category_id'], row['transaction_type'], row['date'], row['currency'])
+        deltas[key][0] += row['amount']
+        deltas[key][1] += 1
+    
+    with transaction.atomic():
+        for key, (amount, count) in deltas.items():
+            apply_daily_total(*key, sign * amount, sign * count)
+        
+        daily_totals_changed.send(sender=DailyCategoryTotal, changes=[
+            (user_id, category_id, date, currency, sign * amount)
+            for (user_id, category_id, _, date, currency), (amount, _) in deltas.items()
+        ])
+
+
+def merge_category_totals(category):
+    """Move a category's rollup rows onto the uncategorized rows before it is deleted."""
+    rows = DailyCategoryTotal.objects.filter(category=category)
+    for row in rows:
+        apply_daily_total(row.user_id, None, None, row.date, row.currency, row.amount, row.transaction_count)
+    rows.delete()
+
+
+def rebuild_daily_totals(users=None):
+    """
+    Recompute the daily rollup from raw transactions, for every user or only
+    for the given users. Returns the number of rollup rows written.
+    """
+    transactions = Transaction.objects.all()
+    totals = DailyCategoryTotal.objects.all()
+    if users is not None:
+        transactions = transactions.filter(user__in=users)
+        totals = totals.filter(user__in=users)
+    
+    grouped = transactions.values(
+        'user_id', 'category_id', 'transaction_type', 'date', 'currency'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+    
+    written = 0
+    with transaction.atomic():
+        totals.delete()
+        
+        batch = []
+        for row in grouped.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.append(DailyCategoryTotal(
+                user_id=row['user_id'],
+                category_id=row['category_id'],
+                transaction_type=row['transaction_type'],
+                date=row['date'],
+                currency=row['currency'],
+                amount=row['total'],
+                transaction_count=row['count']
+            ))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                DailyCategoryTotal.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        
+        if batch:
+            DailyCategoryTotal.objects.bulk_create(batch)
+            written += len(batch)
+    
+    daily_totals_rebuilt.send(sender=DailyCategoryTotal, users=users)
+    
+    if users is None:
+        bump_global_version()
+    else:
+        for user in users:
+            bump_user_version(getattr(user, 'pk', user))
+    
+    return written
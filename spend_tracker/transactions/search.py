@@ -0,0 +1,116 @@
+"""
+Full-text search over Transaction.search_document (description plus
+category name).
+
+SQLite uses an FTS5 external-content table kept in step by triggers on the
+transactions table. PostgreSQL uses a GIN index on the document's tsvector.
+Other backends fall back to a substring match on the document.
+"""
+import re
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from .models import Transaction
+
+FTS_TABLE = 'transactions_transaction_fts'
+SEARCH_CONFIG = 'simple'
+
+_TABLE = Transaction._meta.db_table
+
+SQLITE_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"search_document, content='{_TABLE}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF search_document ON {_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document); "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END",
+]
+
+POSTGRESQL_SEARCH_DDL = [
+    f"CREATE INDEX IF NOT EXISTS transaction_search_idx ON {_TABLE} "
+    f"USING GIN (to_tsvector('{SEARCH_CONFIG}', search_document))",
+]
+
+
+def install_search_index(connection):
+    """
+    Create the backend's full-text index if it is missing (and the
+    migration adding search_document has run). SQLite drops
+    triggers whenever a migration rebuilds the transactions table, so this
+    also runs after every migrate and re-indexes when anything was missing.
+    """
+    with connection.cursor() as cursor:
+        if _TABLE not in connection.introspection.table_names(cursor):
+            return
+        columns = connection.introspection.get_table_description(cursor, _TABLE)
+        if 'search_document' not in {column.name for column in columns}:
+            return
+    
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+                [FTS_TABLE, f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update']
+            )
+            if cursor.fetchone()[0] == 4:
+                return
+            for statement in SQLITE_SEARCH_DDL:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for statement in POSTGRESQL_SEARCH_DDL:
+                cursor.execute(statement)
+
+
+def _terms(text):
+    return re.findall(r'\w+', text or '')
+
+
+def search_transactions(queryset, text, ranked=False):
+    """
+    Narrow a Transaction queryset to rows whose description or category
+    name contain every word of `text` (as a prefix, so "groc" finds
+    "Groceries"). With `ranked`, rows are annotated with `search_rank`
+    and ordered best match first.
+    """
+    terms = _terms(text)
+    if not terms:
+        return queryset.none()
+    
+    # The backend the queryset will run on, which need not be the default one
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        queryset = queryset.filter(RawSQL(
+            f'"{_TABLE}"."id" IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            [match], output_field=BooleanField()
+        ))
+        if ranked:
+            # FTS5 rank is bm25, where lower is better
+            queryset = queryset.annotate(search_rank=RawSQL(
+                f'(SELECT -rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = "{_TABLE}"."id")',
+                [match], output_field=FloatField()
+            ))
+    elif vendor == 'postgresql':
+        query = ' & '.join(f'{term}:*' for term in terms)
+        document = f"to_tsvector('{SEARCH_CONFIG}', \"{_TABLE}\".\"search_document\")"
+        queryset = queryset.filter(RawSQL(
+            f"{document} @@ to_tsquery('{SEARCH_CONFIG}', %s)", [query], output_field=BooleanField()
+        ))
+        if ranked:
+            queryset = queryset.annotate(search_rank=RawSQL(
+                f"ts_rank({document}, to_tsquery('{SEARCH_CONFIG}', %s))", [query], output_field=FloatField()
+            ))
+    else:
+        for term in terms:
+            queryset = queryset.filter(search_document__icontains=term)
+        if ranked:
+            return queryset.order_by('-date', '-id')
+    
+    if ranked:
+        queryset = queryset.order_by('-search_rank', '-date', '-id')
+    return queryset
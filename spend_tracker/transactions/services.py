@@ -0,0 +1,142 @@
+from django.db.models import Q, Sum
+from django.db.models.functions import Round
+from spend_tracker.cache import cached_for_user
+from users.rates import converted
+from .models import DailyCategoryTotal
+
+
+def filter_by_params(queryset, params):
+    """
+    Narrow a Transaction or DailyCategoryTotal queryset by the start_date,
+    end_date, category and type query parameters shared by the API and the
+    web views.
+    """
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    
+    # Filter by category
+    category_id = params.get('category')
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+    
+    # Filter by transaction type
+    transaction_type = params.get('type')
+    if transaction_type:
+        queryset = queryset.filter(transaction_type=transaction_type)
+    
+    return queryset
+
+
+def _amount(currency):
+    # Rollup rows keep their original currency; convert inside the SUM
+    return converted('amount', currency) if currency else 'amount'
+
+
+def sum_amount(currency=None, **kwargs):
+    """Sum of rollup amounts in `currency`, rounded to cents once converted."""
+    return Round(Sum(_amount(currency), **kwargs), 2)
+
+
+def _period_aggregates(totals, periods, currency):
+    """The conditional Sum per period and the queryset narrowed to the rows they can touch."""
+    aggregates = {}
+    starts, ends = [], []
+    for name, (start_date, end_date) in periods.items():
+        period_filter = Q()
+        if start_date:
+            period_filter &= Q(date__gte=start_date)
+        if end_date:
+            period_filter &= Q(date__lte=end_date)
+        starts.append(start_date)
+        ends.append(end_date)
+        
+        aggregates[f'{name}_income'] = sum_amount(currency, filter=period_filter & Q(transaction_type='income'))
+        aggregates[f'{name}_expense'] = sum_amount(currency, filter=period_filter & Q(transaction_type='expense'))
+        aggregates[f'{name}_count'] = Sum('transaction_count', filter=period_filter or None)
+    
+    # Only scan the rows that can fall into one of the periods
+    if starts and all(starts):
+        totals = totals.filter(date__gte=min(starts))
+    if ends and all(ends):
+        totals = totals.filter(date__lte=max(ends))
+    
+    return totals, aggregates
+
+
+def _period_results(results, periods):
+    stats = {}
+    for name in periods:
+        income = results[f'{name}_income'] or 0
+        expense = results[f'{name}_expense'] or 0
+        stats[name] = {
+            'income': income,
+            'expense': expense,
+            'savings': income - expense,
+            'count': results[f'{name}_count'] or 0,
+        }
+    return stats
+
+
+def get_period_stats(totals, periods, currency=None):
+    """
+    Compute income, expenses, savings and transaction count for any number
+    of periods with a single conditional aggregation query.
+
+    `totals` is a DailyCategoryTotal queryset (usually already filtered by
+    user) and `periods` maps a name to a (start_date, end_date) tuple.
+    Either bound may be None to leave that side of the period open. Amounts
+    are converted into `currency` when given.
+
+    Returns a dict keyed by period name, e.g.
+    {'month': {'income': ..., 'expense': ..., 'savings': ..., 'count': ...}}
+    """
+    totals, aggregates = _period_aggregates(totals, periods, currency)
+    return _period_results(totals.aggregate(**aggregates), periods)
+
+
+def get_period_stats_by_user(totals, periods, currency=None):
+    """
+    get_period_stats for every user in `totals` from one query grouped by
+    user. Returns {user_id: stats}; users without rows in range are absent.
+    """
+    totals, aggregates = _period_aggregates(totals, periods, currency)
+    rows = totals.values('user_id').annotate(**aggregates).order_by()
+    return {row['user_id']: _period_results(row, periods) for row in rows}
+
+
+def get_top_categories(totals, start_date, end_date, transaction_type='expense', limit=5, currency=None):
+    """Return the categories with the highest totals of the given type in a date range."""
+    return totals.filter(
+        date__gte=start_date,
+        date__lte=end_date,
+        transaction_type=transaction_type
+    ).values('category__name').annotate(
+        total=sum_amount(currency)
+    ).order_by('-total')[:limit]
+
+
+def get_user_period_stats(user, periods):
+    """get_period_stats over the user's daily totals in their currency, cached until their data changes."""
+    return cached_for_user(
+        user.pk, 'period_stats',
+        lambda: get_period_stats(DailyCategoryTotal.objects.filter(user=user), periods, user.currency),
+        sorted(periods.items()), user.currency
+    )
+
+
+def get_user_top_categories(user, start_date, end_date, transaction_type='expense', limit=5):
+    """get_top_categories for one user, cached until their data changes."""
+    return cached_for_user(
+        user.pk, 'top_categories',
+        lambda: list(get_top_categories(
+            DailyCategoryTotal.objects.filter(user=user), start_date, end_date, transaction_type, limit,
+            user.currency
+        )),
+        start_date, end_date, transaction_type, limit, user.currency
+    )
+
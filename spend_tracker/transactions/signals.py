@@ -0,0 +1,97 @@
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from spend_tracker.cache import bump_global_version, bump_user_version
+from .models import Category, DailyCategoryTotal, Transaction, search_document_expression
+from .rollups import apply_daily_total, daily_totals_changed, daily_totals_deferred, merge_category_totals
+from .tombstones import record_deletion
+
+def _rollup_key(values):
+    return (values['user_id'], values['category_id'], values['transaction_type'], values['date'], values['currency'])
+
+def _change(values, amount):
+    return (values['user_id'], values['category_id'], values['date'], values['currency'], amount)
+
+def _send_changes(*changes):
+    daily_totals_changed.send(sender=DailyCategoryTotal, changes=list(changes))
+
+@receiver(pre_delete, sender=Category)
+def clear_transaction_type(sender, instance, **kwargs):
+    """Transactions lose their type and category name along with their category (SET_NULL)."""
+    Transaction.objects.filter(category=instance).update(
+        transaction_type=None, search_document=search_document_expression(None), updated_at=timezone.now()
+    )
+    merge_category_totals(instance)
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, **kwargs):
+    """Keep the stored row so post_save can move its amount out of the old daily total."""
+    instance._previous_values = None
+    if instance.pk and not kwargs.get('raw') and not daily_totals_deferred():
+        instance._previous_values = Transaction.objects.filter(pk=instance.pk).values(
+            'user_id', 'category_id', 'transaction_type', 'date', 'currency', 'amount'
+        ).first()
+
+@receiver(post_save, sender=Transaction)
+def update_daily_totals_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or daily_totals_deferred():
+        return
+    
+    current = {
+        'user_id': instance.user_id,
+        'category_id': instance.category_id,
+        'transaction_type': instance.transaction_type,
+        'date': instance.date,
+        'currency': instance.currency,
+        'amount': instance.amount,
+    }
+    previous = getattr(instance, '_previous_values', None)
+    
+    if previous is None:
+        apply_daily_total(*_rollup_key(current), current['amount'], 1)
+        _send_changes(_change(current, current['amount']))
+    elif _rollup_key(previous) == _rollup_key(current):
+        if previous['amount'] != current['amount']:
+            delta = current['amount'] - previous['amount']
+            apply_daily_total(*_rollup_key(current), delta, 0)
+            _send_changes(_change(current, delta))
+    else:
+        apply_daily_total(*_rollup_key(previous), -previous['amount'], -1)
+        apply_daily_total(*_rollup_key(current), current['amount'], 1)
+        _send_changes(
+            _change(previous, -previous['amount']),
+            _change(current, current['amount']),
+        )
+
+@receiver(post_delete, sender=Transaction)
+def update_daily_totals_on_delete(sender, instance, **kwargs):
+    if daily_totals_deferred():
+        return
+    apply_daily_total(
+        instance.user_id, instance.category_id, instance.transaction_type,
+        instance.date, instance.currency, -instance.amount, -1
+    )
+    _send_changes((instance.user_id, instance.category_id, instance.date, instance.currency, -instance.amount))
+
+@receiver([post_save, post_delete], sender=Transaction)
+def invalidate_transaction_cache(sender, instance, **kwargs):
+    # Bulk writers defer per-row work and bump the version once themselves
+    if not daily_totals_deferred():
+        bump_user_version(instance.user_id)
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    if instance.is_default or not instance.user_id:
+        bump_global_version()
+    else:
+        bump_user_version(instance.user_id)
+
+@receiver(post_delete, sender=Transaction)
+def log_transaction_deletion(sender, instance, origin=None, **kwargs):
+    # Bulk writers log their deletions in one INSERT
+    if not daily_totals_deferred():
+        record_deletion('transaction', instance, origin)
+
+@receiver(post_delete, sender=Category)
+def log_category_deletion(sender, instance, origin=None, **kwargs):
+    record_deletion('category', instance, origin)
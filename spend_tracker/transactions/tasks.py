@@ -0,0 +1,31 @@
+import os
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from .bulk import get_allowed_categories
+from .imports import import_statement
+
+User = get_user_model()
+
+@shared_task(bind=True)
+def import_statement_file(self, user_id, path, file_format, options=None):
+    """
+    Import a statement saved by imports.save_upload, reporting bytes read
+    and row counts as progress, then delete the file. `options` are
+    import_statement's keyword arguments with category ids.
+    """
+    def report_progress(done, total, counts):
+        if not self.request.is_eager:
+            self.update_state(state='PROGRESS', meta={'done': done, 'total': total, **counts})
+    
+    options = dict(options or {})
+    try:
+        user = User.objects.get(pk=user_id)
+        category_ids = {options.get(key) for key in ('income_category', 'expense_category')} - {None}
+        categories = get_allowed_categories(user, category_ids)
+        for key in ('income_category', 'expense_category'):
+            options[key] = categories.get(options.get(key))
+        
+        with open(path, 'rb') as handle:
+            return import_statement(user, handle, file_format, on_progress=report_progress, **options)
+    finally:
+        os.remove(path)
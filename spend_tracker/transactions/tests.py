@@ -1,3 +1,406 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+import csv
+import os
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from datetime import date, timedelta
+from .models import Category, DailyCategoryTotal, Transaction
+from .bulk import bulk_write_transactions
+from .categories import get_user_categories
+from .exports import escape_formula
+from .forms import TransactionForm
+from .imports import import_statement, parse_amount
+from .search import search_transactions
+from .services import get_period_stats, get_user_period_stats
+
+User = get_user_model()
+
+class TransactionTypeSyncTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.category = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        self.transaction = Transaction.objects.create(
+            user=self.user,
+            amount=Decimal('50.00'),
+            category=self.category,
+            date=date.today()
+        )
+
+    def test_type_copied_from_category_on_save(self):
+        self.assertEqual(self.transaction.transaction_type, 'expense')
+        
+        salary = Category.objects.create(name='Salary', type='income', user=self.user)
+        self.transaction.category = salary
+        self.transaction.save()
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.transaction_type, 'income')
+
+    def test_category_type_change_updates_transactions(self):
+        self.category.type = 'income'
+        self.category.save()
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.transaction_type, 'income')
+
+    def test_category_delete_clears_type(self):
+        self.category.delete()
+        self.transaction.refresh_from_db()
+        self.assertIsNone(self.transaction.category)
+        self.assertIsNone(self.transaction.transaction_type)
+
+
+class PeriodStatsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        salary = Category.objects.create(name='Salary', type='income', user=self.user)
+        groceries = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        self.today = date(2025, 5, 15)
+        self.last_month = date(2025, 4, 10)
+        
+        Transaction.objects.create(user=self.user, amount=Decimal('1000.00'), category=salary, date=self.today)
+        Transaction.objects.create(user=self.user, amount=Decimal('50.00'), category=groceries, date=self.today)
+        Transaction.objects.create(user=self.user, amount=Decimal('30.00'), category=groceries, date=self.last_month)
+
+    def test_multiple_periods_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = get_period_stats(DailyCategoryTotal.objects.filter(user=self.user), {
+                'month': (self.today.replace(day=1), self.today),
+                'last_month': (self.last_month.replace(day=1), self.today.replace(day=1) - timedelta(days=1)),
+                'all': (None, None),
+            })
+        
+        self.assertEqual(stats['month']['income'], Decimal('1000.00'))
+        self.assertEqual(stats['month']['expense'], Decimal('50.00'))
+        self.assertEqual(stats['month']['savings'], Decimal('950.00'))
+        self.assertEqual(stats['month']['count'], 2)
+        self.assertEqual(stats['last_month']['income'], 0)
+        self.assertEqual(stats['last_month']['expense'], Decimal('30.00'))
+        self.assertEqual(stats['all']['count'], 3)
+
+
+class UserCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.category = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        self.today = date(2025, 5, 15)
+        self.periods = {'month': (self.today.replace(day=1), self.today)}
+        Transaction.objects.create(user=self.user, amount=Decimal('50.00'), category=self.category, date=self.today)
+
+    def test_repeated_reads_hit_cache(self):
+        stats = get_user_period_stats(self.user, self.periods)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_period_stats(self.user, self.periods), stats)
+
+    def test_writes_invalidate_cache(self):
+        get_user_period_stats(self.user, self.periods)
+        
+        transaction = Transaction.objects.create(
+            user=self.user, amount=Decimal('25.00'), category=self.category, date=self.today
+        )
+        self.assertEqual(get_user_period_stats(self.user, self.periods)['month']['expense'], Decimal('75.00'))
+        
+        bulk_write_transactions(self.user, delete_ids=[transaction.pk])
+        self.assertEqual(get_user_period_stats(self.user, self.periods)['month']['expense'], Decimal('50.00'))
+        
+        self.category.type = 'income'
+        self.category.save()
+        self.assertEqual(get_user_period_stats(self.user, self.periods)['month']['income'], Decimal('50.00'))
+
+
+class CategoryRegistryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.salary = Category.objects.create(name='Salary', type='income', user=self.user)
+        self.groceries = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        other = User.objects.create_user(username='other', password='testpassword123')
+        self.foreign = Category.objects.create(name='Theirs', type='expense', user=other)
+
+    def test_cached_until_categories_change(self):
+        self.assertEqual(get_user_categories(self.user), [self.salary, self.groceries])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_categories(self.user, 'expense'), [self.groceries])
+        
+        rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+        self.assertEqual(get_user_categories(self.user, 'expense'), [self.groceries, rent])
+
+    def test_form_uses_registry(self):
+        get_user_categories(self.user)
+        data = {'amount': '10.00', 'category': self.groceries.pk, 'description': '', 'date': '2025-05-01'}
+        
+        with self.assertNumQueries(0):
+            self.assertIn('Groceries', TransactionForm(self.user)['category'].as_widget())
+        
+        form = TransactionForm(self.user, data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['category'], self.groceries)
+        
+        form = TransactionForm(self.user, {**data, 'category': self.foreign.pk})
+        self.assertIn('category', form.errors)
+
+
+class DailyCategoryTotalTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.groceries = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        self.dining = Category.objects.create(name='Dining', type='expense', user=self.user)
+        self.today = date(2025, 5, 15)
+
+    def totals(self):
+        return list(DailyCategoryTotal.objects.filter(user=self.user).order_by('category_id', 'date').values_list(
+            'category_id', 'transaction_type', 'date', 'amount', 'transaction_count'
+        ))
+
+    def test_create_update_and_delete(self):
+        first = Transaction.objects.create(user=self.user, amount=Decimal('50.00'), category=self.groceries, date=self.today)
+        Transaction.objects.create(user=self.user, amount=Decimal('25.00'), category=self.groceries, date=self.today)
+        self.assertEqual(self.totals(), [(self.groceries.id, 'expense', self.today, Decimal('75.00'), 2)])
+        
+        first.amount = Decimal('60.00')
+        first.save()
+        self.assertEqual(self.totals(), [(self.groceries.id, 'expense', self.today, Decimal('85.00'), 2)])
+        
+        first.category = self.dining
+        first.save()
+        self.assertEqual(self.totals(), [
+            (self.groceries.id, 'expense', self.today, Decimal('25.00'), 1),
+            (self.dining.id, 'expense', self.today, Decimal('60.00'), 1),
+        ])
+        
+        first.delete()
+        self.assertEqual(self.totals(), [(self.groceries.id, 'expense', self.today, Decimal('25.00'), 1)])
+
+    def test_bulk_update_of_a_repeated_row_counts_once(self):
+        first = Transaction.objects.create(user=self.user, amount=Decimal('10.00'), category=self.groceries, date=self.today)
+        first.amount = Decimal('20.00')
+        bulk_write_transactions(self.user, changed_transactions=[first, first])
+        self.assertEqual(self.totals(), [(self.groceries.id, 'expense', self.today, Decimal('20.00'), 1)])
+
+    def test_category_delete_moves_totals_to_uncategorized(self):
+        Transaction.objects.create(user=self.user, amount=Decimal('50.00'), category=self.groceries, date=self.today)
+        Transaction.objects.create(user=self.user, amount=Decimal('20.00'), category=None, date=self.today)
+        
+        self.groceries.delete()
+        self.assertEqual(self.totals(), [(None, None, self.today, Decimal('70.00'), 2)])
+
+    def test_rebuild_matches_incremental_totals(self):
+        Transaction.objects.create(user=self.user, amount=Decimal('50.00'), category=self.groceries, date=self.today)
+        Transaction.objects.create(user=self.user, amount=Decimal('30.00'), category=self.dining, date=self.today)
+        Transaction.objects.create(user=self.user, amount=Decimal('10.00'), category=self.groceries, date=date(2025, 5, 1))
+        expected = self.totals()
+        
+        DailyCategoryTotal.objects.all().delete()
+        call_command('rebuild_daily_totals', stdout=StringIO())
+        self.assertEqual(self.totals(), expected)
+
+
+class TransactionSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.groceries = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        self.rent = Category.objects.create(name='Rent', type='expense', user=self.user)
+        self.lunch = Transaction.objects.create(
+            user=self.user, amount=Decimal('12.00'), category=self.groceries, description='Lunch with team', date=date(2025, 5, 1)
+        )
+        self.flat = Transaction.objects.create(
+            user=self.user, amount=Decimal('900.00'), category=self.rent, description='Flat rent for May', date=date(2025, 5, 2)
+        )
+
+    def search(self, text, ranked=False):
+        return list(search_transactions(Transaction.objects.filter(user=self.user), text, ranked).values_list('pk', flat=True))
+
+    def test_matches_description_and_category_by_prefix(self):
+        self.assertEqual(self.search('lunch'), [self.lunch.pk])
+        self.assertEqual(self.search('groc'), [self.lunch.pk])
+        self.assertEqual(self.search('rent may'), [self.flat.pk])
+        self.assertEqual(self.search('"%*'), [])
+
+    def test_index_follows_writes(self):
+        self.groceries.name = 'Dining'
+        self.groceries.save()
+        self.assertEqual(self.search('dining'), [self.lunch.pk])
+        self.assertEqual(self.search('groceries'), [])
+        
+        self.lunch.description = 'Dinner'
+        self.lunch.save()
+        self.assertEqual(self.search('lunch'), [])
+        
+        self.rent.delete()
+        self.assertEqual(self.search('rent'), [self.flat.pk])
+        self.flat.delete()
+        self.assertEqual(self.search('rent'), [])
+        
+        bulk_write_transactions(self.user, [Transaction(
+            amount=Decimal('5.00'), category=self.groceries, description='Coffee', date=date(2025, 5, 3)
+        )])
+        self.assertEqual(len(self.search('coffee dining')), 1)
+
+    def test_ranked(self):
+        rent_rent = Transaction.objects.create(
+            user=self.user, amount=Decimal('50.00'), category=self.rent, description='Rent top-up', date=date(2025, 5, 3)
+        )
+        self.assertEqual(self.search('rent', ranked=True), [rent_rent.pk, self.flat.pk])
+
+
+class TransactionListViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        category = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        for day in range(1, 6):
+            Transaction.objects.create(user=self.user, amount=Decimal('10.00'), category=category, date=date(2025, 5, day))
+        self.client.force_login(self.user)
+
+    @patch('transactions.views.TRANSACTIONS_PER_PAGE', 2)
+    def test_keyset_pages(self):
+        response = self.client.get(reverse('transaction_list'))
+        pages = [[t.date.day for t in response.context['transactions']]]
+        while response.context['next_cursor']:
+            response = self.client.get(reverse('transaction_list'), {'cursor': response.context['next_cursor']})
+            pages.append([t.date.day for t in response.context['transactions']])
+        
+        self.assertEqual(pages, [[5, 4], [3, 2], [1]])
+
+    def test_search(self):
+        Transaction.objects.filter(date=date(2025, 5, 3)).update(search_document='Weekly market run Groceries')
+        response = self.client.get(reverse('transaction_list'), {'q': 'market'})
+        self.assertEqual([t.date.day for t in response.context['transactions']], [3])
+        self.assertContains(response, 'Results for "market"')
+
+    def test_export_csv(self):
+        response = self.client.get(reverse('export_transactions'), {'start_date': '2025-05-04'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['2025-05-04', '2025-05-05'])
+
+    def test_export_csv_escapes_formulas(self):
+        Transaction.objects.filter(date=date(2025, 5, 5)).update(description='=HYPERLINK("http://x")')
+        Category.objects.filter(user=self.user).update(name='@SUM(A1)')
+        response = self.client.get(reverse('export_transactions'), {'start_date': '2025-05-05'})
+        
+        row = next(csv.reader(b''.join(response.streaming_content).decode().splitlines()[1:]))
+        self.assertEqual(row[5:7], ["'@SUM(A1)", '\'=HYPERLINK("http://x")'])
+        # Negative numbers are not text and stay as they are
+        self.assertEqual(escape_formula(Decimal('-5.00')), Decimal('-5.00'))
+
+
+STATEMENT_CSV = b"""\xef\xbb\xbfDate;Description;Amount;Category
+2025-05-01;Corner shop;-4,50;Groceries
+2025-05-01;Corner shop;-4,50;Groceries
+2025-05-02;ACME payroll;2.500,00;
+2025-05-03;Mystery;abc;
+"""
+
+STATEMENT_OFX = b"""OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<CURDEF>EUR
+<BANKACCTFROM><ACCTID>12345</BANKACCTFROM>
+<BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250504120000[-5:EST]<TRNAMT>-12.00<FITID>A1
+<NAME>Cafe &amp; Bar<MEMO>Card 1234</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20250505
+<TRNAMT>30.00
+<FITID>A2
+<NAME>Refund
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class StatementImportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123', currency='USD')
+        self.groceries = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        self.salary = Category.objects.create(name='Salary', type='income', user=self.user)
+
+    def totals(self):
+        return sorted(DailyCategoryTotal.objects.filter(user=self.user).values_list(
+            'category', 'date', 'amount', 'transaction_count'
+        ))
+
+    def test_csv_import_is_idempotent(self):
+        result = import_statement(self.user, BytesIO(STATEMENT_CSV), 'csv', income_category=self.salary)
+        
+        self.assertEqual(result['read'], 4)
+        self.assertEqual(result['created'], 3)
+        self.assertEqual(result['errors'], 1)
+        self.assertIn('Line 5: invalid amount "abc"', result['error_messages'])
+        # Identical rows in one statement are both kept
+        self.assertEqual(
+            list(Transaction.objects.filter(user=self.user).order_by('date', 'pk').values_list(
+                'amount', 'category', 'transaction_type', 'description'
+            )),
+            [
+                (Decimal('4.50'), self.groceries.pk, 'expense', 'Corner shop'),
+                (Decimal('4.50'), self.groceries.pk, 'expense', 'Corner shop'),
+                (Decimal('2500.00'), self.salary.pk, 'income', 'ACME payroll'),
+            ]
+        )
+        totals = self.totals()
+        self.assertIn((self.groceries.pk, date(2025, 5, 1), Decimal('9.00'), 2), totals)
+        
+        again = import_statement(self.user, BytesIO(STATEMENT_CSV), 'csv', income_category=self.salary, batch_size=2)
+        self.assertEqual((again['created'], again['duplicates']), (0, 3))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(self.totals(), totals)
+
+    def test_ofx_import(self):
+        result = import_statement(self.user, BytesIO(STATEMENT_OFX), 'ofx')
+        self.assertEqual((result['created'], result['errors']), (2, 0))
+        
+        cafe = Transaction.objects.get(user=self.user, date=date(2025, 5, 4))
+        self.assertEqual(cafe.description, 'Cafe & Bar Card 1234')
+        self.assertEqual((cafe.amount, cafe.currency), (Decimal('12.00'), 'EUR'))
+        self.assertTrue(cafe.search_document)
+        
+        # The bank's ids identify rows even if their details change later
+        edited = STATEMENT_OFX.replace(b'<TRNAMT>30.00', b'<TRNAMT>31.00')
+        self.assertEqual(import_statement(self.user, BytesIO(edited), 'ofx')['duplicates'], 2)
+
+    def test_queries_do_not_grow_with_rows(self):
+        def import_rows(count, day):
+            lines = ''.join(f'2025-05-{day:02},Shop {index},-1.00,Groceries\n' for index in range(count))
+            with CaptureQueriesContext(connection) as queries:
+                result = import_statement(self.user, BytesIO(f'date,description,amount,category\n{lines}'.encode()))
+            self.assertEqual(result['created'], count)
+            return len(queries)
+        
+        self.assertEqual(import_rows(80, 1), import_rows(5, 2))
+
+    def test_parse_amount(self):
+        self.assertEqual(parse_amount('-1,234.50'), Decimal('-1234.50'))
+        self.assertEqual(parse_amount('1.234,50'), Decimal('1234.50'))
+        self.assertEqual(parse_amount('(12.00)'), Decimal('-12.00'))
+        self.assertEqual(parse_amount('$ 9.99'), Decimal('9.99'))
+        self.assertEqual(parse_amount('1,234'), Decimal('1234.00'))
+
+    def test_command(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'statement.csv')
+        with open(path, 'wb') as handle:
+            handle.write(b'Posted,Payee,Money out,Money in\n05/01/2025,Shop,4.50,\n05/02/2025,Employer,,100.00\n')
+        
+        out = StringIO()
+        call_command(
+            'import_statement', 'testuser', path, '--column', 'date=Posted', '--date-format', '%m/%d/%Y',
+            '--income-category', 'salary', stdout=out
+        )
+        self.assertIn('Imported 2 transactions', out.getvalue())
+        self.assertEqual(
+            Transaction.objects.get(user=self.user, date=date(2025, 5, 2)).category, self.salary
+        )
+        
+        call_command('import_statement', 'testuser', path, '--column', 'date=Posted',
+                     '--date-format', '%m/%d/%Y', stdout=out)
+        self.assertIn('skipped 2 duplicates', out.getvalue())
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
 
-# Create your tests here.
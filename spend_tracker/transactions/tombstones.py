@@ -0,0 +1,36 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from .models import Tombstone
+
+# Tombstones older than this are pruned; clients further behind resync in full.
+# api.sync relies on it, so pruning takes no other horizon
+TOMBSTONE_RETENTION = timedelta(days=90)
+
+
+def _is_user_deletion(origin):
+    # Rows removed because their user was deleted need no tombstone, and one
+    # pointing at the vanishing user would break the delete
+    model = getattr(origin, 'model', type(origin))
+    return issubclass(model, get_user_model())
+
+
+def record_deletion(record_type, instance, origin=None):
+    """Log a deleted row for delta sync (called from post_delete receivers)."""
+    if _is_user_deletion(origin):
+        return
+    Tombstone.objects.create(user_id=instance.user_id, record_type=record_type, record_id=instance.pk)
+
+
+def record_deletions(record_type, user_id, record_ids):
+    """Log many deleted rows of one user with a single INSERT."""
+    Tombstone.objects.bulk_create([
+        Tombstone(user_id=user_id, record_type=record_type, record_id=record_id)
+        for record_id in record_ids
+    ])
+
+
+def prune_tombstones():
+    """Delete tombstones older than the retention window. Returns how many."""
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()
+    return deleted
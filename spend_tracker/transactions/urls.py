@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.transaction_list, name='transaction_list'),
     path('add/', views.add_transaction, name='add_transaction'),
+    path('export/', views.export_transactions, name='export_transactions'),
     path('edit/<int:pk>/', views.edit_transaction, name='edit_transaction'),
     path('delete/<int:pk>/', views.delete_transaction, name='delete_transaction'),
     path('categories/', views.category_list, name='category_list'),
@@ -1,17 +1,57 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from users.decorators import block_during_currency_conversion
+from django.http import Http404
 from .models import Transaction, Category
 from .forms import TransactionForm, CategoryForm
+from .pagination import paginate_by_date
+from .search import search_transactions
+from .categories import get_user_categories
+from .services import filter_by_params
+from .exports import EXPORT_FORMATS, export_response
+from users.rates import converted
+
+TRANSACTIONS_PER_PAGE = 50
 
 @login_required
 def transaction_list(request):
+    transactions = Transaction.objects.filter(user=request.user).select_related('category').annotate(
+        converted_amount=converted('amount', request.user.currency)
+    )
+    query = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor')
+    
+    if query:
+        # Best matches first, one page only
+        return render(request, 'transactions/transaction_list.html', {
+            'transactions': search_transactions(transactions, query, ranked=True)[:TRANSACTIONS_PER_PAGE],
+            'query': query,
+            'is_first_page': True,
+        })
+    
+    try:
+        transactions, next_cursor = paginate_by_date(transactions, cursor, TRANSACTIONS_PER_PAGE)
+    except ValueError:
+        raise Http404('Invalid cursor')
+    
+    return render(request, 'transactions/transaction_list.html', {
+        'transactions': transactions,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+    })
+
+@login_required
+def export_transactions(request):
+    file_format = request.GET.get('file_format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        raise Http404('Unknown export format')
     
-    transactions = Transaction.objects.filter(user=request.user).order_by('-date')
-    return render(request, 'transactions/transaction_list.html', {'transactions': transactions})
+    transactions = filter_by_params(Transaction.objects.filter(user=request.user), request.GET)
+    return export_response(transactions, file_format)
 
 @login_required
+@block_during_currency_conversion
 def add_transaction(request):
     if request.method == 'POST':
         form = TransactionForm(request.user, request.POST)
@@ -27,6 +67,7 @@ def add_transaction(request):
     return render(request, 'transactions/transaction_form.html', {'form': form, 'title': 'Add Transaction'})
 
 @login_required
+@block_during_currency_conversion
 def edit_transaction(request, pk):
     transaction = get_object_or_404(Transaction, pk=pk, user=request.user)
     
@@ -45,6 +86,7 @@ def edit_transaction(request, pk):
     })
 
 @login_required
+@block_during_currency_conversion
 def delete_transaction(request, pk):
     transaction = get_object_or_404(Transaction, pk=pk, user=request.user)
     
@@ -58,7 +100,7 @@ def delete_transaction(request, pk):
 @login_required
 def category_list(request):
     # Get user's categories and default categories
-    categories = Category.objects.filter(Q(user=request.user) | Q(is_default=True))
+    categories = get_user_categories(request.user)
     return render(request, 'transactions/category_list.html', {'categories': categories})
 
 @login_required
@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import CustomUser, Notification, Family
+from .models import CustomUser, ExchangeRate, Notification, Family
 
 # Register your models here.
 admin.site.register(CustomUser)
 admin.site.register(Notification)
 admin.site.register(Family)
+admin.site.register(ExchangeRate)
@@ -0,0 +1,16 @@
+from functools import wraps
+from django.contrib import messages
+from django.shortcuts import redirect
+
+def block_during_currency_conversion(view_func):
+    """
+    Refuse form submissions that change amounts while a background currency
+    conversion is rewriting the user's data.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method == 'POST' and request.user.is_converting_currency:
+            messages.error(request, 'Your amounts are being converted to a new currency. Please try again shortly.')
+            return redirect(request.path)
+        return view_func(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,136 @@
+"""
+Family-wide aggregates. Each figure comes from one grouped query over all
+members' rollup rows rather than one query per member, is converted into the
+viewer's currency, and is cached per family until any member's data changes.
+"""
+from collections import defaultdict
+from django.utils import timezone
+from spend_tracker.cache import cached_for_family
+from budgets.models import Budget
+from budgets.services import attach_budget_progress
+from reports.services import get_report_period, get_report_totals
+from transactions.models import DailyCategoryTotal
+from transactions.services import get_period_stats_by_user, get_top_categories
+from .models import CustomUser
+
+EMPTY_STATS = {'income': 0, 'expense': 0, 'savings': 0, 'count': 0}
+
+
+def get_family_members(family):
+    """The family's members as dicts of id, username and currency, from one query."""
+    return list(CustomUser.objects.filter(family=family).order_by('pk').values('id', 'username', 'currency'))
+
+
+def get_family_summary(family, currency, today=None):
+    """
+    Month-to-date income, expenses and savings for the whole family and for
+    each member, plus the family's top expense categories, in `currency`.
+    """
+    today = today or timezone.now().date()
+    start_of_month = today.replace(day=1)
+    members = get_family_members(family)
+    member_ids = [member['id'] for member in members]
+
+    def compute():
+        totals = DailyCategoryTotal.objects.filter(user_id__in=member_ids)
+        by_user = get_period_stats_by_user(totals, {'month': (start_of_month, today)}, currency)
+
+        member_stats = [
+            {**member, **(by_user[member['id']]['month'] if member['id'] in by_user else EMPTY_STATS)}
+            for member in members
+        ]
+        combined = {key: sum(stats[key] for stats in member_stats) for key in EMPTY_STATS}
+        return {
+            **combined,
+            'currency': currency,
+            'members': member_stats,
+            'top_expenses': list(get_top_categories(totals, start_of_month, today, currency=currency)),
+        }
+
+    return cached_for_family(family.pk, member_ids, 'family_summary', compute, today, currency)
+
+
+def get_family_budgets(family, today=None):
+    """
+    Every member's budgets with their progress. Spending is bucketed with one
+    grouped query per distinct member currency, since each budget is kept in
+    its owner's currency.
+    """
+    today = today or timezone.now().date()
+    members = get_family_members(family)
+    member_ids = [member['id'] for member in members]
+
+    def compute():
+        budgets = Budget.objects.filter(
+            user_id__in=member_ids
+        ).select_related('category', 'user').order_by('user_id', 'pk')
+        by_currency = defaultdict(list)
+        for budget in budgets:
+            by_currency[budget.user.currency].append(budget)
+
+        rows = []
+        for budget_currency, group in by_currency.items():
+            for budget in attach_budget_progress(group, today, budget_currency):
+                rows.append({
+                    'id': budget.pk,
+                    'user': budget.user_id,
+                    'username': budget.user.username,
+                    'category_name': budget.category.name,
+                    'amount': budget.amount,
+                    'currency': budget_currency,
+                    'period': budget.period,
+                    'spent': budget.spent,
+                    'remaining': budget.remaining,
+                    'percentage': budget.percentage,
+                })
+        return sorted(rows, key=lambda row: (row['user'], row['id']))
+
+    return cached_for_family(family.pk, member_ids, 'family_budgets', compute, today)
+
+
+def get_family_report(family, report_type, currency, today=None):
+    """
+    Report-style totals for the family over a report period: per member and
+    combined, with categories merged by name, from the grouped report query.
+    """
+    start_date, end_date = get_report_period(report_type, today)
+    members = get_family_members(family)
+    member_ids = [member['id'] for member in members]
+
+    def compute():
+        totals = get_report_totals(member_ids, start_date, end_date, currency)
+
+        categories = {}
+        member_totals = []
+        for member in members:
+            user_totals = totals.get(member['id'], {'income': 0, 'expense': 0, 'categories': []})
+            member_totals.append({
+                **member,
+                'income': user_totals['income'],
+                'expense': user_totals['expense'],
+                'savings': user_totals['income'] - user_totals['expense'],
+            })
+            for row in user_totals['categories']:
+                key = (row['category__name'], row['transaction_type'])
+                merged = categories.setdefault(key, {
+                    'category_name': row['category__name'], 'transaction_type': row['transaction_type'], 'amount': 0
+                })
+                merged['amount'] += row['total']
+
+        income = sum(member['income'] for member in member_totals)
+        expense = sum(member['expense'] for member in member_totals)
+        return {
+            'report_type': report_type,
+            'start_date': start_date,
+            'end_date': end_date,
+            'currency': currency,
+            'income': income,
+            'expense': expense,
+            'savings': income - expense,
+            'members': member_totals,
+            'categories': sorted(categories.values(), key=lambda row: row['amount'], reverse=True),
+        }
+
+    return cached_for_family(
+        family.pk, member_ids, 'family_report', compute, report_type, start_date, end_date, currency
+    )
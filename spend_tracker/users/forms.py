@@ -22,7 +22,7 @@ class UserPreferenceForm(forms.ModelForm):
         fields = ('receive_weekly_reports', 'receive_budget_alerts')
 
 class UserProfileForm(forms.ModelForm):
-    convert_currency = forms.BooleanField(required=False, label="Convert existing amounts to new currency")
+    convert_currency = forms.BooleanField(required=False, label="Convert budgets and expected incomes to new currency")
     
     class Meta:
         model = CustomUser
@@ -0,0 +1,59 @@
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from users.models import ExchangeRate
+from users.rates import store_rates
+
+class Command(BaseCommand):
+    help = (
+        'Loads exchange rates from a local file: JSON like {"base": "USD", "date": "2025-05-01", '
+        '"rates": {"EUR": "0.92", ...}} or CSV rows of currency,rate[,effective_date]'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON or CSV file with the rates')
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            help='Effective date for rates that do not carry one (default: today)',
+        )
+        parser.add_argument(
+            '--base',
+            default=ExchangeRate.BASE_CURRENCY,
+            help='Currency the CSV rates are quoted against',
+        )
+
+    def handle(self, *args, **options):
+        default_date = options['date'] or date.today()
+        try:
+            with open(options['path'], newline='') as handle:
+                if options['path'].endswith('.json'):
+                    rate_sets = self.read_json(handle, default_date, options['base'])
+                else:
+                    rate_sets = self.read_csv(handle, default_date, options['base'])
+            
+            stored = sum(
+                store_rates(rates, effective_date, base)
+                for (effective_date, base), rates in rate_sets.items()
+            )
+        except (OSError, ValueError, KeyError, InvalidOperation) as exc:
+            raise CommandError(f'Could not load exchange rates: {exc}')
+        
+        self.stdout.write(self.style.SUCCESS(f'Loaded {stored} exchange rates'))
+
+    def read_json(self, handle, default_date, base):
+        data = json.load(handle, parse_float=Decimal)
+        effective_date = date.fromisoformat(data['date']) if data.get('date') else default_date
+        rates = {currency: Decimal(str(rate)) for currency, rate in data['rates'].items()}
+        return {(effective_date, data.get('base', base)): rates}
+
+    def read_csv(self, handle, default_date, base):
+        rate_sets = {}
+        for row in csv.reader(handle):
+            if not row or row[0].strip().lower() in ('', 'currency'):
+                continue
+            effective_date = date.fromisoformat(row[2].strip()) if len(row) > 2 and row[2].strip() else default_date
+            rate_sets.setdefault((effective_date, base), {})[row[0].strip().upper()] = Decimal(row[1].strip())
+        return rate_sets
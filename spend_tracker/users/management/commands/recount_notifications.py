@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from users.models import CustomUser
+from users.notifications import recount_unread
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes unread notification counters from the notifications, e.g. after '
+        'they were edited or deleted in bulk outside the app'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Users to repair (default: everyone)')
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = CustomUser.objects.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f'User does not exist: {", ".join(sorted(missing))}')
+        
+        updated = recount_unread(users)
+        self.stdout.write(self.style.SUCCESS(f'Recounted unread notifications for {updated} users'))
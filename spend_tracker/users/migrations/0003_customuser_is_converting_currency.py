@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_customuser_currency_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='is_converting_currency',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 05:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_unread_notification_count(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    Notification = apps.get_model('users', 'Notification')
+    unread = Notification.objects.filter(
+        user=OuterRef('pk'), is_read=False
+    ).order_by().values('user').annotate(count=Count('pk')).values('count')
+    CustomUser.objects.update(unread_notification_count=Coalesce(Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_customuser_is_converting_currency'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='unread_notification_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_unread_notification_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', 'created_at'], name='notification_user_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='notification_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_notification_unread_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(choices=[('USD', 'US Dollar ($)'), ('EUR', 'Euro (€)'), ('GBP', 'British Pound (£)'), ('JPY', 'Japanese Yen (¥)'), ('INR', 'Indian Rupee (₹)'), ('KES', 'Kenyan Shilling (KSh)'), ('NGN', 'Nigerian Naira (₦)'), ('ZAR', 'South African Rand (R)'), ('GHS', 'Ghanaian Cedi (GH₵)'), ('EGP', 'Egyptian Pound (E£)'), ('MAD', 'Moroccan Dirham (MAD)'), ('TZS', 'Tanzanian Shilling (TSh)'), ('UGX', 'Ugandan Shilling (USh)'), ('XOF', 'West African CFA Franc (CFA)'), ('XAF', 'Central African CFA Franc (FCFA)')], max_length=3)),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=20)),
+                ('effective_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('currency', 'effective_date'), name='exchange_rate_currency_date_uniq')],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 
 class CustomUser(AbstractUser):
     USER_TYPE_CHOICES = (
@@ -31,6 +32,10 @@ class CustomUser(AbstractUser):
     currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES, default='USD')
     is_family_head = models.BooleanField(default=False)
     family = models.ForeignKey('Family', on_delete=models.SET_NULL, null=True, blank=True, related_name='members')
+    # Set while a background currency conversion rewrites the user's amounts
+    is_converting_currency = models.BooleanField(default=False)
+    # Unread Notification rows, maintained by users.notifications so badges need no COUNT
+    unread_notification_count = models.IntegerField(default=0, editable=False)
     
     def __str__(self):
         return self.username
@@ -62,6 +67,26 @@ class Family(models.Model):
     def __str__(self):
         return self.name
 
+class ExchangeRate(models.Model):
+    """
+    Units of `currency` per one BASE_CURRENCY from `effective_date` onwards.
+    Read through users.rates, which turns a rate set into a cross-rate matrix.
+    """
+    BASE_CURRENCY = 'USD'
+    
+    currency = models.CharField(max_length=3, choices=CustomUser.CURRENCY_CHOICES)
+    rate = models.DecimalField(max_digits=20, decimal_places=8)
+    effective_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['currency', 'effective_date'], name='exchange_rate_currency_date_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"1 {self.BASE_CURRENCY} = {self.rate} {self.currency} ({self.effective_date})"
+
 class UserPreference(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='preferences')
     receive_weekly_reports = models.BooleanField(default=True)
@@ -86,7 +111,36 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notification_user_unread_idx'),
+            # Keyset pagination walks (created_at, id) within a user
+            models.Index(fields=['user', 'created_at', 'id'], name='notification_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
+    
+    def save(self, *args, **kwargs):
+        # Keep the user's unread counter in step with single-row writes
+        with transaction.atomic():
+            if self._state.adding:
+                was_unread = False
+            else:
+                was_unread = Notification.objects.filter(pk=self.pk, is_read=False).exists()
+            super().save(*args, **kwargs)
+            delta = (not self.is_read) - was_unread
+            if delta:
+                CustomUser.objects.filter(pk=self.user_id).update(
+                    unread_notification_count=F('unread_notification_count') + delta
+                )
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            was_unread = Notification.objects.filter(pk=self.pk, is_read=False).exists()
+            deleted = super().delete(*args, **kwargs)
+            if was_unread:
+                CustomUser.objects.filter(pk=self.user_id).update(
+                    unread_notification_count=F('unread_notification_count') - 1
+                )
+        return deleted
@@ -0,0 +1,110 @@
+import base64
+from collections import Counter
+from datetime import datetime
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from .models import CustomUser, Notification
+
+
+def _adjust_unread(counts):
+    """Apply {user_id: delta} to the unread counters, one UPDATE per distinct delta."""
+    by_delta = {}
+    for user_id, delta in counts.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        CustomUser.objects.filter(pk__in=user_ids).update(
+            unread_notification_count=F('unread_notification_count') + delta
+        )
+
+
+def notify(user, title, message, notification_type='info'):
+    """Create one notification for a user and count it as unread."""
+    return Notification.objects.create(user=user, title=title, message=message, notification_type=notification_type)
+
+
+def notify_many(notifications):
+    """Insert unsaved Notification instances with one INSERT and bump each user's counter."""
+    notifications = list(notifications)
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications)
+        _adjust_unread(Counter(n.user_id for n in notifications if not n.is_read))
+    return notifications
+
+
+def mark_read(user, ids=None):
+    """
+    Mark the user's notifications (all of them, or just `ids`) as read with
+    a single UPDATE. Returns how many were unread.
+    """
+    unread = Notification.objects.filter(user=user, is_read=False)
+    if ids is not None:
+        unread = unread.filter(pk__in=ids)
+    with transaction.atomic():
+        updated = unread.update(is_read=True)
+        _adjust_unread({user.pk: -updated})
+    return updated
+
+
+def delete_notifications(user, ids=None, read_only=False):
+    """
+    Delete the user's notifications (all of them, just `ids`, and/or only
+    the read ones) with single DELETE statements. Returns how many went.
+    """
+    doomed = Notification.objects.filter(user=user)
+    if ids is not None:
+        doomed = doomed.filter(pk__in=ids)
+    
+    with transaction.atomic():
+        deleted, _ = doomed.filter(is_read=True).delete()
+        if not read_only:
+            unread, _ = doomed.filter(is_read=False).delete()
+            _adjust_unread({user.pk: -unread})
+            deleted += unread
+    return deleted
+
+
+def recount_unread(users=None):
+    """
+    Recompute the unread counters of `users` (a queryset, all users by
+    default) from the rows with a single UPDATE, repairing drift left by
+    writes that bypass the helpers above. Returns how many users were updated.
+    """
+    unread = (
+        Notification.objects.filter(user=OuterRef('pk'), is_read=False)
+        .order_by().values('user').annotate(count=Count('pk')).values('count')
+    )
+    users = CustomUser.objects.all() if users is None else users
+    return users.update(unread_notification_count=Coalesce(Subquery(unread), 0))
+
+
+def encode_cursor(notification):
+    """Opaque cursor pointing just past the given notification."""
+    raw = f'{notification.created_at.isoformat()}|{notification.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) position stored in a cursor, or raise ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, pk = raw.split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def paginate_notifications(queryset, cursor=None, page_size=20):
+    """
+    Keyset-paginate notifications newest first on (created_at, id), a range
+    scan on the (user, created_at, id) index. Returns (page, next_cursor).
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    
+    page = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
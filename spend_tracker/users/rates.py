@@ -0,0 +1,136 @@
+"""
+Exchange-rate store. The rates in effect on a date are read once per global
+cache version and expanded into a matrix holding the cross rate of every
+pair in CustomUser.CURRENCY_CHOICES, so lookups and conversions are
+dictionary reads. ExchangeRate writes bump the global version (see
+users.signals), which also invalidates cached per-user totals.
+"""
+from decimal import Decimal
+from django.db import connections, router
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+from spend_tracker.cache import bump_global_version, get_global_version
+from .models import CustomUser, ExchangeRate
+
+CURRENCIES = [code for code, _ in CustomUser.CURRENCY_CHOICES]
+
+# Used for any currency without a stored ExchangeRate, per one USD
+DEFAULT_RATES = {
+    'USD': Decimal('1'),
+    'EUR': Decimal('0.92'),
+    'GBP': Decimal('0.79'),
+    'JPY': Decimal('149.50'),
+    'INR': Decimal('83.12'),
+    'KES': Decimal('129.50'),
+    'NGN': Decimal('1550.00'),
+    'ZAR': Decimal('18.50'),
+    'GHS': Decimal('12.80'),
+    'EGP': Decimal('46.20'),
+    'MAD': Decimal('10.05'),
+    'TZS': Decimal('2520.00'),
+    'UGX': Decimal('3750.00'),
+    'XOF': Decimal('605.00'),
+    'XAF': Decimal('605.00'),
+}
+
+# (global cache version, {date: matrix}) for this process
+_matrices = (None, {})
+
+
+def get_base_rates(on_date):
+    """Units of each currency per one base currency, as in effect on `on_date`."""
+    rates = dict(DEFAULT_RATES)
+    stored = ExchangeRate.objects.filter(effective_date__lte=on_date).order_by('currency', 'effective_date')
+    for currency, rate in stored.values_list('currency', 'rate'):
+        # Later effective dates overwrite earlier ones
+        rates[currency] = rate
+    return rates
+
+
+def build_rate_matrix(rates):
+    """{(from, to): rate} for every pair of currencies in `rates`."""
+    return {
+        (source, target): Decimal('1') if source == target else rates[target] / rates[source]
+        for source in rates
+        for target in rates
+    }
+
+
+def get_rate_matrix(on_date=None):
+    """
+    The cross-rate matrix for a date (today by default), built with one
+    query the first time it is needed after the rates change.
+    """
+    global _matrices
+    on_date = on_date or timezone.now().date()
+    version = get_global_version()
+    if _matrices[0] != version:
+        _matrices = (version, {})
+    matrices = _matrices[1]
+    if on_date not in matrices:
+        matrices[on_date] = build_rate_matrix(get_base_rates(on_date))
+    return matrices[on_date]
+
+
+def get_exchange_rate(from_currency, to_currency, on_date=None):
+    """Rate converting `from_currency` into `to_currency`. Unknown currencies raise ValueError."""
+    try:
+        return get_rate_matrix(on_date)[(from_currency, to_currency)]
+    except KeyError:
+        raise ValueError(f'No exchange rate from {from_currency} to {to_currency}')
+
+
+def convert_amounts(amounts, from_currency, to_currency, on_date=None):
+    """Convert many amounts with a single rate lookup. Returns a list."""
+    if from_currency == to_currency:
+        return list(amounts)
+    rate = get_exchange_rate(from_currency, to_currency, on_date)
+    return [amount * rate for amount in amounts]
+
+
+def converted(field, to_currency, on_date=None, currency_field='currency'):
+    """
+    SQL expression for `field` expressed in `to_currency`: each row's value
+    times the rate from the currency in `currency_field`. Wrapped in Sum it
+    converts every currency group inside the aggregate, so totals over mixed
+    currencies need no per-row Python.
+    """
+    matrix = get_rate_matrix(on_date)
+    whens = [
+        When(**{currency_field: source}, then=F(field) * Value(matrix[(source, to_currency)]))
+        for source in CURRENCIES
+        if matrix[(source, to_currency)] != 1
+    ]
+    return Case(*whens, default=F(field), output_field=DecimalField(max_digits=20, decimal_places=2))
+
+
+def store_rates(rates, effective_date, base=ExchangeRate.BASE_CURRENCY):
+    """
+    Upsert a rate set, given as {currency: units per one `base`}, with a
+    single statement. Returns the number of rates stored.
+    """
+    rates = {base: Decimal('1'), **rates}
+    unknown = set(rates) - set(CURRENCIES)
+    if unknown:
+        raise ValueError(f'Unknown currencies: {", ".join(sorted(unknown))}')
+    
+    # Stored rates are always per one ExchangeRate.BASE_CURRENCY
+    if base == ExchangeRate.BASE_CURRENCY:
+        per_base = Decimal('1')
+    elif ExchangeRate.BASE_CURRENCY in rates:
+        per_base = Decimal(rates[ExchangeRate.BASE_CURRENCY])
+    else:
+        raise ValueError(f'Rates based on {base} need a {ExchangeRate.BASE_CURRENCY} rate')
+    
+    rows = [
+        ExchangeRate(currency=currency, rate=Decimal(rate) / per_base, effective_date=effective_date)
+        for currency, rate in rates.items()
+    ]
+    # MySQL upserts on any unique key and refuses a named conflict target
+    conflict_target = {}
+    if connections[router.db_for_write(ExchangeRate)].features.supports_update_conflicts_with_target:
+        conflict_target['unique_fields'] = ['currency', 'effective_date']
+    ExchangeRate.objects.bulk_create(rows, update_conflicts=True, update_fields=['rate'], **conflict_target)
+    # bulk_create sends no signals
+    bump_global_version()
+    return len(rows)
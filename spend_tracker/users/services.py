@@ -1,89 +1,68 @@
 import requests
-from decimal import Decimal
-
-def get_exchange_rate(from_currency, to_currency):
-    """
-    Get the exchange rate between two currencies.
-    In a production environment, you would use a paid API service like:
-    - Open Exchange Rates
-    - Fixer.io
-    - Currency Layer
-    
-    For this example, we'll use a simplified approach with fixed rates.
-    """
-    # Sample exchange rates (as of a specific date)
-    # In production, these would come from an API
-    exchange_rates = {
-        'USD': {
-            'EUR': Decimal('0.92'),
-            'GBP': Decimal('0.79'),
-            'JPY': Decimal('149.50'),
-            'INR': Decimal('83.12'),
-            'KES': Decimal('129.50'),
-            'NGN': Decimal('1550.00'),
-            'ZAR': Decimal('18.50'),
-            'GHS': Decimal('12.80'),
-            'EGP': Decimal('46.20'),
-            'MAD': Decimal('10.05'),
-            'TZS': Decimal('2520.00'),
-            'UGX': Decimal('3750.00'),
-            'XOF': Decimal('605.00'),
-            'XAF': Decimal('605.00'),
-        },
-        # Add more base currencies as needed
-    }
-    
-    # If we have direct rate
-    if from_currency in exchange_rates and to_currency in exchange_rates[from_currency]:
-        return exchange_rates[from_currency][to_currency]
-    
-    # If we need to convert through USD
-    if from_currency != 'USD' and to_currency != 'USD':
-        # First convert to USD, then to target currency
-        if from_currency in exchange_rates['USD']:
-            usd_to_from = Decimal('1') / exchange_rates['USD'][from_currency]
-            if to_currency in exchange_rates['USD']:
-                return usd_to_from * exchange_rates['USD'][to_currency]
-    
-    # Default fallback (1:1 exchange rate)
-    return Decimal('1.0')
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Round
+from django.utils import timezone
+from spend_tracker.cache import bump_user_version
+from .rates import convert_amounts, get_exchange_rate
 
 def convert_amount(amount, from_currency, to_currency):
     """
     Convert an amount from one currency to another.
     """
-    if from_currency == to_currency:
-        return amount
-    
-    rate = get_exchange_rate(from_currency, to_currency)
-    return amount * rate
+    return convert_amounts([amount], from_currency, to_currency)[0]
 
-def convert_user_transactions(user, old_currency, new_currency):
+def convert_user_budgets(user, old_currency, new_currency, on_progress=None):
     """
-    Convert all transactions for a user from old currency to new currency.
+    Convert a user's budgets and expected incomes from old currency to new
+    currency, with one UPDATE per table in a single database transaction.
+    `on_progress(step, done, total)` is called after each table.
+
+    Transactions keep the currency they were recorded in and are converted
+    when read, so they are not rewritten.
     """
-    from transactions.models import Transaction
     from budgets.models import Budget, ExpectedIncome
     
-    # Get exchange rate
     rate = get_exchange_rate(old_currency, new_currency)
+    converted_amount = Round(F('amount') * rate, 2)
+    steps = [
+        # Running budget spends are in the old currency; re-sum them on the next write
+        ('budgets', Budget.objects.filter(user=user), {'period_spent': None}),
+        ('incomes', ExpectedIncome.objects.filter(user=user), {}),
+    ]
+    
+    with transaction.atomic():
+        for done, (step, queryset, extra) in enumerate(steps, start=1):
+            queryset.update(amount=converted_amount, updated_at=timezone.now(), **extra)
+            if on_progress:
+                on_progress(step, done, len(steps))
+        
+        # Budgets and incomes were rewritten without signals
+        bump_user_version(user.pk)
     
-    # Convert transactions
-    transactions = Transaction.objects.filter(user=user)
-    for transaction in transactions:
-        transaction.amount = transaction.amount * rate
-        transaction.save()
+    return True
+
+def start_currency_conversion(user, old_currency, new_currency):
+    """
+    Lock the user against edits and queue the conversion in the background
+    once the surrounding transaction commits. Returns False if a conversion
+    for this user is already running.
+    """
+    from .models import CustomUser
+    from .tasks import convert_user_currency
     
-    # Convert budgets
-    budgets = Budget.objects.filter(user=user)
-    for budget in budgets:
-        budget.amount = budget.amount * rate
-        budget.save()
+    locked = CustomUser.objects.filter(pk=user.pk, is_converting_currency=False).update(is_converting_currency=True)
+    if not locked:
+        return False
     
-    # Convert expected incomes
-    incomes = ExpectedIncome.objects.filter(user=user)
-    for income in incomes:
-        income.amount = income.amount * rate
-        income.save()
+    def dispatch():
+        try:
+            convert_user_currency.delay(user.pk, old_currency, new_currency)
+        except Exception:
+            # Without a queued task nothing would release the lock
+            CustomUser.objects.filter(pk=user.pk).update(is_converting_currency=False)
+            raise
     
-    return True
\ No newline at end of file
+    user.is_converting_currency = True
+    transaction.on_commit(dispatch)
+    return True
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from spend_tracker.cache import bump_global_version, bump_user_version
+from .models import CustomUser, ExchangeRate
+
+@receiver(post_save, sender=CustomUser)
+def reset_user_cache(sender, instance, created, **kwargs):
+    # A reused primary key must not inherit a previous user's cached values,
+    # and a changed currency changes every converted total
+    bump_user_version(instance.pk)
+
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_cache(sender, instance, **kwargs):
+    bump_user_version(instance.pk)
+
+@receiver([post_save, post_delete], sender=ExchangeRate)
+def invalidate_exchange_rates(sender, instance, **kwargs):
+    # Rate matrices and every cached converted total depend on the rate set
+    bump_global_version()
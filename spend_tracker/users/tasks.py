@@ -0,0 +1,20 @@
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from .services import convert_user_budgets
+
+User = get_user_model()
+
+@shared_task(bind=True)
+def convert_user_currency(self, user_id, old_currency, new_currency):
+    """Convert a user's budgets and incomes to a new currency, then release the edit lock."""
+    def report_progress(step, done, total):
+        if not self.request.is_eager:
+            self.update_state(state='PROGRESS', meta={'step': step, 'done': done, 'total': total})
+    
+    try:
+        user = User.objects.get(pk=user_id)
+        convert_user_budgets(user, old_currency, new_currency, on_progress=report_progress)
+    finally:
+        User.objects.filter(pk=user_id).update(is_converting_currency=False)
+    
+    return f"Converted budgets for user {user_id} from {old_currency} to {new_currency}"
@@ -1,3 +1,303 @@
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+import tempfile
+from io import StringIO
+from decimal import Decimal
+from datetime import date
+from django.utils import timezone
+from unittest.mock import patch
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from spend_tracker.celery import app
+from transactions.models import Category, DailyCategoryTotal, Transaction
+from budgets.models import Budget, ExpectedIncome
+from .family import get_family_budgets, get_family_report, get_family_summary
+from .models import ExchangeRate, Family, Notification
+from .notifications import delete_notifications, mark_read, notify, notify_many, recount_unread
+from .rates import CURRENCIES, convert_amounts, get_exchange_rate, get_rate_matrix, store_rates
+from transactions.services import get_user_period_stats
+from .services import convert_user_budgets, start_currency_conversion
 
-# Create your tests here.
+User = get_user_model()
+
+class CurrencyConversionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123', currency='USD')
+        self.groceries = Category.objects.create(name='Groceries', type='expense', user=self.user)
+        Transaction.objects.create(user=self.user, amount=Decimal('10.00'), category=self.groceries, date=date(2025, 5, 1))
+        Transaction.objects.create(user=self.user, amount=Decimal('2.50'), category=self.groceries, date=date(2025, 5, 1))
+        Budget.objects.create(user=self.user, category=self.groceries, amount=Decimal('100.00'), period='monthly')
+        ExpectedIncome.objects.create(user=self.user, source='Salary', amount=Decimal('1000.00'), period='monthly')
+        
+        self.previous_eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        app.conf.task_eager_propagates = True
+        # Built once per rate-set version, outside the measured block
+        get_rate_matrix()
+
+    def tearDown(self):
+        app.conf.task_always_eager = self.previous_eager
+
+    def test_convert_is_set_based(self):
+        progress = []
+        with self.assertNumQueries(4):
+            convert_user_budgets(self.user, 'USD', 'EUR', on_progress=lambda *args: progress.append(args))
+        
+        self.assertEqual(Budget.objects.get().amount, Decimal('92.00'))
+        self.assertEqual(ExpectedIncome.objects.get().amount, Decimal('920.00'))
+        self.assertEqual([step for step, _, _ in progress], ['budgets', 'incomes'])
+        # Transactions and their rollup keep their recorded currency
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('amount', 'currency')),
+            [(Decimal('2.50'), 'USD'), (Decimal('10.00'), 'USD')]
+        )
+        self.assertEqual(DailyCategoryTotal.objects.get().amount, Decimal('12.50'))
+
+    def test_totals_convert_at_read_time(self):
+        Transaction.objects.create(
+            user=self.user, amount=Decimal('46.00'), currency='EUR', category=self.groceries, date=date(2025, 5, 2)
+        )
+        periods = {'may': (date(2025, 5, 1), date(2025, 5, 31))}
+        self.assertEqual(DailyCategoryTotal.objects.count(), 2)
+        self.assertEqual(get_user_period_stats(self.user, periods)['may']['expense'], Decimal('62.50'))
+        
+        self.user.currency = 'EUR'
+        self.user.save()
+        self.assertEqual(get_user_period_stats(self.user, periods)['may']['expense'], Decimal('57.50'))
+
+    def test_profile_runs_conversion_in_background(self):
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('profile'), {
+                'first_name': '',
+                'last_name': '',
+                'email': '',
+                'currency': 'EUR',
+                'convert_currency': 'on',
+            })
+        self.assertRedirects(response, reverse('profile'))
+        
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.currency, 'EUR')
+        self.assertFalse(self.user.is_converting_currency)
+        self.assertEqual(Budget.objects.get().amount, Decimal('92.00'))
+
+    def test_currency_change_refused_while_converting(self):
+        User.objects.filter(pk=self.user.pk).update(is_converting_currency=True)
+        self.client.force_login(self.user)
+        
+        for convert in ('on', ''):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('profile'), {
+                    'first_name': 'Ann', 'last_name': '', 'email': '', 'currency': 'EUR', 'convert_currency': convert,
+                })
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('currency', response.context['profile_form'].errors)
+        
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.currency, self.user.first_name), ('USD', ''))
+        self.assertTrue(self.user.is_converting_currency)
+        self.assertEqual(Budget.objects.get().amount, Decimal('100.00'))
+
+    def test_failed_dispatch_releases_lock(self):
+        with patch('users.tasks.convert_user_currency.delay', side_effect=ConnectionError('broker down')):
+            with self.assertRaises(ConnectionError):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.assertTrue(start_currency_conversion(self.user, 'USD', 'EUR'))
+        
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_converting_currency)
+
+    def test_writes_blocked_while_converting(self):
+        User.objects.filter(pk=self.user.pk).update(is_converting_currency=True)
+        client = APIClient()
+        client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        
+        response = client.post(reverse('transaction-list'), {
+            'amount': '5.00',
+            'category': self.groceries.id,
+            'date': '2025-05-02'
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(client.get(reverse('transaction-list')).status_code, 200)
+
+
+class ExchangeRateTest(TestCase):
+    def test_matrix_covers_every_pair(self):
+        matrix = get_rate_matrix()
+        self.assertEqual(len(matrix), len(CURRENCIES) ** 2)
+        self.assertEqual(matrix[('USD', 'EUR')], Decimal('0.92'))
+        self.assertEqual(matrix[('EUR', 'EUR')], 1)
+        self.assertEqual(matrix[('EUR', 'GBP')], Decimal('0.79') / Decimal('0.92'))
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(get_exchange_rate('XOF', 'XAF'), 1)
+            self.assertEqual(
+                convert_amounts([Decimal('10'), Decimal('2.5')], 'USD', 'EUR'),
+                [Decimal('9.20'), Decimal('2.300')]
+            )
+        
+        with self.assertRaises(ValueError):
+            get_exchange_rate('USD', 'XXX')
+
+    def test_stored_rates_apply_from_their_effective_date(self):
+        store_rates({'EUR': Decimal('0.90'), 'GBP': Decimal('0.80')}, date(2025, 1, 1))
+        ExchangeRate.objects.create(currency='EUR', rate=Decimal('0.95'), effective_date=date(2025, 6, 1))
+        
+        self.assertEqual(get_exchange_rate('USD', 'EUR', date(2024, 12, 31)), Decimal('0.92'))
+        self.assertEqual(get_exchange_rate('USD', 'EUR', date(2025, 5, 31)), Decimal('0.90'))
+        self.assertEqual(get_exchange_rate('USD', 'EUR', date(2025, 6, 1)), Decimal('0.95'))
+        self.assertEqual(get_exchange_rate('GBP', 'EUR', date(2025, 6, 1)), Decimal('0.95') / Decimal('0.80'))
+
+    def test_store_rates_without_conflict_target(self):
+        features = type(connection.features)
+        with patch.object(features, 'supports_update_conflicts_with_target', False), \
+                patch.object(ExchangeRate.objects, 'bulk_create') as bulk_create:
+            store_rates({'EUR': Decimal('0.90')}, date(2025, 1, 1))
+        self.assertNotIn('unique_fields', bulk_create.call_args.kwargs)
+        self.assertTrue(bulk_create.call_args.kwargs['update_conflicts'])
+
+    def test_load_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as handle:
+            handle.write('currency,rate,effective_date\nUSD,1.10,2025-03-01\nGBP,0.85,2025-03-01\n')
+            handle.flush()
+            call_command('load_exchange_rates', handle.name, base='EUR', stdout=StringIO())
+        
+        self.assertEqual(ExchangeRate.objects.get(currency='GBP').rate, Decimal('0.77272727'))
+        self.assertEqual(ExchangeRate.objects.get(currency='USD').rate, 1)
+        self.assertEqual(ExchangeRate.objects.get(currency='EUR').rate, Decimal('0.90909091'))
+        
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as handle:
+            handle.write('{"base": "USD", "date": "2025-03-01", "rates": {"JPY": 150.25}}')
+            handle.flush()
+            call_command('load_exchange_rates', handle.name, stdout=StringIO())
+        
+        self.assertEqual(get_exchange_rate('USD', 'JPY', date(2025, 3, 1)), Decimal('150.25'))
+
+class FamilyTest(TestCase):
+    def setUp(self):
+        self.family = Family.objects.create(name='Smiths')
+        self.head = User.objects.create_user(
+            username='head', password='testpassword123', currency='USD', family=self.family, is_family_head=True
+        )
+        self.member = User.objects.create_user(
+            username='member', password='testpassword123', currency='EUR', family=self.family
+        )
+        self.today = timezone.now().date()
+        self.food = Category.objects.create(name='Food', type='expense', is_default=True)
+        salary = Category.objects.create(name='Salary', type='income', is_default=True)
+        
+        Transaction.objects.create(user=self.head, amount=Decimal('1000.00'), category=salary, date=self.today)
+        Transaction.objects.create(user=self.head, amount=Decimal('30.00'), category=self.food, date=self.today)
+        Transaction.objects.create(user=self.member, amount=Decimal('46.00'), category=self.food, date=self.today)
+        Budget.objects.create(user=self.head, category=self.food, amount=Decimal('100.00'), period='monthly')
+        Budget.objects.create(user=self.member, category=self.food, amount=Decimal('92.00'), period='monthly')
+        get_rate_matrix()
+
+    def test_summary_is_grouped_and_cached(self):
+        with self.assertNumQueries(3):
+            summary = get_family_summary(self.family, 'USD', self.today)
+        
+        self.assertEqual(summary['income'], Decimal('1000.00'))
+        self.assertEqual(summary['expense'], Decimal('80.00'))
+        self.assertEqual(summary['savings'], Decimal('920.00'))
+        self.assertEqual([member['expense'] for member in summary['members']], [Decimal('30.00'), Decimal('50.00')])
+        self.assertEqual(summary['top_expenses'], [{'category__name': 'Food', 'total': Decimal('80.00')}])
+        
+        # Only the membership lookup until a member writes
+        with self.assertNumQueries(1):
+            get_family_summary(self.family, 'USD', self.today)
+        Transaction.objects.create(user=self.member, amount=Decimal('9.20'), category=self.food, date=self.today)
+        self.assertEqual(get_family_summary(self.family, 'USD', self.today)['expense'], Decimal('90.00'))
+
+    def test_budgets_in_owner_currency(self):
+        budgets = get_family_budgets(self.family, self.today)
+        self.assertEqual(
+            [(row['username'], row['currency'], row['spent'], row['percentage']) for row in budgets],
+            [('head', 'USD', Decimal('30.00'), 30), ('member', 'EUR', Decimal('46.00'), 50)]
+        )
+
+    def test_report(self):
+        report = get_family_report(self.family, 'weekly', 'EUR', self.today)
+        self.assertEqual(report['expense'], Decimal('73.60'))
+        self.assertEqual(report['categories'][0]['amount'], Decimal('920.00'))
+        self.assertEqual([member['expense'] for member in report['members']], [Decimal('27.60'), Decimal('46.00')])
+
+    def test_family_dashboard(self):
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('family_dashboard'))
+        self.assertContains(response, 'Smiths')
+        self.assertContains(response, 'EUR 73.60')
+        
+        self.client.force_login(User.objects.create_user(username='loner', password='testpassword123'))
+        self.assertRedirects(self.client.get(reverse('family_dashboard')), reverse('dashboard'))
+
+class NotificationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.notifications = [notify(self.user, f'Alert {i}', 'Over budget') for i in range(3)]
+
+    def unread_count(self):
+        self.user.refresh_from_db(fields=['unread_notification_count'])
+        return self.user.unread_notification_count
+
+    def test_counter_follows_writes(self):
+        self.assertEqual(self.unread_count(), 3)
+        
+        notification = self.notifications[0]
+        notification.is_read = True
+        notification.save()
+        self.assertEqual(self.unread_count(), 2)
+        
+        self.notifications[1].delete()
+        self.assertEqual(self.unread_count(), 1)
+        
+        notify_many([Notification(user=self.user, title='Bulk', message='') for _ in range(2)])
+        self.assertEqual(self.unread_count(), 3)
+
+    def test_bulk_operations_are_single_statements(self):
+        with self.assertNumQueries(4):
+            # Savepoint, UPDATE, counter UPDATE, release
+            self.assertEqual(mark_read(self.user, [self.notifications[0].pk]), 1)
+        self.assertEqual(self.unread_count(), 2)
+        
+        self.assertEqual(delete_notifications(self.user, read_only=True), 1)
+        self.assertEqual(self.unread_count(), 2)
+        self.assertEqual(delete_notifications(self.user), 2)
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_recount_repairs_drift(self):
+        other = User.objects.create_user(username='other', password='testpassword123')
+        # Bulk writes bypass the counter
+        Notification.objects.filter(pk=self.notifications[0].pk).update(is_read=True)
+        User.objects.filter(pk=other.pk).update(unread_notification_count=5)
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(recount_unread(), 2)
+        self.assertEqual(self.unread_count(), 2)
+        other.refresh_from_db(fields=['unread_notification_count'])
+        self.assertEqual(other.unread_notification_count, 0)
+        
+        Notification.objects.filter(user=self.user).delete()
+        out = StringIO()
+        call_command('recount_notifications', 'testuser', stdout=out)
+        self.assertIn('for 1 users', out.getvalue())
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_notifications_page(self):
+        self.client.force_login(self.user)
+        with patch('users.views.NOTIFICATIONS_PER_PAGE', 2):
+            response = self.client.get(reverse('notifications'))
+            self.assertEqual(response.context['unread_count'], 3)
+            self.assertEqual(
+                [n.pk for n in response.context['notifications']],
+                [self.notifications[2].pk, self.notifications[1].pk]
+            )
+            response = self.client.get(reverse('notifications'), {'cursor': response.context['next_cursor']})
+            self.assertEqual([n.pk for n in response.context['notifications']], [self.notifications[0].pk])
+            self.assertIsNone(response.context['next_cursor'])
+        
+        self.client.get(reverse('notifications'), {'mark_all_read': 1})
+        self.assertEqual(self.unread_count(), 0)
@@ -1,14 +1,18 @@
 from django.shortcuts import render, redirect
+from django.http import Http404
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 from .forms import CustomUserCreationForm, UserPreferenceForm, UserProfileForm
-from .models import UserPreference, Notification
-from transactions.models import Transaction
-from .services import convert_user_transactions
+from .models import CustomUser, UserPreference, Notification
+from transactions.services import get_user_period_stats
+from .services import start_currency_conversion
+from .notifications import delete_notifications, mark_read, paginate_notifications
+
+NOTIFICATIONS_PER_PAGE = 20
 
 def register(request):
     if request.method == 'POST':
@@ -45,22 +49,37 @@ def profile(request):
                 messages.success(request, 'Your preferences have been updated!')
                 return redirect('profile')
         else:
+            # Validation copies the submitted currency onto the instance
+            old_currency = user.currency
             profile_form = UserProfileForm(request.POST, instance=user)
             pref_form = UserPreferenceForm(instance=preferences)
             if profile_form.is_valid():
-                old_currency = user.currency
                 convert = profile_form.cleaned_data.get('convert_currency')
+                changed = old_currency != user.currency
                 
-                # Save the user profile
-                user = profile_form.save()
+                # The currency may only change while no conversion runs, and a
+                # requested conversion is locked in before the new currency is saved
+                with transaction.atomic():
+                    if not changed:
+                        allowed = True
+                    elif convert:
+                        allowed = start_currency_conversion(user, old_currency, user.currency)
+                    else:
+                        allowed = not CustomUser.objects.filter(pk=user.pk, is_converting_currency=True).exists()
+                    if allowed:
+                        # Only the form's fields, so a conversion lock set meanwhile is kept
+                        user = profile_form.save(commit=False)
+                        user.save(update_fields=profile_form._meta.fields)
                 
-                # If currency changed and conversion requested
-                if old_currency != user.currency and convert:
-                    convert_user_transactions(user, old_currency, user.currency)
-                    messages.success(request, f'Your profile has been updated and transactions converted to {user.get_currency_display()}!')
-                else:
-                    messages.success(request, 'Your profile has been updated!')
-                return redirect('profile')
+                if allowed:
+                    if changed and convert:
+                        messages.success(request, f'Your profile has been updated. Your budgets and incomes are being converted to {user.get_currency_display()} in the background.')
+                    else:
+                        messages.success(request, 'Your profile has been updated!')
+                    return redirect('profile')
+                
+                user.currency = old_currency
+                profile_form.add_error('currency', 'A currency conversion is in progress. Change the currency again once it has finished.')
     else:
         profile_form = UserProfileForm(instance=user)
         pref_form = UserPreferenceForm(instance=preferences)
@@ -70,76 +89,66 @@ def profile(request):
     today = timezone.now().date()
     start_of_month = today.replace(day=1)
     
-    # Get month-to-date totals
-    month_income = Transaction.objects.filter(
-        user=user,
-        date__gte=start_of_month,
-        date__lte=today,
-        category__type='income'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    month_expenses = Transaction.objects.filter(
-        user=user,
-        date__gte=start_of_month,
-        date__lte=today,
-        category__type='expense'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Calculate month-to-date savings
-    month_savings = month_income - month_expenses
-    
-    # Get transaction counts
-    total_transactions = Transaction.objects.filter(user=user).count()
+    # Get month-to-date totals and the all-time transaction count
+    stats = get_user_period_stats(user, {
+        'month': (start_of_month, today),
+        'all': (None, None),
+    })
     
-    # Get unread notifications count
-    unread_notifications = Notification.objects.filter(user=user, is_read=False).count()
+    # Unread notifications are counted on the user row
+    unread_notifications = user.unread_notification_count
     
     return render(request, 'users/profile.html', {
         'user': user,
         'profile_form': profile_form,
         'pref_form': pref_form,
-        'month_income': month_income,
-        'month_expenses': month_expenses,
-        'month_savings': month_savings,
-        'total_transactions': total_transactions,
+        'month_income': stats['month']['income'],
+        'month_expenses': stats['month']['expense'],
+        'month_savings': stats['month']['savings'],
+        'total_transactions': stats['all']['count'],
         'unread_notifications': unread_notifications,
         'currency_symbol': user.get_currency_symbol(),
     })
 
 @login_required
 def notifications(request):
-    notifications = Notification.objects.filter(user=request.user)
-    
     # Mark all as read if requested
     if 'mark_all_read' in request.GET:
-        notifications.update(is_read=True)
+        mark_read(request.user)
         messages.success(request, 'All notifications marked as read.')
         return redirect('notifications')
     
     # Mark single notification as read
     notification_id = request.GET.get('mark_read')
     if notification_id:
-        try:
-            notification = notifications.get(id=notification_id)
-            notification.is_read = True
-            notification.save()
+        if notification_id.isdigit() and mark_read(request.user, [notification_id]):
             messages.success(request, 'Notification marked as read.')
-        except Notification.DoesNotExist:
-            pass
+        return redirect('notifications')
+    
+    # Delete every read notification
+    if 'delete_read' in request.GET:
+        deleted = delete_notifications(request.user, read_only=True)
+        messages.success(request, f'{deleted} read notification(s) deleted.')
         return redirect('notifications')
     
     # Delete notification
     notification_id = request.GET.get('delete')
     if notification_id:
-        try:
-            notification = notifications.get(id=notification_id)
-            notification.delete()
+        if notification_id.isdigit() and delete_notifications(request.user, [notification_id]):
             messages.success(request, 'Notification deleted.')
-        except Notification.DoesNotExist:
-            pass
         return redirect('notifications')
     
+    cursor = request.GET.get('cursor')
+    try:
+        notifications, next_cursor = paginate_notifications(
+            Notification.objects.filter(user=request.user), cursor, NOTIFICATIONS_PER_PAGE
+        )
+    except ValueError:
+        raise Http404('Invalid cursor')
+    
     return render(request, 'users/notifications.html', {
         'notifications': notifications,
-        'unread_count': notifications.filter(is_read=False).count(),
-    })
\ No newline at end of file
+        'unread_count': request.user.unread_notification_count,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+    })